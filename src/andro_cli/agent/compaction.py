@@ -0,0 +1,205 @@
+"""Token-budgeted history compaction for agent sessions.
+
+CompactingSession wraps the SQLite session and changes only what the model
+sees. Everything is still stored in full. When the whole history is fetched
+for a turn:
+
+1. Tool outputs older than the recent turns are cut down to a short stub.
+2. If the history is still over budget, the oldest turns are folded into one
+   rolling summary message, oldest first, until it fits.
+
+The last ``keep_recent_turns`` turns are always sent verbatim.
+"""
+import json
+from dataclasses import dataclass
+from typing import Any
+
+from agents.memory.session import SessionABC
+
+DEFAULT_TOKEN_BUDGET = 8000
+DEFAULT_KEEP_RECENT_TURNS = 4
+DEFAULT_MAX_TOOL_OUTPUT_CHARS = 1500
+
+# The summary keeps at most this many characters of the newest folded turns.
+MAX_SUMMARY_CHARS = 4000
+SUMMARY_HEADER = "[Summary of earlier conversation]"
+
+Item = dict[str, Any]
+
+
+@dataclass(slots=True)
+class CompactionStats:
+    """What the last full history fetch looked like before and after compaction."""
+    raw_tokens: int
+    sent_tokens: int
+    raw_items: int
+    sent_items: int
+    turns_folded: int
+    outputs_trimmed: int
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.raw_tokens - self.sent_tokens
+
+
+def estimate_tokens(item: Item) -> int:
+    """Rough token count (~4 characters per token) of a stored item."""
+    return len(json.dumps(item, ensure_ascii=False)) // 4 + 1
+
+
+class CompactingSession(SessionABC):
+    def __init__(
+        self,
+        inner: SessionABC,
+        token_budget: int = DEFAULT_TOKEN_BUDGET,
+        keep_recent_turns: int = DEFAULT_KEEP_RECENT_TURNS,
+        max_tool_output_chars: int = DEFAULT_MAX_TOOL_OUTPUT_CHARS,
+    ) -> None:
+        self.inner = inner
+        self.session_id = inner.session_id
+        self.session_settings = getattr(inner, "session_settings", None)
+
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.max_tool_output_chars = max_tool_output_chars
+
+        self.last_stats: CompactionStats | None = None
+        # (turns folded, summary lines) so the next fold only summarizes new turns.
+        self._summary: tuple[int, list[str]] = (0, [])
+
+    def __getattr__(self, name: str) -> Any:
+        # store_run_usage, branch helpers etc. belong to the wrapped session.
+        return getattr(self.inner, name)
+
+    # ----------------------------
+    # Session protocol
+    # ----------------------------
+
+    async def get_items(self, limit: int | None = None) -> list[Item]:
+        items = await self.inner.get_items(limit)
+        # Limited reads are the SDK's own bookkeeping; only the full history
+        # goes to the model.
+        if limit is not None:
+            return items
+        return self.compact(items)
+
+    async def add_items(self, items: list[Item]) -> None:
+        await self.inner.add_items(items)
+
+    async def pop_item(self) -> Item | None:
+        return await self.inner.pop_item()
+
+    async def clear_session(self) -> None:
+        self._summary = (0, [])
+        await self.inner.clear_session()
+
+    # ----------------------------
+    # Compaction
+    # ----------------------------
+
+    def compact(self, items: list[Item]) -> list[Item]:
+        raw_tokens = sum(estimate_tokens(i) for i in items)
+        turns = _split_turns(items)
+        recent = max(len(turns) - self.keep_recent_turns, 0)
+
+        outputs_trimmed = 0
+        for turn in turns[:recent]:
+            for index, item in enumerate(turn):
+                trimmed = self._trim_tool_output(item)
+                if trimmed is not item:
+                    turn[index] = trimmed
+                    outputs_trimmed += 1
+
+        sizes = [sum(estimate_tokens(i) for i in turn) for turn in turns]
+        total = sum(sizes)
+        folded = 0
+        while total > self.token_budget and folded < recent:
+            total -= sizes[folded]
+            folded += 1
+
+        result: list[Item] = []
+        if folded:
+            result.append(self._summary_item(turns, folded))
+        for turn in turns[folded:]:
+            result.extend(turn)
+
+        self.last_stats = CompactionStats(
+            raw_tokens=raw_tokens,
+            sent_tokens=sum(estimate_tokens(i) for i in result),
+            raw_items=len(items),
+            sent_items=len(result),
+            turns_folded=folded,
+            outputs_trimmed=outputs_trimmed,
+        )
+        return result
+
+    def _trim_tool_output(self, item: Item) -> Item:
+        if item.get("type") != "function_call_output":
+            return item
+        output = item.get("output")
+        if not isinstance(output, str) or len(output) <= self.max_tool_output_chars:
+            return item
+        keep = output[: self.max_tool_output_chars // 2]
+        return {**item, "output": f"{keep}\n[... {len(output) - len(keep)} more characters omitted]"}
+
+    def _summary_item(self, turns: list[list[Item]], folded: int) -> Item:
+        done, lines = self._summary
+        if done > folded:
+            # History shrank (pop/clear elsewhere); start over.
+            done, lines = 0, []
+        for turn in turns[done:folded]:
+            lines.append(_summarize_turn(turn))
+        self._summary = (folded, lines)
+
+        # Keep the newest lines that fit; the oldest fall off first.
+        kept: list[str] = []
+        size = 0
+        for line in reversed(lines):
+            size += len(line) + 1
+            if size > MAX_SUMMARY_CHARS:
+                break
+            kept.append(line)
+        text = "\n".join(reversed(kept))
+        return {"role": "user", "content": f"{SUMMARY_HEADER}\n{text}"}
+
+
+def _split_turns(items: list[Item]) -> list[list[Item]]:
+    """Group items into turns, each starting at a user message."""
+    turns: list[list[Item]] = []
+    for item in items:
+        if item.get("role") == "user" or not turns:
+            turns.append([])
+        turns[-1].append(item)
+    return turns
+
+
+def _summarize_turn(turn: list[Item]) -> str:
+    user, reply, tools = "", "", []
+    for item in turn:
+        if item.get("role") == "user":
+            user = _text_of(item)
+        elif item.get("role") == "assistant":
+            reply = _text_of(item) or reply
+        elif item.get("type") == "function_call":
+            tools.append(item.get("name", "tool"))
+
+    line = f"- User: {_clip(user, 160)}"
+    if tools:
+        line += f" | tools: {', '.join(tools)}"
+    if reply:
+        line += f" | Assistant: {_clip(reply, 240)}"
+    return line
+
+
+def _text_of(item: Item) -> str:
+    content = item.get("content")
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
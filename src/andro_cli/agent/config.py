@@ -26,6 +26,30 @@ def get_session_file() -> Path:
     return get_config_dir() / "session.db"
 
 
+def get_index_file() -> Path:
+    return get_config_dir() / "index.db"
+
+
+def get_spool_dir() -> Path:
+    return get_config_dir() / "spool"
+
+
+def get_response_cache_file() -> Path:
+    return get_config_dir() / "responses.db"
+
+
+def get_profile_dir() -> Path:
+    return get_config_dir() / "profiles"
+
+
+def get_mcp_tools_cache_file() -> Path:
+    return get_config_dir() / "mcp_tools.json"
+
+
+def get_log_dir() -> Path:
+    return get_config_dir() / "logs"
+
+
 def load_config() -> dict[str, Any]:
     """Load configuration from config.json."""
     if not DEFAULT_CONFIG_FILE.exists():
@@ -100,9 +124,10 @@ Before taking any action, follow these steps:
 """
 
 
-def get_api_key() -> str | None:
-    """Get the Gemini API key from config or environment."""
-    config = load_config()
+def get_api_key(config: dict[str, Any] | None = None) -> str | None:
+    """Get the Gemini API key from config (loaded unless given) or environment."""
+    if config is None:
+        config = load_config()
     
     # Check config first
     if api_key := config.get("GEMINI_API_KEY"):
@@ -0,0 +1,206 @@
+"""Full-text search over every conversation in session.db, and paged resume.
+
+``message_text`` is an FTS5 table with one row per stored item that has text:
+user and assistant messages, tool calls and tool outputs. Its rowid is the
+item's id in ``agent_messages``. Triggers on ``agent_messages`` keep it in
+step. They run inside whichever transaction adds or deletes items, whether
+that is the session writer, the SDK or the size cap deleting old sessions, so
+nothing else has to know the index exists. Items stored before the table was
+created are indexed once, when it is created.
+
+The same SQL that extracts an item's text also feeds ``transcript()``, which
+reads a session's messages a page at a time, newest first, so a resumed
+session can show its last turns before the rest is loaded.
+"""
+import asyncio
+import re
+import sqlite3
+import threading
+from typing import Any
+
+from agents import function_tool
+
+# How much of one item is indexed; tool outputs can be large.
+MAX_INDEXED_CHARS = 20000
+# How much of a matching item recall() hands back.
+MAX_RECALL_CHARS = 1000
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+
+KINDS = {
+    "user": "user",
+    "assistant": "assistant",
+    "function_call": "tool call",
+    "function_call_output": "tool output",
+}
+
+# The searchable text of one agent_messages.message_data value ("{data}").
+_TEXT_SQL = """
+CASE
+    WHEN NOT json_valid({data}) THEN ''
+    WHEN json_type({data}, '$.content') = 'text' THEN json_extract({data}, '$.content')
+    WHEN json_type({data}, '$.content') = 'array' THEN COALESCE(
+        (SELECT group_concat(json_extract(value, '$.text'), ' ') FROM json_each({data}, '$.content')), '')
+    WHEN json_extract({data}, '$.type') = 'function_call' THEN
+        json_extract({data}, '$.name') || ' ' || COALESCE(json_extract({data}, '$.arguments'), '')
+    ELSE COALESCE(json_extract({data}, '$.output'), '')
+END
+"""
+
+
+def _text_sql(column: str, limit: int | None = MAX_INDEXED_CHARS) -> str:
+    text = _TEXT_SQL.format(data=column).strip()
+    return f"substr({text}, 1, {limit})" if limit else text
+
+
+class HistoryIndex:
+    def __init__(self, db_path: str) -> None:
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        # Transcripts work on any SQLite; search needs FTS5. Probe it in the
+        # connection's temp schema, which never touches session.db.
+        try:
+            self._conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(text, tokenize = 'porter unicode61')")
+            self._conn.execute("DROP TABLE temp.fts5_probe")
+            self.searchable = True
+        except sqlite3.Error:
+            self.searchable = False
+
+    @staticmethod
+    def setup(conn: sqlite3.Connection) -> None:
+        """Create the index and its triggers through ``conn``, the session writer's.
+
+        Run as a writer job, so it is ordered with every other write and
+        needs no lock of its own. The first run indexes what is already stored.
+        """
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'message_text'"
+        ).fetchone()
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS message_text USING fts5(text, tokenize = 'porter unicode61')"
+        )
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS message_text_insert AFTER INSERT ON agent_messages BEGIN
+                INSERT INTO message_text (rowid, text)
+                SELECT new.id, t FROM (SELECT {_text_sql('new.message_data')} AS t) WHERE t != '';
+            END
+            """
+        )
+        conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS message_text_delete AFTER DELETE ON agent_messages BEGIN
+                DELETE FROM message_text WHERE rowid = old.id;
+            END
+            """
+        )
+        if not exists:
+            conn.execute(
+                f"INSERT INTO message_text (rowid, text) SELECT id, t FROM "
+                f"(SELECT id, {_text_sql('message_data')} AS t FROM agent_messages) WHERE t != ''"
+            )
+
+    # ----------------------------
+    # Search
+    # ----------------------------
+
+    def search(
+        self,
+        query: str,
+        session_id: str | None = None,
+        limit: int = DEFAULT_SEARCH_LIMIT,
+        marks: tuple[str, str] = ("**", "**"),
+        full_text: bool = False,
+    ) -> dict[str, Any]:
+        """Best-matching items for ``query`` across sessions, or in ``session_id``.
+
+        Every word of the query must occur (plurals and other endings count).
+        Each hit has a snippet with the words wrapped in ``marks``; with
+        full_text it also carries the start of the item itself.
+        """
+        words = re.findall(r"\w+", query)
+        if not words:
+            return {"error": "Give at least one word to search for."}
+        match = " ".join('"' + word + '"' for word in words)
+        limit = min(max(limit, 1), MAX_SEARCH_LIMIT)
+
+        sql = (
+            "SELECT m.session_id, m.created_at, "
+            "COALESCE(json_extract(m.message_data, '$.role'), json_extract(m.message_data, '$.type')), "
+            "snippet(message_text, 0, ?, ?, '…', 16), substr(message_text.text, 1, ?) "
+            "FROM message_text JOIN agent_messages m ON m.id = message_text.rowid "
+            "WHERE message_text MATCH ?"
+        )
+        params: list[Any] = [*marks, MAX_RECALL_CHARS, match]
+        if session_id:
+            sql += " AND m.session_id = ?"
+            params.append(session_id)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        hits = []
+        for session, created, kind, snippet, text in rows:
+            hit = {
+                "session": session,
+                "when": created,
+                "kind": KINDS.get(kind, kind or "item"),
+                "snippet": " ".join(snippet.split()),
+            }
+            if full_text:
+                hit["text"] = text if len(text) < MAX_RECALL_CHARS else text + "…"
+            hits.append(hit)
+        return {"query": query, "hits": hits}
+
+    # ----------------------------
+    # Resume
+    # ----------------------------
+
+    def transcript(self, session_id: str, before: int | None = None, limit: int = 40) -> dict[str, Any]:
+        """Up to ``limit`` user/assistant messages older than item id ``before``.
+
+        Messages come oldest first as (role, text). Pass the returned
+        ``before`` to get the page above it; it is None once there is none.
+        """
+        sql = (
+            f"SELECT id, json_extract(message_data, '$.role'), {_text_sql('message_data', None)} "
+            "FROM agent_messages WHERE session_id = ? AND json_valid(message_data) "
+            "AND json_extract(message_data, '$.role') IN ('user', 'assistant')"
+        )
+        params: list[Any] = [session_id]
+        if before is not None:
+            sql += " AND id < ?"
+            params.append(before)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        messages = [(role, text) for _, role, text in reversed(rows) if text]
+        return {"messages": messages, "before": rows[-1][0] if len(rows) == limit else None}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def build_history_tools(index: HistoryIndex):
+
+    @function_tool
+    async def recall(query: str, session: str = "", limit: int = DEFAULT_SEARCH_LIMIT) -> dict:
+        """Search past conversations, including earlier tool results, before re-running a diagnostic.
+
+        Args:
+            query: Words to look for, e.g. "disk usage /var" or "dns timeout".
+            session: Only search this session name (default: all sessions).
+            limit: Maximum number of matching messages to return.
+        """
+        try:
+            return await asyncio.to_thread(index.search, query, session or None, limit, (">>", "<<"), True)
+        except sqlite3.Error as e:
+            return {"error": f"History search failed: {e}"}
+
+    return [recall]
@@ -0,0 +1,351 @@
+"""MCP servers from ``~/.cli_agent/mcp/``, started in the background.
+
+Each ``<name>.json`` there describes one server, either a command to run
+over stdio or a URL:
+
+    {"command": "npx", "args": ["-y", "@modelcontextprotocol/server-git"]}
+    {"url": "http://localhost:9000/mcp"}                 # streamable HTTP
+    {"url": "http://localhost:9000/sse", "transport": "sse"}
+
+Optional keys are "env", "cwd" and "headers", "enabled" (default true),
+"timeout" (seconds for the handshake and each request, default 20) and
+"idle_timeout" (seconds unused before the server is stopped, default 300).
+
+Nothing is started before the UI is up:
+
+- Tool schemas are cached in ``~/.cli_agent/mcp_tools.json``, so the
+  agent has the tools of known servers right away. An entry is reused while
+  the server's config is unchanged, and its tools are listed again only when
+  the server reports a new version.
+- start_all() starts every server at once in the background. A server that
+  was stopped is started again by its next tool call.
+- Each server runs in its own long-lived task. The MCP client has to be
+  connected and cleaned up in the same task. The task stops the server
+  once it has been idle for idle_timeout.
+
+The stderr of stdio servers goes to ``~/.cli_agent/logs/mcp-<name>.log``
+rather than the terminal the TUI is drawing on.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from agents.mcp import MCPServer, MCPServerSse, MCPServerStdio, MCPServerStreamableHttp, MCPUtil
+from agents.tool import FunctionTool
+from mcp.client.stdio import StdioServerParameters, stdio_client
+from mcp.types import CallToolResult, GetPromptResult, ListPromptsResult, Tool as MCPTool
+
+DEFAULT_TIMEOUT = 20.0
+DEFAULT_IDLE_TIMEOUT = 300.0
+
+
+@dataclass(slots=True)
+class ServerConfig:
+    name: str
+    raw: dict[str, Any]
+
+    @property
+    def fingerprint(self) -> str:
+        return hashlib.sha256(json.dumps(self.raw, sort_keys=True).encode()).hexdigest()[:16]
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.raw.get("enabled", True))
+
+    @property
+    def timeout(self) -> float:
+        return float(self.raw.get("timeout", DEFAULT_TIMEOUT))
+
+    @property
+    def idle_timeout(self) -> float:
+        return float(self.raw.get("idle_timeout", DEFAULT_IDLE_TIMEOUT))
+
+    def build(self, log_dir: Path) -> MCPServer:
+        raw = self.raw
+        if "command" in raw:
+            params = {"command": raw["command"], "args": list(raw.get("args", []))}
+            if "env" in raw:
+                # Servers need PATH etc. too; the config only adds to it.
+                params["env"] = {**os.environ, **raw["env"]}
+            if "cwd" in raw:
+                params["cwd"] = raw["cwd"]
+            return _LoggedStdioServer(
+                params,
+                log_dir / f"mcp-{self.name}.log",
+                name=self.name,
+                client_session_timeout_seconds=self.timeout,
+            )
+        if "url" in raw:
+            params = {"url": raw["url"], "headers": raw.get("headers", {}), "timeout": self.timeout}
+            if raw.get("transport") == "sse":
+                return MCPServerSse(params, name=self.name, client_session_timeout_seconds=self.timeout)
+            return MCPServerStreamableHttp(params, name=self.name, client_session_timeout_seconds=self.timeout)
+        raise ValueError(f"MCP server '{self.name}' needs a \"command\" or a \"url\"")
+
+
+class _LoggedStdioServer(MCPServerStdio):
+    def __init__(self, params: dict[str, Any], log_file: Path, **kwargs: Any) -> None:
+        super().__init__(params, **kwargs)
+        self.log_file = log_file
+
+    def create_streams(self):
+        return _stdio_client_logged(self.params, self.log_file)
+
+
+@asynccontextmanager
+async def _stdio_client_logged(params: StdioServerParameters, log_file: Path):
+    log_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_file, "a", encoding="utf-8") as errlog:
+        async with stdio_client(params, errlog=errlog) as streams:
+            yield streams
+
+
+def load_server_configs(config: dict[str, Any]) -> list[ServerConfig]:
+    """ServerConfigs from get_mcp_config(); a file may also hold {"mcpServers": {...}}."""
+    servers = []
+    for name, raw in config.items():
+        if not isinstance(raw, dict):
+            continue
+        nested = raw.get("mcpServers")
+        if isinstance(nested, dict):
+            servers += [ServerConfig(n, r) for n, r in nested.items() if isinstance(r, dict)]
+        else:
+            servers.append(ServerConfig(name, raw))
+    return [s for s in servers if s.enabled]
+
+
+class ManagedServer(MCPServer):
+    """Stands in for one configured server.
+
+    The agent's tools point at this object, which starts the real server on
+    demand and forwards calls to it.
+    """
+
+    def __init__(
+        self,
+        config: ServerConfig,
+        log_dir: Path,
+        on_call: Callable[[], None] | None = None,
+    ) -> None:
+        super().__init__()
+        self.config = config
+        self.log_dir = log_dir
+        self.tools: list[MCPTool] = []
+        self.version: str | None = None
+        self.state = "stopped"  # stopped, starting, running, failed
+        self.error: str | None = None
+        self.starts = 0
+        self.last_used = time.monotonic()
+        self._on_call = on_call
+        self._server: MCPServer | None = None
+        self._task: asyncio.Task | None = None
+        self._ready: asyncio.Future | None = None
+        self._stop: asyncio.Event | None = None
+        self._calls = 0
+        # Set by the manager: skip list_tools when the cached listing is
+        # for this version.
+        self.cached_version: str | None = None
+
+    @property
+    def name(self) -> str:
+        return self.config.name
+
+    async def ensure_started(self) -> None:
+        if self._task is not None and not self._task.done() and self._ready.done() and self._server is None:
+            # Shutting down after being idle: let it finish, then start afresh.
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._task is None or self._task.done():
+            loop = asyncio.get_running_loop()
+            self._ready = loop.create_future()
+            self._stop = asyncio.Event()
+            self.state = "starting"
+            self._task = asyncio.create_task(self._serve(), name=f"mcp-{self.name}")
+        # Shielded: one caller giving up must not cancel the start for others.
+        await asyncio.shield(self._ready)
+
+    async def _serve(self) -> None:
+        server = self.config.build(self.log_dir)
+        try:
+            await server.connect()
+            self.starts += 1
+            info = getattr(server, "server_initialize_result", None)
+            self.version = info.serverInfo.version if info else None
+            if not self.tools or self.version is None or self.version != self.cached_version:
+                self.tools = await server.list_tools()
+            self._server = server
+            self.state, self.error = "running", None
+            self.last_used = time.monotonic()
+            self._ready.set_result(None)
+
+            while True:
+                remaining = self.config.idle_timeout - (time.monotonic() - self.last_used)
+                if remaining <= 0 and self._calls == 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=max(remaining, 1.0))
+                    break
+                except asyncio.TimeoutError:
+                    pass
+        except Exception as e:
+            self.state, self.error = "failed", f"{type(e).__name__}: {e}"
+            if not self._ready.done():
+                self._ready.set_exception(RuntimeError(f"MCP server '{self.name}' failed to start: {self.error}"))
+                # Retrieved here so an unawaited failure isn't logged as lost.
+                self._ready.exception()
+        finally:
+            if not self._ready.done():
+                self._ready.cancel()
+            self._server = None
+            if self.state != "failed":
+                self.state = "stopped"
+            try:
+                await server.cleanup()
+            except Exception:
+                pass
+
+    async def stop(self) -> None:
+        if self._task is None or self._task.done():
+            return
+        self._stop.set()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    # ----------------------------
+    # MCPServer protocol
+    # ----------------------------
+
+    async def connect(self) -> None:
+        await self.ensure_started()
+
+    async def cleanup(self) -> None:
+        await self.stop()
+
+    async def list_tools(self, run_context: Any = None, agent: Any = None) -> list[MCPTool]:
+        return self.tools
+
+    async def call_tool(
+        self,
+        tool_name: str,
+        arguments: dict[str, Any] | None,
+        meta: dict[str, Any] | None = None,
+    ) -> CallToolResult:
+        self._calls += 1
+        try:
+            await self.ensure_started()
+            return await self._server.call_tool(tool_name, arguments, meta=meta)
+        finally:
+            self._calls -= 1
+            self.last_used = time.monotonic()
+            if self._on_call:
+                self._on_call()
+
+    async def list_prompts(self) -> ListPromptsResult:
+        await self.ensure_started()
+        return await self._server.list_prompts()
+
+    async def get_prompt(self, name: str, arguments: dict[str, Any] | None = None) -> GetPromptResult:
+        await self.ensure_started()
+        return await self._server.get_prompt(name, arguments)
+
+
+class MCPManager:
+    def __init__(
+        self,
+        configs: list[ServerConfig],
+        cache_file: Path,
+        log_dir: Path,
+        on_call: Callable[[], None] | None = None,
+    ) -> None:
+        self.cache_file = cache_file
+        self.servers = {c.name: ManagedServer(c, log_dir, on_call) for c in configs}
+        # Tool names dropped because an earlier tool already had them.
+        self.shadowed: list[str] = []
+        self._tool_owner: dict[str, str] = {}
+
+        cache = self._read_cache()
+        for server in self.servers.values():
+            entry = cache.get(server.name)
+            if entry and entry.get("fingerprint") == server.config.fingerprint:
+                server.tools = [MCPTool.model_validate(t) for t in entry.get("tools", [])]
+                server.cached_version = server.version = entry.get("version")
+
+    def tools(self, taken: set[str] = frozenset()) -> list[FunctionTool]:
+        """Function tools for every known server tool; names in ``taken`` are skipped."""
+        tools, seen, self.shadowed = [], set(taken), []
+        self._tool_owner = {}
+        for server in self.servers.values():
+            for tool in server.tools:
+                if tool.name in seen:
+                    self.shadowed.append(f"{server.name}:{tool.name}")
+                    continue
+                seen.add(tool.name)
+                self._tool_owner[tool.name] = server.name
+                # Converted from a copy: the SDK fills in missing schema keys.
+                tools.append(MCPUtil.to_function_tool(tool.model_copy(deep=True), server, False))
+        return tools
+
+    def owns(self, tool_name: str) -> bool:
+        return tool_name in self._tool_owner
+
+    async def start_all(self, missing_only: bool = False) -> bool:
+        """Start servers at once; returns whether any server's tools changed.
+
+        With missing_only, only servers without cached tools are started.
+        """
+        servers = [s for s in self.servers.values() if not (missing_only and s.tools)]
+        before = {s.name: self._listing(s) for s in servers}
+        await asyncio.gather(*(s.ensure_started() for s in servers), return_exceptions=True)
+        running = [s for s in servers if s.state == "running"]
+        changed = [s for s in running if self._listing(s) != before[s.name]]
+        if changed or any(s.cached_version != s.version for s in running):
+            await asyncio.to_thread(self._write_cache)
+        for server in running:
+            server.cached_version = server.version
+        return bool(changed)
+
+    async def close(self) -> None:
+        await asyncio.gather(*(s.stop() for s in self.servers.values()), return_exceptions=True)
+
+    def summary(self) -> list[dict[str, Any]]:
+        now = time.monotonic()
+        return [
+            {
+                "name": s.name,
+                "state": s.state,
+                "version": s.version,
+                "tools": len(s.tools),
+                "starts": s.starts,
+                "idle": now - s.last_used if s.state == "running" else None,
+                "error": s.error,
+            }
+            for s in self.servers.values()
+        ]
+
+    @staticmethod
+    def _listing(server: ManagedServer) -> list[dict[str, Any]]:
+        return [t.model_dump(mode="json", exclude_none=True) for t in server.tools]
+
+    def _read_cache(self) -> dict[str, Any]:
+        try:
+            return json.loads(self.cache_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _write_cache(self) -> None:
+        cache = self._read_cache()
+        for server in self.servers.values():
+            if server.state == "running":
+                cache[server.name] = {
+                    "fingerprint": server.config.fingerprint,
+                    "version": server.version,
+                    "tools": self._listing(server),
+                    "updated": time.time(),
+                }
+        tmp = self.cache_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(cache, indent=2), encoding="utf-8")
+        os.replace(tmp, self.cache_file)
@@ -1 +1,16 @@
 """Pydantic models for the agent"""
+from .events import AgentEvent, CommandOutput, TextDelta, ToolCall, ToolOutput, TurnComplete
+from .context import TurnContext
+from .timing import Span, TurnTimings
+
+__all__ = [
+    "AgentEvent",
+    "CommandOutput",
+    "Span",
+    "TextDelta",
+    "ToolCall",
+    "ToolOutput",
+    "TurnComplete",
+    "TurnContext",
+    "TurnTimings",
+]
@@ -0,0 +1,19 @@
+"""State handed to tools for the duration of one turn."""
+from dataclasses import dataclass, field
+from typing import Callable
+
+from .events import AgentEvent
+
+
+def _discard(event: AgentEvent) -> None:
+    pass
+
+
+@dataclass(slots=True)
+class TurnContext:
+    """Passed as the SDK run context; tools reach it through RunContextWrapper.
+
+    emit sends an event to whoever is consuming AgentService.ask, so a tool
+    can report progress before it returns.
+    """
+    emit: Callable[[AgentEvent], None] = field(default=_discard)
@@ -0,0 +1,56 @@
+"""Events yielded by AgentService.ask while a turn is streaming."""
+from dataclasses import dataclass, field
+from typing import Union
+
+from .timing import TurnTimings
+
+
+@dataclass(slots=True)
+class TextDelta:
+    """A chunk of the assistant's reply text."""
+    text: str
+
+
+@dataclass(slots=True)
+class ToolCall:
+    """The model asked for a tool to be run."""
+    name: str
+    arguments: str = ""
+
+
+@dataclass(slots=True)
+class ToolOutput:
+    """A tool finished and its result went back to the model."""
+    name: str
+    output: str
+
+
+@dataclass(slots=True)
+class CommandOutput:
+    """Output lines from a command that is still running."""
+    text: str
+
+
+@dataclass(slots=True)
+class TurnComplete:
+    """The turn is over. Times are in seconds from the start of the turn.
+
+    history_tokens is the estimated size of the history sent to the model
+    after compaction; saved_tokens is how much compaction cut from it.
+    usage holds the token counts the API reported for the turn (requests,
+    input_tokens, output_tokens, total_tokens). cached is True when the reply
+    came from the response cache instead of the model. timings holds the
+    turn's spans; the caller may still add to it (e.g. UI rendering) until it
+    moves on from this event, after which it is saved.
+    """
+    output: str
+    ttft: float | None
+    elapsed: float
+    history_tokens: int | None = None
+    saved_tokens: int = 0
+    usage: dict[str, int] = field(default_factory=dict)
+    cached: bool = False
+    timings: TurnTimings = field(default_factory=TurnTimings)
+
+
+AgentEvent = Union[TextDelta, ToolCall, ToolOutput, CommandOutput, TurnComplete]
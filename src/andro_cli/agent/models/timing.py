@@ -0,0 +1,61 @@
+"""Where the time went in one turn.
+
+Kept free of SDK imports so the UI can record its own spans into the same
+TurnTimings as the runner.
+"""
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+# Stages in the order they are summarized. Tool spans are labelled with the
+# tool's name instead of the stage.
+STAGES = ("model", "tool", "db", "ui")
+
+
+@dataclass(slots=True)
+class Span:
+    stage: str
+    name: str
+    duration: float
+
+
+@dataclass
+class TurnTimings:
+    """Spans recorded during a turn, in the order they finished."""
+    spans: list[Span] = field(default_factory=list)
+    started: float = field(default_factory=time.perf_counter)
+
+    def add(self, stage: str, name: str, duration: float) -> None:
+        self.spans.append(Span(stage, name, duration))
+
+    @contextmanager
+    def span(self, stage: str, name: str = "") -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, name or stage, time.perf_counter() - started)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def totals(self) -> dict[str, float]:
+        """Seconds per label (model, each tool by name, db, ui), stage order first."""
+        totals: dict[str, float] = {}
+        for stage in STAGES:
+            for span in self.spans:
+                if span.stage == stage:
+                    label = span.name if stage == "tool" else stage
+                    totals[label] = totals.get(label, 0.0) + span.duration
+        return totals
+
+    def summary(self, total: float | None = None) -> str:
+        """One line, e.g. "2.1s: model 1.6s, ls 0.02s, db 0.05s"."""
+        total = self.elapsed() if total is None else total
+        parts = [f"{label} {_seconds(seconds)}" for label, seconds in self.totals().items()]
+        return f"{_seconds(total)}: {', '.join(parts)}" if parts else _seconds(total)
+
+
+def _seconds(value: float) -> str:
+    return f"{value:.1f}s" if value >= 1 else f"{value:.2f}s"
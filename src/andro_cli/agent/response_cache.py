@@ -0,0 +1,153 @@
+"""Opt-in exact-match cache of model replies.
+
+A reply is reused only when everything that shaped it is the same: the model,
+the agent instructions, the recent conversation and the message itself. The
+key is a SHA-256 of those. Turns that ran a side-effecting tool are never
+stored, because replaying them would claim work that didn't happen. Nor are
+turns that checked live system or network state (ping, disk, processes,
+ports...): that answer is stale within minutes, not days.
+
+Entries live in ``~/.cli_agent/responses.db``. Expired entries are dropped,
+and the least recently used go first once the cache is over max_entries.
+
+Enable it in config.json with ``"response_cache": true``, or with an object
+such as ``{"max_entries": 1000, "max_age_hours": 24}``.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable
+
+# Tools that change the machine; a turn that used one is not cached.
+SIDE_EFFECT_TOOLS = frozenset({"write", "edit", "run_command"})
+# Tools that report live system or network state; their turns aren't cached either.
+LIVE_STATE_TOOLS = frozenset({
+    "diagnose", "ping", "traceroute", "check_dns", "get_local_ip", "check_port",
+    "scan_ports", "check_disk", "check_processes", "check_network",
+})
+
+# How many recent user/assistant messages are part of the key.
+HISTORY_WINDOW = 6
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_MAX_AGE_HOURS = 24 * 7
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        db_path: Path,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_age_hours: float = DEFAULT_MAX_AGE_HOURS,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_age = max_age_hours * 3600
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                output TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+
+    @classmethod
+    def from_setting(cls, setting: Any, db_path: Path) -> "ResponseCache | None":
+        """Build the cache from the "response_cache" setting; None when it's off."""
+        if not setting:
+            return None
+        options = setting if isinstance(setting, dict) else {}
+        return cls(
+            db_path,
+            max_entries=int(options.get("max_entries", DEFAULT_MAX_ENTRIES)),
+            max_age_hours=float(options.get("max_age_hours", DEFAULT_MAX_AGE_HOURS)),
+        )
+
+    @staticmethod
+    def make_key(model: str, instructions: str, history: list[dict[str, Any]], message: str) -> str:
+        window = [m for m in (_message(item) for item in history) if m][-HISTORY_WINDOW:]
+        payload = json.dumps([model, instructions, window, message.strip()], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    async def recent_history(session: Any) -> list[dict[str, Any]]:
+        """The newest items of ``session``, enough to hold the key's messages.
+
+        Reads from the end a few items at a time, so the key costs a small
+        query rather than a read (and compaction) of the whole history.
+        """
+        limit = 4 * HISTORY_WINDOW
+        while True:
+            items = await session.get_items(limit)
+            if len(items) < limit or sum(1 for item in items if _message(item)) >= HISTORY_WINDOW:
+                return items
+            limit *= 4
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT output FROM responses WHERE key = ? AND created > ?",
+                (key, now - self.max_age),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, output: str, tools_used: Iterable[str] = ()) -> bool:
+        """Store a reply unless the turn had side effects or read live state; returns whether it was stored."""
+        tools_used = set(tools_used)
+        if not output or tools_used & SIDE_EFFECT_TOOLS or tools_used & LIVE_STATE_TOOLS:
+            return False
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, output, created, last_used) VALUES (?, ?, ?, ?)",
+                (key, output, now, now),
+            )
+            self._evict(now)
+        return True
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM responses WHERE created <= ?", (now - self.max_age,))
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "  SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?"
+            ")",
+            (self.max_entries,),
+        )
+
+    def clear(self) -> int:
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM responses").rowcount
+
+    def summary(self) -> dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(output)), 0) FROM responses"
+            ).fetchone()
+        return {"entries": entries, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+
+def _message(item: dict[str, Any]) -> tuple[str, str] | None:
+    """(role, text) for a user/assistant message item, else None."""
+    role = item.get("role")
+    if role not in ("user", "assistant"):
+        return None
+    content = item.get("content")
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return (role, content) if isinstance(content, str) else None
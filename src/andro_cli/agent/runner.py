@@ -1,48 +1,156 @@
 import asyncio
+import json
 import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import Any, AsyncIterator
 
 from openai import AsyncOpenAI
+from openai.types.responses import ResponseTextDeltaEvent
 
 from agents import Agent, OpenAIChatCompletionsModel, Runner, function_tool, set_tracing_disabled
 from agents.extensions.memory import AdvancedSQLiteSession
-from andro_cli.agent.config import get_api_key, load_agent_instructions, ensure_config_dir, get_session_file
+from andro_cli.agent.compaction import CompactingSession, DEFAULT_TOKEN_BUDGET
+from andro_cli.agent.config import (
+    get_api_key,
+    get_index_file,
+    get_log_dir,
+    get_mcp_config,
+    get_mcp_tools_cache_file,
+    get_response_cache_file,
+    get_session_file,
+    get_spool_dir,
+    load_agent_instructions,
+    load_config,
+    ensure_config_dir,
+)
+from andro_cli.agent.history import HistoryIndex, build_history_tools
+from andro_cli.agent.storage import BufferedSession, SessionWriter
+from andro_cli.agent.timing import TimedSession, TimingHooks, TimingStore
+from andro_cli.agent.transport import ConnectionWarmer, TransportSettings, build_http_client
+from andro_cli.agent.models import AgentEvent, TextDelta, ToolCall, ToolOutput, TurnComplete, TurnContext, TurnTimings
 
 BASE_URL = os.getenv("EXAMPLE_BASE_URL") or "https://generativelanguage.googleapis.com/v1beta/openai/"
-API_KEY = get_api_key()
 MODEL_NAME = os.getenv("EXAMPLE_MODEL_NAME") or "gemini-2.5-flash-lite"
 
-if not API_KEY:
-    raise ValueError(
-        "\n\n"
-        "  ❌  No Gemini API key found!\n\n"
-        "  How to fix:\n"
-        "    1. Get a free key at: https://aistudio.google.com/app/apikey\n"
-        "    2. Set it as an environment variable:\n"
-        "         export GEMINI_API_KEY='your_key_here'   # Linux/macOS\n"
-        "         $env:GEMINI_API_KEY='your_key_here'     # Windows PowerShell\n"
-        "    3. Or run the app normally — it will prompt you:\n"
-        "         uv --directory src run python main.py\n"
-    )
-
-client = AsyncOpenAI(base_url=BASE_URL, api_key=API_KEY)
+NO_API_KEY_MESSAGE = (
+    "\n\n"
+    "  ❌  No Gemini API key found!\n\n"
+    "  How to fix:\n"
+    "    1. Get a free key at: https://aistudio.google.com/app/apikey\n"
+    "    2. Set it as an environment variable:\n"
+    "         export GEMINI_API_KEY='your_key_here'   # Linux/macOS\n"
+    "         $env:GEMINI_API_KEY='your_key_here'     # Windows PowerShell\n"
+    "    3. Or run the app normally — it will prompt you:\n"
+    "         uv --directory src run python main.py\n"
+)
+
+DEFAULT_SESSION = "default"
+
 set_tracing_disabled(disabled=True)
 
+_client: AsyncOpenAI | None = None
+_warmer: ConnectionWarmer | None = None
+
+
+def get_client(api_key: str | None = None, config: dict[str, Any] | None = None) -> AsyncOpenAI:
+    """Return the shared model client, building it on first use.
+
+    Pass the key or the loaded config when the caller already has them so
+    config.json isn't read twice.
+    """
+    global _client, _warmer
+    if _client is None:
+        if config is None:
+            config = load_config()
+        api_key = api_key or get_api_key(config)
+        if not api_key:
+            raise ValueError(NO_API_KEY_MESSAGE)
+        settings = TransportSettings.from_config(config)
+        http_client = build_http_client(settings)
+        _client = AsyncOpenAI(
+            base_url=BASE_URL,
+            api_key=api_key,
+            http_client=http_client,
+            # The SDK applies its own per-request timeout over the client's.
+            timeout=settings.timeout,
+        )
+        _warmer = ConnectionWarmer(http_client, BASE_URL, settings)
+    return _client
+
+
+async def warm_up() -> bool:
+    """Pre-open the connection to the model endpoint (cheap to call repeatedly)."""
+    if _warmer is None:
+        return False
+    return await _warmer.warm_up()
+
 
 class AgentService:
-    def __init__(self):
+    def __init__(self, api_key: str | None = None, session_db: str | None = None):
         ensure_config_dir()
+        # Read once; every setting below comes from this.
+        settings = load_config()
+        client = get_client(api_key, settings)
         from pathlib import Path
-        from .tools import files
+        from .tools import async_tools, command, files, search
+        from .tools.cache import ToolCache
+        # Shared so that write/edit/run_command invalidate what the system tools cached.
+        self.tool_cache = ToolCache(ttls=settings.get("tool_cache_ttls"))
         fs = files.SecureFileSystem(root=Path.cwd())
-        file_tools = files.build_file_tools(fs)
+        file_tools = files.build_file_tools(fs, self.tool_cache)
+        try:
+            index = search.WorkspaceIndex(fs, get_index_file())
+        except sqlite3.Error:
+            # SQLite built without FTS5 or its trigram tokenizer: no search tools.
+            search_tools = []
+        else:
+            search_tools = search.build_search_tools(index)
+        system_tools = async_tools.build_system_tools(self.tool_cache)
+        command_tools = command.build_command_tools(get_spool_dir(), self.tool_cache)
+        self._base_tools = [*file_tools, *search_tools, *system_tools, *command_tools]
 
-                
-        self.session = AdvancedSQLiteSession(
-            session_id="default",
-            db_path=str(get_session_file()),
-            create_tables=True,
+        # MCP tools come from cached schemas; the servers start later (see
+        # start_mcp) or on their first call. Their calls may change anything,
+        # so they clear the tool cache like write/run_command do.
+        from .mcp import MCPManager, load_server_configs
+        self.mcp = MCPManager(
+            load_server_configs(get_mcp_config()),
+            get_mcp_tools_cache_file(),
+            get_log_dir(),
+            on_call=self.tool_cache.invalidate,
         )
 
+        # Each named session has its own history and lock; the client, agent
+        # and tools are shared, so different sessions can run turns at once.
+        self._db_path = session_db or str(get_session_file())
+        self._token_budget = int(settings.get("history_token_budget", DEFAULT_TOKEN_BUDGET))
+        self.sessions: dict[str, CompactingSession] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        # Turns run per session, for the timings of sessions without a writer.
+        self._turns: dict[str, int] = {}
+        # Writes to a session.db file go through one background thread, off
+        # the reply path. In-memory databases are per session and stay as is.
+        self.writer: SessionWriter | None = None
+        if self._db_path != ":memory:":
+            self.writer = SessionWriter.from_setting(
+                settings.get("session_db"), self._db_path, protected=lambda: list(self.sessions)
+            )
+        # With a writer, the timings table is created and filled by its jobs.
+        self.timing_store = TimingStore(self._db_path, create=self.writer is None)
+        # Search over past sessions. The writer maintains its index, so it
+        # needs one; its setup is queued once session.db's tables exist (below).
+        # Without FTS5 only resuming works, and there is no recall tool.
+        self.history: HistoryIndex | None = None
+        if self.writer is not None:
+            self.history = HistoryIndex(self._db_path)
+            if self.history.searchable:
+                self._base_tools += build_history_tools(self.history)
+
+        from .response_cache import ResponseCache
+        self.response_cache = ResponseCache.from_setting(settings.get("response_cache"), get_response_cache_file())
+
         self.agent = Agent(
             name="Assistant",
             instructions=load_agent_instructions(),
@@ -50,23 +158,247 @@ class AgentService:
                 model=MODEL_NAME,
                 openai_client=client,
             ),
-            tools=[*file_tools]
+            tools=self._all_tools(),
         )
 
-        self._lock = asyncio.Lock()
+        self.get_session(DEFAULT_SESSION)
+        if self.writer is not None:
+            self.writer.submit_nowait(TimingStore.setup)
+            if self.history is not None and self.history.searchable:
+                self.writer.submit_nowait(HistoryIndex.setup)
+
+    def get_session(self, session_id: str = DEFAULT_SESSION) -> CompactingSession:
+        """Return the named session, opening it on first use."""
+        session = self.sessions.get(session_id)
+        if session is None:
+            options = {"session_id": session_id, "db_path": self._db_path, "create_tables": True}
+            if self.writer is not None:
+                inner = BufferedSession(self.writer, **options)
+            else:
+                inner = AdvancedSQLiteSession(**options)
+            session = CompactingSession(inner, token_budget=self._token_budget)
+            self.sessions[session_id] = session
+            self._locks[session_id] = asyncio.Lock()
+            self._turns[session_id] = 0
+        return session
+
+    def close_session(self, session_id: str) -> None:
+        """Forget an idle session; what's stored in session.db is kept."""
+        if self.is_busy(session_id):
+            return
+        session = self.sessions.pop(session_id, None)
+        self._locks.pop(session_id, None)
+        self._turns.pop(session_id, None)
+        close = getattr(session and session.inner, "close", None)
+        if close:
+            close()
+
+    def _all_tools(self) -> list:
+        return [*self._base_tools, *self.mcp.tools(taken={t.name for t in self._base_tools})]
+
+    async def start_mcp(self, missing_only: bool = False) -> None:
+        """Start the MCP servers in parallel and pick up any tools that changed.
+
+        With missing_only, only servers without cached tools are started.
+        """
+        if await self.mcp.start_all(missing_only=missing_only):
+            self.agent.tools = self._all_tools()
+
+    async def close(self) -> None:
+        """Stop the MCP servers, finish pending session.db writes and close the readers."""
+        await self.mcp.close()
+        if self.writer is not None:
+            await asyncio.to_thread(self.writer.close)
+        if self.history is not None:
+            self.history.close()
+        self.timing_store.close()
+
+    async def flush(self) -> None:
+        """Wait for queued session.db writes, before reading the file directly."""
+        if self.writer is not None:
+            await self.writer.flush()
 
-    async def ask(self, message: str) -> str:
+    async def warm_up(self) -> bool:
+        return await warm_up()
+
+    def is_busy(self, session_id: str) -> bool:
+        lock = self._locks.get(session_id)
+        return lock is not None and lock.locked()
+
+    async def list_sessions(self) -> list[dict[str, Any]]:
+        """Stored sessions, most recently used first."""
+        if self._db_path == ":memory:":
+            return []
+        await self.flush()
+
+        def query() -> list[dict[str, Any]]:
+            with closing(sqlite3.connect(self._db_path)) as conn:
+                rows = conn.execute(
+                    "SELECT s.session_id, s.updated_at, COUNT(m.id) FROM agent_sessions s "
+                    "LEFT JOIN agent_messages m ON m.session_id = s.session_id "
+                    "GROUP BY s.session_id ORDER BY s.updated_at DESC"
+                ).fetchall()
+            return [{"session_id": sid, "updated_at": updated, "items": count} for sid, updated, count in rows]
+
+        return await asyncio.to_thread(query)
+
+    async def search_history(self, query: str, session_id: str | None = None, limit: int = 20) -> dict[str, Any]:
+        """Stored items matching ``query``, best first (see HistoryIndex.search)."""
+        if self.history is None:
+            return {"error": "History search needs a session.db file."}
+        if not self.history.searchable:
+            return {"error": "History search needs SQLite with FTS5."}
+        await self.flush()
+        return await asyncio.to_thread(self.history.search, query, session_id, limit)
+
+    async def load_transcript(self, session_id: str, before: int | None = None, limit: int = 40) -> dict[str, Any]:
+        """One page of a stored session's messages, for showing it again (see HistoryIndex.transcript)."""
+        if self.history is None:
+            return {"messages": [], "before": None}
+        await self.flush()
+        return await asyncio.to_thread(self.history.transcript, session_id, before, limit)
+
+    async def ask(
+        self,
+        message: str,
+        session_id: str = DEFAULT_SESSION,
+        timings: TurnTimings | None = None,
+    ) -> AsyncIterator[AgentEvent]:
+        """Run one turn and yield text deltas and tool events as they arrive.
+
+        Tools can add their own events (e.g. live command output) through the
+        TurnContext; they are merged into the same stream. The last event is
+        always a TurnComplete carrying the final output, the
+        time-to-first-token and the turn's timing spans. Pass ``timings`` to
+        record spans of your own (e.g. rendering) into the same turn; they are
+        saved once the caller moves past the TurnComplete.
+        """
         from typing import cast
         from agents import Session
-        
-        async with self._lock:
-            result = await Runner.run(
+
+        session = self.get_session(session_id)
+        if timings is None:
+            timings = TurnTimings()
+        timed = TimedSession(session, timings)
+        async with self._locks[session_id]:
+            started = time.perf_counter()
+            self._turns[session_id] += 1
+
+            cache_key = None
+            if self.response_cache is not None:
+                history = await self.response_cache.recent_history(timed)
+                cache_key = self.response_cache.make_key(MODEL_NAME, str(self.agent.instructions), history, message)
+                with timings.span("db", "response_cache"):
+                    cached = await asyncio.to_thread(self.response_cache.get, cache_key)
+                if cached is not None:
+                    # Record the turn so the conversation reads the same as if
+                    # the model had answered.
+                    await timed.add_items([
+                        {"role": "user", "content": message},
+                        {"role": "assistant", "content": cached},
+                    ])
+                    yield TextDelta(cached)
+                    elapsed = time.perf_counter() - started
+                    yield TurnComplete(output=cached, ttft=elapsed, elapsed=elapsed, cached=True, timings=timings)
+                    await self._record_timings(session, timings)
+                    return
+
+            ttft: float | None = None
+            tool_names: dict[str, str] = {}
+            events: asyncio.Queue[AgentEvent | None] = asyncio.Queue()
+
+            result = Runner.run_streamed(
                 self.agent,
                 message,
-                session=cast(Session, self.session),
+                session=cast(Session, timed),
+                context=TurnContext(emit=events.put_nowait),
+                hooks=TimingHooks(timings),
             )
 
+            async def pump() -> None:
+                try:
+                    async for event in result.stream_events():
+                        translated = self._translate(event, tool_names)
+                        if translated is not None:
+                            events.put_nowait(translated)
+                finally:
+                    events.put_nowait(None)
+
+            pump_task = asyncio.create_task(pump())
+            try:
+                while (event := await events.get()) is not None:
+                    if ttft is None and isinstance(event, TextDelta):
+                        ttft = time.perf_counter() - started
+                    yield event
+                await pump_task
+            finally:
+                if not pump_task.done():
+                    result.cancel()
+                    pump_task.cancel()
+
             # Important
-            await self.session.store_run_usage(result)
+            with timings.span("db", "store_run_usage"):
+                await session.store_run_usage(result)
+
+            output = str(result.final_output or "")
+            stats = session.last_stats
+            usage = result.context_wrapper.usage
+            yield TurnComplete(
+                output=output,
+                ttft=ttft,
+                elapsed=time.perf_counter() - started,
+                history_tokens=stats.sent_tokens if stats else None,
+                saved_tokens=stats.saved_tokens if stats else 0,
+                usage={
+                    "requests": usage.requests,
+                    "input_tokens": usage.input_tokens,
+                    "output_tokens": usage.output_tokens,
+                    "total_tokens": usage.total_tokens,
+                },
+                timings=timings,
+            )
+            # After the reply is out: the caller isn't waiting on these.
+            # MCP tools may have side effects the cache can't know about.
+            if cache_key is not None and not any(self.mcp.owns(name) for name in tool_names.values()):
+                await asyncio.to_thread(self.response_cache.put, cache_key, output, tool_names.values())
+            await self._record_timings(session, timings)
+
+    async def _record_timings(self, session: CompactingSession, timings: TurnTimings) -> None:
+        total = timings.elapsed()
+        if self.writer is not None:
+            # Queued behind the turn's items, so it gets the turn number
+            # store_run_usage files the usage under.
+            await session.write_for_turn(
+                lambda conn, turn: TimingStore.insert(conn, session.session_id, turn, timings, total)
+            )
+            return
+        turn = self._turns.get(session.session_id)
+        try:
+            await asyncio.to_thread(self.timing_store.record, session.session_id, turn, timings, total)
+        except sqlite3.Error:
+            # Timings are diagnostics; a busy database must not fail the turn.
+            pass
+
+    @staticmethod
+    def _translate(event, tool_names: dict[str, str]) -> AgentEvent | None:
+        """Map an SDK stream event to one of our AgentEvents (or None to drop it)."""
+        if event.type == "raw_response_event":
+            if isinstance(event.data, ResponseTextDeltaEvent) and event.data.delta:
+                return TextDelta(event.data.delta)
 
-            return result.final_output
+        elif event.type == "run_item_stream_event":
+            if event.name == "tool_called":
+                raw = event.item.raw_item
+                name = getattr(raw, "name", None) or "tool"
+                call_id = getattr(raw, "call_id", None)
+                if call_id:
+                    tool_names[call_id] = name
+                return ToolCall(name, getattr(raw, "arguments", "") or "")
+            if event.name == "tool_output":
+                raw = event.item.raw_item
+                call_id = raw.get("call_id") if isinstance(raw, dict) else None
+                output = event.item.output
+                # JSON rather than a Python repr, so batch output can be parsed.
+                text = output if isinstance(output, str) else json.dumps(output, ensure_ascii=False, default=str)
+                return ToolOutput(tool_names.get(call_id, "tool"), text)
+        return None
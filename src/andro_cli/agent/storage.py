@@ -0,0 +1,498 @@
+"""Background writes to session.db.
+
+The SDK's SQLite session commits on the caller's path: every add_items is two
+transactions, and store_run_usage is a third, each fsynced. Here all writes
+to session.db go through one SessionWriter thread instead:
+
+- Callers queue a job and return at once. The queue is bounded; when it is
+  full, callers wait (off the event loop) instead of growing memory.
+- The thread runs whatever has queued up as one transaction. The connection
+  is in WAL mode with synchronous=NORMAL, so a commit doesn't fsync.
+- BufferedSession keeps items that are queued but not yet committed in
+  memory and adds them to what it reads, so a turn always sees the turns
+  before it.
+- A batch that can't be committed (the file is locked or full) stays
+  pending and is retried, with a growing delay.
+- A size cap keeps the file bounded. Over max_mb, the least recently used
+  sessions that aren't open are deleted, then the file is vacuumed.
+  Sessions unused for max_age_days can be dropped as well.
+
+Set these in config.json, e.g. ``"session_db": {"max_mb": 256, "max_age_days": 90}``.
+"""
+import asyncio
+import atexit
+import json
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+from agents.extensions.memory import AdvancedSQLiteSession
+from agents.memory.session_settings import resolve_session_limit
+
+DEFAULT_MAX_MB = 256
+MAX_PENDING = 256  # queued jobs before callers wait
+MAX_BATCH = 128  # jobs per transaction
+MAINTENANCE_INTERVAL = 600.0
+# A batch that failed to commit is retried after this, doubling up to the max.
+RETRY_DELAY = 0.5
+MAX_RETRY_DELAY = 5.0
+# SQLITE_BUSY, SQLITE_LOCKED, SQLITE_NOMEM, SQLITE_READONLY, SQLITE_IOERR,
+# SQLITE_FULL, SQLITE_CANTOPEN, SQLITE_PROTOCOL: a job that hits one is retried.
+_TRANSIENT_CODES = frozenset({5, 6, 7, 8, 10, 13, 14, 15})
+# Trimming goes down to this share of max_mb, so it doesn't run every check.
+LOW_WATER = 0.8
+
+# Tables whose rows belong to one session, children first.
+SESSION_TABLES = ("message_structure", "turn_usage", "turn_timings", "agent_messages", "agent_sessions")
+
+Job = Callable[[sqlite3.Connection], None]
+
+
+@dataclass(slots=True)
+class _Entry:
+    run: Job | None
+    # Called in the writer thread once the job is committed, or dropped.
+    done: Callable[[], None] | None = None
+
+
+class SessionWriter:
+    def __init__(
+        self,
+        db_path: str,
+        max_mb: float = DEFAULT_MAX_MB,
+        max_age_days: float = 0,
+        protected: Callable[[], Iterable[str]] = tuple,
+    ) -> None:
+        self.db_path = db_path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_age_days = max_age_days
+        self.protected = protected
+        # Held across a commit, and by readers across their SELECT plus the
+        # look at pending items, so no write is seen twice or not at all.
+        self.commit_lock = threading.Lock()
+
+        self.jobs = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_error: str | None = None
+        self.sessions_trimmed = 0
+        # Why session.db couldn't be opened at all; every flush() raises it.
+        self._fatal: sqlite3.Error | None = None
+
+        self._queue: queue.Queue[_Entry | None] = queue.Queue(maxsize=MAX_PENDING)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="session-writer", daemon=True)
+        self._thread.start()
+        # Daemon threads die at exit without finishing; flush what's queued.
+        atexit.register(self.close)
+
+    @classmethod
+    def from_setting(cls, setting: Any, db_path: str, protected: Callable[[], Iterable[str]]) -> "SessionWriter":
+        """Build the writer from the "session_db" setting."""
+        options = setting if isinstance(setting, dict) else {}
+        return cls(
+            db_path,
+            max_mb=float(options.get("max_mb", DEFAULT_MAX_MB)),
+            max_age_days=float(options.get("max_age_days", 0)),
+            protected=protected,
+        )
+
+    async def submit(self, job: Job, done: Callable[[], None] | None = None) -> None:
+        entry = _Entry(job, done)
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            await asyncio.to_thread(self._queue.put, entry)
+
+    def submit_nowait(self, job: Job) -> None:
+        """Queue a job from synchronous code; raises queue.Full if the queue is."""
+        self._queue.put_nowait(_Entry(job))
+
+    async def flush(self) -> None:
+        """Wait until everything queued so far is committed.
+
+        If a write fails it returns once the failure is known; the failed
+        items stay pending and are retried. If session.db can't be opened at
+        all, it raises that error.
+        """
+        loop = asyncio.get_running_loop()
+        flushed = loop.create_future()
+        await self.submit(None, lambda: loop.call_soon_threadsafe(_resolve, flushed, self._fatal))
+        await flushed
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "jobs": self.jobs,
+            "batches": self.batches,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "sessions_trimmed": self.sessions_trimmed,
+        }
+
+    # ----------------------------
+    # Writer thread
+    # ----------------------------
+
+    def _run(self) -> None:
+        try:
+            conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        except sqlite3.Error as e:
+            self._failed(e)
+            self._fatal = e
+            self._run_without_db()
+            return
+        # Jobs whose transaction failed, written again before anything newer.
+        retry: list[_Entry] = []
+        retry_delay = RETRY_DELAY
+        stopping = False
+        try:
+            self._configure(conn)
+            self._maintain(conn)
+            last_maintenance = time.monotonic()
+            while True:
+                if retry:
+                    time.sleep(retry_delay)
+                batch: list[_Entry | None] = list(retry)
+                if not stopping:
+                    try:
+                        if retry:
+                            batch.append(self._queue.get_nowait())
+                        else:
+                            batch.append(self._queue.get(timeout=MAINTENANCE_INTERVAL))
+                    except queue.Empty:
+                        if not retry:
+                            batch.append(_Entry(None))
+                    while len(batch) < MAX_BATCH and batch[-1] is not None:
+                        try:
+                            batch.append(self._queue.get_nowait())
+                        except queue.Empty:
+                            break
+                stopping = stopping or batch[-1] is None
+                entries = [e for e in batch if e is not None]
+                if entries and not self._write(conn, entries):
+                    # Nobody waits on a database that can't be written:
+                    # flush() returns, while the items stay pending.
+                    self._finish([e for e in entries if e.run is None])
+                    failed = [e for e in entries if e.run is not None]
+                    if stopping and retry:
+                        # Closing, and the retry failed too: give up rather than hang the exit.
+                        self._finish(failed)
+                    else:
+                        retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY) if retry else RETRY_DELAY
+                        retry = failed
+                        continue
+                retry, retry_delay = [], RETRY_DELAY
+                if stopping:
+                    break
+                if time.monotonic() - last_maintenance >= MAINTENANCE_INTERVAL:
+                    self._maintain(conn)
+                    last_maintenance = time.monotonic()
+        finally:
+            conn.close()
+
+    def _run_without_db(self) -> None:
+        """Keep taking jobs so nobody waits forever: flushes fail, writes stay pending."""
+        while (entry := self._queue.get()) is not None:
+            if entry.run is None:
+                self._finish([entry])
+
+    def _configure(self, conn: sqlite3.Connection) -> None:
+        # busy_timeout first, so switching to WAL waits out another writer.
+        try:
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA journal_size_limit={64 * 1024 * 1024}")
+        except sqlite3.Error as e:
+            self._failed(e)
+
+    def _write(self, conn: sqlite3.Connection, entries: list[_Entry]) -> bool:
+        """Run the jobs in ``entries`` as one transaction.
+
+        A job that raises is undone on its own and the rest still commit. If
+        the transaction itself fails (the database is locked, full or
+        unreadable) nothing is kept and False is returned without running
+        any done(), so the items stay pending and can be retried.
+        """
+        jobs = [e for e in entries if e.run is not None]
+        if jobs:
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for entry in jobs:
+                    conn.execute("SAVEPOINT job")
+                    try:
+                        entry.run(conn)
+                        conn.execute("RELEASE job")
+                    except sqlite3.Error as e:
+                        if _transient(e):
+                            raise
+                        conn.execute("ROLLBACK TO job")
+                        conn.execute("RELEASE job")
+                        self._failed(e)
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO job")
+                        conn.execute("RELEASE job")
+                        self._failed(e)
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                self._failed(e)
+                return False
+        # done() drops items from the pending overlays; under the lock, a
+        # reader sees each item either committed or pending, never both.
+        with self.commit_lock:
+            if conn.in_transaction:
+                try:
+                    conn.execute("COMMIT")
+                except sqlite3.Error as e:
+                    conn.execute("ROLLBACK")
+                    self._failed(e)
+                    return False
+            if jobs:
+                self.jobs += len(jobs)
+                self.batches += 1
+            self._finish(entries)
+        return True
+
+    @staticmethod
+    def _finish(entries: list[_Entry]) -> None:
+        for entry in entries:
+            if entry.done is not None:
+                entry.done()
+
+    def _failed(self, error: Exception) -> None:
+        self.errors += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+
+    def _maintain(self, conn: sqlite3.Connection) -> None:
+        """Apply max_age_days and max_mb; vacuum if anything was deleted."""
+        try:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            if "agent_sessions" not in tables:
+                return
+            protected = set(self.protected())
+            doomed: list[str] = []
+
+            if self.max_age_days > 0:
+                rows = conn.execute(
+                    "SELECT session_id FROM agent_sessions WHERE updated_at < datetime('now', ?)",
+                    (f"-{self.max_age_days} days",),
+                ).fetchall()
+                doomed += [sid for (sid,) in rows if sid not in protected]
+
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            pages = conn.execute("PRAGMA page_count").fetchone()[0]
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            size, used = pages * page_size, (pages - free) * page_size
+            if size > self.max_bytes:
+                excess = used - int(self.max_bytes * LOW_WATER)
+                if excess > 0:
+                    # Message text is most of a session's footprint; indexes
+                    # and the structure rows roughly double it.
+                    rows = conn.execute(
+                        "SELECT s.session_id, COALESCE(SUM(LENGTH(m.message_data)), 0) * 2 "
+                        "FROM agent_sessions s LEFT JOIN agent_messages m ON m.session_id = s.session_id "
+                        "GROUP BY s.session_id ORDER BY s.updated_at ASC"
+                    ).fetchall()
+                    for sid, footprint in rows:
+                        if excess <= 0:
+                            break
+                        if sid in protected or sid in doomed:
+                            continue
+                        doomed.append(sid)
+                        excess -= footprint
+
+            if doomed:
+                with self.commit_lock:
+                    conn.execute("BEGIN IMMEDIATE")
+                    for table in SESSION_TABLES:
+                        if table in tables:
+                            conn.executemany(f"DELETE FROM {table} WHERE session_id = ?", [(sid,) for sid in doomed])
+                    conn.execute("COMMIT")
+                self.sessions_trimmed += len(doomed)
+            if doomed or (size > self.max_bytes and free):
+                conn.execute("VACUUM")
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            self._failed(e)
+
+
+def _transient(error: sqlite3.Error) -> bool:
+    """Whether ``error`` is about the database rather than the job that hit it."""
+    code = getattr(error, "sqlite_errorcode", None)  # Python 3.11+
+    if code is not None:
+        return code & 0xFF in _TRANSIENT_CODES
+    return isinstance(error, sqlite3.OperationalError) and any(
+        word in str(error) for word in ("locked", "busy", "disk", "full")
+    )
+
+
+def _resolve(future: asyncio.Future, error: BaseException | None = None) -> None:
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(None)
+
+
+class BufferedSession(AdvancedSQLiteSession):
+    """AdvancedSQLiteSession whose writes go through a SessionWriter.
+
+    Reads of the current branch add the items still waiting to be written.
+    Anything else (popping, clearing, other branches) first waits for the
+    queue to drain and then uses the SDK's own code.
+    """
+
+    def __init__(self, writer: SessionWriter, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.writer = writer
+        # Serialized items of add_items calls not yet committed, oldest first.
+        self._pending: deque[list[str]] = deque()
+        self._pending_lock = threading.Lock()
+
+    async def add_items(self, items: list[Any]) -> None:
+        if not items:
+            return
+        # Serialized now: the caller may change its dicts after we return.
+        data = [json.dumps(item) for item in items]
+        with self._pending_lock:
+            self._pending.append(data)
+        await self.writer.submit(lambda conn: self._insert(conn, items, data), self._committed)
+
+    async def get_items(self, limit: int | None = None, branch_id: str | None = None) -> list[Any]:
+        if branch_id not in (None, self._current_branch_id):
+            await self.writer.flush()
+            return await super().get_items(limit, branch_id)
+        session_limit = resolve_session_limit(limit, self.session_settings)
+
+        def read() -> list[Any]:
+            conn = self._get_connection()
+            with self.writer.commit_lock:
+                query = (
+                    "SELECT m.message_data FROM agent_messages m "
+                    "JOIN message_structure s ON m.id = s.message_id "
+                    "WHERE m.session_id = ? AND s.branch_id = ? ORDER BY s.sequence_number DESC"
+                )
+                params: tuple[Any, ...] = (self.session_id, self._current_branch_id)
+                if session_limit is not None:
+                    query += " LIMIT ?"
+                    params += (session_limit,)
+                rows = conn.execute(query, params).fetchall()
+                with self._pending_lock:
+                    pending = [d for batch in self._pending for d in batch]
+            data = [row[0] for row in reversed(rows)] + pending
+            if session_limit is not None:
+                data = data[-session_limit:] if session_limit else []
+            return [item for item in map(_loads, data) if item is not None]
+
+        return await asyncio.to_thread(read)
+
+    async def pop_item(self) -> Any:
+        await self.writer.flush()
+        return await super().pop_item()
+
+    async def clear_session(self) -> None:
+        await self.writer.flush()
+        await super().clear_session()
+
+    async def store_run_usage(self, result: Any) -> None:
+        usage = result.context_wrapper.usage
+        if usage is None:
+            return
+        details = [
+            json.dumps(d.__dict__) if d else None
+            for d in (getattr(usage, "input_tokens_details", None), getattr(usage, "output_tokens_details", None))
+        ]
+        values = (usage.requests or 0, usage.input_tokens or 0, usage.output_tokens or 0, usage.total_tokens or 0)
+
+        def write(conn: sqlite3.Connection, turn: int) -> None:
+            conn.execute(
+                "INSERT OR REPLACE INTO turn_usage (session_id, branch_id, user_turn_number, requests, "
+                "input_tokens, output_tokens, total_tokens, input_tokens_details, output_tokens_details) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.session_id, self._current_branch_id, turn, *values, *details),
+            )
+
+        await self.write_for_turn(write)
+
+    async def write_for_turn(self, job: Callable[[sqlite3.Connection, int], None]) -> None:
+        """Queue ``job(conn, turn)`` after this session's pending writes.
+
+        ``turn`` is the user turn number those writes end on, the key the
+        SDK's turn_usage table uses.
+        """
+        await self.writer.submit(lambda conn: job(conn, self._turn_number(conn)))
+
+    # ----------------------------
+    # Writer thread
+    # ----------------------------
+
+    def _insert(self, conn: sqlite3.Connection, items: list[Any], data: list[str]) -> None:
+        # The same rows SQLiteSession.add_items and _add_structure_metadata write.
+        conn.execute(f"INSERT OR IGNORE INTO {self.sessions_table} (session_id) VALUES (?)", (self.session_id,))
+        seq = conn.execute(
+            "SELECT COALESCE(MAX(sequence_number), 0) FROM message_structure WHERE session_id = ?",
+            (self.session_id,),
+        ).fetchone()[0]
+        turn, branch_turn = conn.execute(
+            "SELECT COALESCE(MAX(user_turn_number), 0), COALESCE(MAX(branch_turn_number), 0) "
+            "FROM message_structure WHERE session_id = ? AND branch_id = ?",
+            (self.session_id, self._current_branch_id),
+        ).fetchone()
+
+        structure = []
+        for item, message in zip(items, data):
+            message_id = conn.execute(
+                f"INSERT INTO {self.messages_table} (session_id, message_data) VALUES (?, ?)",
+                (self.session_id, message),
+            ).lastrowid
+            if self._is_user_message(item):
+                turn += 1
+                branch_turn += 1
+            seq += 1
+            structure.append((
+                self.session_id, message_id, self._current_branch_id, self._classify_message_type(item),
+                seq, turn, branch_turn, self._extract_tool_name(item),
+            ))
+        conn.executemany(
+            "INSERT INTO message_structure (session_id, message_id, branch_id, message_type, "
+            "sequence_number, user_turn_number, branch_turn_number, tool_name) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            structure,
+        )
+        conn.execute(
+            f"UPDATE {self.sessions_table} SET updated_at = CURRENT_TIMESTAMP WHERE session_id = ?",
+            (self.session_id,),
+        )
+
+    def _committed(self) -> None:
+        # Jobs of one session finish in the order they were queued.
+        with self._pending_lock:
+            self._pending.popleft()
+
+    def _turn_number(self, conn: sqlite3.Connection) -> int:
+        return conn.execute(
+            "SELECT COALESCE(MAX(user_turn_number), 0) FROM message_structure WHERE session_id = ? AND branch_id = ?",
+            (self.session_id, self._current_branch_id),
+        ).fetchone()[0]
+
+
+def _loads(data: str) -> Any:
+    try:
+        return json.loads(data)
+    except json.JSONDecodeError:
+        return None
@@ -0,0 +1,164 @@
+"""Per-turn timing: SDK hooks, a timed session wrapper and the timings table.
+
+TimingHooks records every model call and tool call of a run into a
+TurnTimings. TimedSession does the same for session reads and writes. The
+finished spans are stored in session.db's ``turn_timings`` table, keyed like
+the SDK's ``turn_usage`` table (session_id, user_turn_number), so the two
+can be joined.
+"""
+import json
+import sqlite3
+import statistics
+import threading
+import time
+from typing import Any
+
+from agents import RunHooks
+from agents.memory.session import SessionABC
+
+from andro_cli.agent.models import Span, TurnTimings
+
+# Turns looked at by percentiles() unless asked otherwise.
+DEFAULT_WINDOW = 500
+
+
+class TimingHooks(RunHooks):
+    def __init__(self, timings: TurnTimings) -> None:
+        self.timings = timings
+        self._open: dict[Any, float] = {}
+
+    async def on_llm_start(self, context, agent, system_prompt, input_items) -> None:
+        self._open[("model", id(agent))] = time.perf_counter()
+
+    async def on_llm_end(self, context, agent, response) -> None:
+        started = self._open.pop(("model", id(agent)), None)
+        if started is not None:
+            self.timings.add("model", "model", time.perf_counter() - started)
+
+    async def on_tool_start(self, context, agent, tool) -> None:
+        # Parallel calls of the same tool are told apart by their call id.
+        self._open[("tool", getattr(context, "tool_call_id", tool.name))] = time.perf_counter()
+
+    async def on_tool_end(self, context, agent, tool, result) -> None:
+        started = self._open.pop(("tool", getattr(context, "tool_call_id", tool.name)), None)
+        if started is not None:
+            self.timings.add("tool", tool.name, time.perf_counter() - started)
+
+
+class TimedSession(SessionABC):
+    """Wraps a session for one turn and times its reads and writes as "db"."""
+
+    def __init__(self, inner: SessionABC, timings: TurnTimings) -> None:
+        self.inner = inner
+        self.timings = timings
+        self.session_id = inner.session_id
+        self.session_settings = getattr(inner, "session_settings", None)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.inner, name)
+
+    async def get_items(self, limit: int | None = None) -> list[Any]:
+        with self.timings.span("db", "get_items"):
+            return await self.inner.get_items(limit)
+
+    async def add_items(self, items: list[Any]) -> None:
+        with self.timings.span("db", "add_items"):
+            await self.inner.add_items(items)
+
+    async def pop_item(self) -> Any:
+        with self.timings.span("db", "pop_item"):
+            return await self.inner.pop_item()
+
+    async def clear_session(self) -> None:
+        await self.inner.clear_session()
+
+
+class TimingStore:
+    """Reads turn_timings, and writes it when there is no session writer.
+
+    With a SessionWriter, the table is created and filled by writer jobs
+    (``setup`` and ``insert``), so session.db keeps a single writer.
+    """
+
+    def __init__(self, db_path: str, create: bool = True) -> None:
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        if create:
+            with self._conn:
+                self.setup(self._conn)
+
+    @staticmethod
+    def setup(conn: sqlite3.Connection) -> None:
+        """Create the table through ``conn`` (e.g. the session writer's)."""
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS turn_timings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                user_turn_number INTEGER,
+                total REAL NOT NULL,
+                spans JSON NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_turn_timings_session ON turn_timings(session_id, id)"
+        )
+
+    def record(self, session_id: str, turn: int | None, timings: TurnTimings, total: float) -> None:
+        with self._lock, self._conn:
+            self.insert(self._conn, session_id, turn, timings, total)
+
+    @staticmethod
+    def insert(conn: sqlite3.Connection, session_id: str, turn: int | None, timings: TurnTimings, total: float) -> None:
+        """Add one turn's row through ``conn`` (e.g. the session writer's)."""
+        spans = [[s.stage, s.name, round(s.duration, 6)] for s in timings.spans]
+        conn.execute(
+            "INSERT INTO turn_timings (session_id, user_turn_number, total, spans) VALUES (?, ?, ?, ?)",
+            (session_id, turn, round(total, 6), json.dumps(spans)),
+        )
+
+    def percentiles(self, session_id: str | None = None, window: int = DEFAULT_WINDOW) -> dict[str, Any]:
+        """p50/p95 seconds per label over the last ``window`` turns.
+
+        Labels are those of TurnTimings.totals() plus "total". A label's
+        samples come only from turns where it occurred.
+        """
+        query = "SELECT total, spans FROM turn_timings"
+        params: tuple[Any, ...] = ()
+        if session_id is not None:
+            query += " WHERE session_id = ?"
+            params = (session_id,)
+        query += " ORDER BY id DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(query, (*params, window)).fetchall()
+
+        samples: dict[str, list[float]] = {"total": []}
+        for total, spans in rows:
+            samples["total"].append(total)
+            turn = TurnTimings(spans=[Span(*span) for span in json.loads(spans)])
+            for label, seconds in turn.totals().items():
+                samples.setdefault(label, []).append(seconds)
+
+        labels = {}
+        for label, values in sorted(samples.items(), key=lambda kv: _label_order(kv[0])):
+            if values:
+                labels[label] = {"p50": _percentile(values, 50), "p95": _percentile(values, 95), "turns": len(values)}
+        return {"turns": len(rows), "labels": labels}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _label_order(label: str) -> tuple[int, str]:
+    # total, model, tools by name, db, ui
+    fixed = {"total": 0, "model": 1, "db": 3, "ui": 4}
+    return fixed.get(label, 2), label
+
+
+def _percentile(values: list[float], pct: int) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
@@ -0,0 +1,614 @@
+"""Non-blocking versions of the system and network tools.
+
+Everything here runs on the event loop without blocking it. Commands go
+through asyncio subprocesses and network checks use asyncio sockets, so a
+30 s traceroute leaves the TUI responsive. Every call has an enforced
+timeout. A timed-out command is killed along with its children, and whatever
+output it produced before that is still returned.
+
+On Linux the process, disk and interface checks don't run commands at all:
+they read /proc and /sys through ``native`` in a worker thread.
+"""
+import asyncio
+import ipaddress
+import os
+import platform
+import signal
+import socket
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from . import native, system
+
+IS_WINDOWS = platform.system() == "Windows"
+
+MAX_CAPTURE_BYTES = 1024 * 1024  # per stream; the rest is dropped
+KILL_GRACE = 5.0  # seconds to wait for a killed process to be reaped
+
+
+@dataclass(slots=True)
+class ProcessResult:
+    returncode: int | None
+    stdout: str
+    stderr: str
+    timed_out: bool
+    elapsed: float
+
+    @property
+    def success(self) -> bool:
+        return self.returncode == 0 and not self.timed_out
+
+
+async def run_process(
+    args: list[str] | str,
+    timeout: float,
+    shell: bool = False,
+) -> ProcessResult:
+    """Run a command without blocking the event loop, killing it after ``timeout``."""
+    started = time.perf_counter()
+    # A new session lets a timeout kill the whole process group, including
+    # anything a shell command spawned.
+    kwargs: dict[str, Any] = {} if IS_WINDOWS else {"start_new_session": True}
+
+    if shell:
+        assert isinstance(args, str)
+        proc = await asyncio.create_subprocess_shell(
+            args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, **kwargs
+        )
+    else:
+        proc = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, **kwargs
+        )
+
+    stdout, stderr = bytearray(), bytearray()
+    readers = [
+        asyncio.create_task(_drain(proc.stdout, stdout)),
+        asyncio.create_task(_drain(proc.stderr, stderr)),
+    ]
+
+    try:
+        timed_out = not await wait_exit(proc, timeout)
+        if timed_out:
+            _kill(proc)
+            await wait_exit(proc, KILL_GRACE)
+
+        # Grandchildren can keep the pipes open; don't wait on them forever.
+        await asyncio.wait(readers, timeout=1)
+    finally:
+        # Also when cancelled (diagnose's deadline): don't leave it running.
+        if proc.returncode is None:
+            _kill(proc)
+        for reader in readers:
+            reader.cancel()
+
+    return ProcessResult(
+        returncode=None if timed_out else proc.returncode,
+        stdout=stdout.decode("utf-8", errors="replace"),
+        stderr=stderr.decode("utf-8", errors="replace"),
+        timed_out=timed_out,
+        elapsed=time.perf_counter() - started,
+    )
+
+
+async def wait_exit(proc: asyncio.subprocess.Process, timeout: float) -> bool:
+    """Wait for the process itself to exit; False if ``timeout`` passes first.
+
+    Process.wait() also waits for its pipes to close, and a background
+    grandchild (``sleep 10 &``) holds them open after the shell has exited.
+    The return code is set as soon as the child is reaped, so poll that,
+    quickly at first and then every 50 ms.
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.001
+    while proc.returncode is None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.05)
+    return True
+
+
+async def _drain(stream: asyncio.StreamReader | None, buffer: bytearray) -> None:
+    if stream is None:
+        return
+    while chunk := await stream.read(65536):
+        if len(buffer) < MAX_CAPTURE_BYTES:
+            buffer += chunk[: MAX_CAPTURE_BYTES - len(buffer)]
+
+
+def _kill(proc: asyncio.subprocess.Process) -> None:
+    try:
+        if IS_WINDOWS:
+            proc.kill()
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _command_result(result: ProcessResult, **extra: Any) -> dict[str, Any]:
+    out: dict[str, Any] = {
+        **extra,
+        "success": result.success,
+        "output": result.stdout,
+        "returncode": result.returncode,
+    }
+    if result.stderr and not result.success:
+        out["error"] = result.stderr
+    if result.timed_out:
+        out["timed_out"] = True
+        out["error"] = out.get("error") or "Command timed out"
+    return out
+
+
+async def _run_native(probe: Any, timeout: float, *args: Any) -> dict[str, Any]:
+    # In a thread: statvfs() on a dead network mount can block indefinitely.
+    try:
+        return await asyncio.wait_for(asyncio.to_thread(probe, *args), timeout)
+    except asyncio.TimeoutError:
+        return {"success": False, "timed_out": True, "error": "Probe timed out"}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+async def _run_tool(args: list[str], timeout: float, **extra: Any) -> dict[str, Any]:
+    try:
+        return _command_result(await run_process(args, timeout), **extra)
+    except FileNotFoundError as e:
+        return {**extra, "success": False, "error": f"Command not found: {e.filename}"}
+    except Exception as e:
+        return {**extra, "success": False, "error": str(e)}
+
+
+# ----------------------------
+# Network
+# ----------------------------
+
+async def ping(host: str = "8.8.8.8", count: int = 1, timeout: float = 10) -> dict[str, Any]:
+    """Ping a host to check connectivity."""
+    flag = "-n" if IS_WINDOWS else "-c"
+    return await _run_tool(["ping", flag, str(count), host], timeout, host=host)
+
+
+async def traceroute(host: str = "google.com", timeout: float = 30) -> dict[str, Any]:
+    """Perform a traceroute to a host."""
+    command = "tracert" if IS_WINDOWS else "traceroute"
+    return await _run_tool([command, host], timeout, host=host)
+
+
+async def check_dns(domain: str = "google.com", timeout: float = 5) -> dict[str, Any]:
+    """Check DNS resolution for a domain."""
+    loop = asyncio.get_running_loop()
+    try:
+        infos = await asyncio.wait_for(
+            loop.getaddrinfo(domain, None, type=socket.SOCK_STREAM), timeout
+        )
+    except asyncio.TimeoutError:
+        return {"domain": domain, "error": "DNS lookup timed out", "success": False, "timed_out": True}
+    except socket.gaierror as e:
+        return {"domain": domain, "error": str(e), "success": False}
+
+    addresses = list(dict.fromkeys(info[4][0] for info in infos))
+    ipv4 = [a for a in addresses if ":" not in a]
+    return {
+        "domain": domain,
+        "ip": (ipv4 or addresses)[0],
+        "addresses": addresses,
+        "success": True,
+    }
+
+
+async def get_local_ip() -> dict[str, Any]:
+    """Get the local IP address."""
+    # Connecting a UDP socket sends nothing; it only picks the outgoing route.
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.setblocking(False)
+        s.connect(("8.8.8.8", 80))
+        return {"ip": s.getsockname()[0], "success": True}
+    except Exception as e:
+        return {"error": str(e), "success": False}
+    finally:
+        s.close()
+
+
+async def check_port(host: str, port: int, timeout: float = 3) -> dict[str, Any]:
+    """Check if a port is open on a host."""
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except asyncio.TimeoutError:
+        return {"host": host, "port": port, "open": False, "timed_out": True}
+    except OSError as e:
+        return {"host": host, "port": port, "open": False, "error": str(e)}
+
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return {"host": host, "port": port, "open": True}
+
+
+# ----------------------------
+# Port scanning
+# ----------------------------
+
+MAX_SCAN_PROBES = 4096
+MAX_SCAN_CONCURRENCY = 500
+
+
+def parse_ports(spec: str) -> list[int]:
+    """Parse "22,80,8000-8010" into a sorted list of ports."""
+    ports: set[int] = set()
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        low, _, high = part.partition("-")
+        first, last = int(low), int(high or low)
+        if not 1 <= first <= last <= 65535:
+            raise ValueError(f"Invalid port range: {part}")
+        ports.update(range(first, last + 1))
+    return sorted(ports)
+
+
+def parse_hosts(spec: str) -> list[str]:
+    """Parse hosts: names, IPs, CIDR blocks (10.0.0.0/28) or last-octet ranges (10.0.0.1-20)."""
+    hosts: list[str] = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        if "/" in part:
+            network = ipaddress.ip_network(part, strict=False)
+            if network.num_addresses > MAX_SCAN_PROBES:
+                raise ValueError(f"Network too large: {part}")
+            hosts.extend(str(ip) for ip in (network.hosts() if network.num_addresses > 2 else network))
+        elif part.count(".") == 3 and "-" in part.rsplit(".", 1)[1]:
+            prefix, octets = part.rsplit(".", 1)
+            low, high = (int(o) for o in octets.split("-", 1))
+            if not 0 <= low <= high <= 255:
+                raise ValueError(f"Invalid address range: {part}")
+            hosts.extend(f"{prefix}.{o}" for o in range(low, high + 1))
+        else:
+            hosts.append(part)
+    return list(dict.fromkeys(hosts))
+
+
+async def _probe(address: str, port: int, timeout: float) -> tuple[str, float | None]:
+    """Classify one port as open, closed (refused) or filtered (no answer)."""
+    started = time.perf_counter()
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(address, port), timeout)
+    except asyncio.TimeoutError:
+        return "filtered", None
+    except ConnectionRefusedError:
+        return "closed", round((time.perf_counter() - started) * 1000, 1)
+    except OSError:
+        return "filtered", None
+
+    latency = round((time.perf_counter() - started) * 1000, 1)
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return "open", latency
+
+
+async def scan_ports(
+    hosts: str,
+    ports: str,
+    timeout: float = 1.0,
+    concurrency: int = 200,
+) -> dict[str, Any]:
+    """Probe every host/port pair concurrently and return an open/closed/filtered matrix."""
+    try:
+        host_list, port_list = parse_hosts(hosts), parse_ports(ports)
+    except ValueError as e:
+        return {"success": False, "error": str(e)}
+    if not host_list or not port_list:
+        return {"success": False, "error": "No hosts or ports to scan"}
+    if len(host_list) * len(port_list) > MAX_SCAN_PROBES:
+        return {"success": False, "error": f"Too many probes (max {MAX_SCAN_PROBES}); narrow the ranges"}
+
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    # Resolve each name once rather than once per port. A resolver that
+    # doesn't answer gets the same deadline as a port that doesn't.
+    resolved = await asyncio.gather(
+        *(asyncio.wait_for(loop.getaddrinfo(h, None, type=socket.SOCK_STREAM), timeout) for h in host_list),
+        return_exceptions=True,
+    )
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def probe(address: str, port: int) -> tuple[str, float | None]:
+        async with semaphore:
+            return await _probe(address, port, timeout)
+
+    report: dict[str, Any] = {}
+    jobs: list[tuple[str, int, asyncio.Future]] = []
+    for host, infos in zip(host_list, resolved):
+        if isinstance(infos, asyncio.TimeoutError):
+            report[host] = {"error": f"Cannot resolve: no answer within {timeout}s"}
+            continue
+        if isinstance(infos, BaseException):
+            report[host] = {"error": f"Cannot resolve: {infos}"}
+            continue
+        address = infos[0][4][0]
+        report[host] = {"address": address} if address != host else {}
+        jobs.extend((host, port, asyncio.ensure_future(probe(address, port))) for port in port_list)
+
+    await asyncio.gather(*(job for _, _, job in jobs))
+
+    counts = {"open": 0, "closed": 0, "filtered": 0}
+    by_host: dict[str, dict[str, list[int]]] = {}
+    for host, port, job in jobs:
+        state, latency = job.result()
+        counts[state] += 1
+        if state == "open":
+            report[host].setdefault("open", {})[str(port)] = latency
+        else:
+            by_host.setdefault(host, {}).setdefault(state, []).append(port)
+    for host, states in by_host.items():
+        for state, state_ports in states.items():
+            report[host][state] = _port_ranges(state_ports)
+
+    return {
+        "success": True,
+        "hosts": report,
+        "counts": counts,
+        "probes": len(jobs),
+        "elapsed": round(time.perf_counter() - started, 3),
+    }
+
+
+def _port_ranges(ports: list[int]) -> str:
+    """Compress [20, 21, 22, 80] to "20-22,80"."""
+    ranges: list[str] = []
+    start = prev = ports[0]
+    for port in ports[1:] + [None]:
+        if port is not None and port == prev + 1:
+            prev = port
+            continue
+        ranges.append(str(start) if start == prev else f"{start}-{prev}")
+        if port is not None:
+            start = prev = port
+    return ",".join(ranges)
+
+
+# ----------------------------
+# System
+# ----------------------------
+
+async def get_system_info() -> dict[str, Any]:
+    """Get basic system information."""
+    # platform.processor() can shell out to uname, so keep it off the loop.
+    return await asyncio.to_thread(system.get_system_info)
+
+
+async def check_disk(timeout: float = 10, min_used_percent: float = 0) -> dict[str, Any]:
+    """Check disk space usage."""
+    if native.AVAILABLE:
+        return await _run_native(native.disks, timeout, min_used_percent)
+    if IS_WINDOWS:
+        return await _run_tool(["wmic", "logicaldisk", "get", "size,freespace,caption"], timeout)
+    return await _run_tool(["df", "-h"], timeout)
+
+
+async def check_processes(
+    timeout: float = 10,
+    sort_by: str = "cpu",
+    limit: int = native.DEFAULT_PROCESS_LIMIT,
+    name: str = "",
+) -> dict[str, Any]:
+    """List running processes (the top ``limit`` by CPU or memory on Linux)."""
+    if native.AVAILABLE:
+        return await _run_native(native.processes, timeout, sort_by, limit, name)
+    if IS_WINDOWS:
+        return await _run_tool(["tasklist", "/fo", "table"], timeout)
+    return await _run_tool(["ps", "aux"], timeout)
+
+
+async def list_interfaces(timeout: float = 10, up_only: bool = False) -> dict[str, Any]:
+    if native.AVAILABLE:
+        return await _run_native(native.interfaces, timeout, up_only)
+    return await _run_tool(["ipconfig"] if IS_WINDOWS else ["ip", "addr"], timeout)
+
+
+async def check_network(timeout: float = 10, up_only: bool = False) -> dict[str, Any]:
+    """Check internet connectivity and list network interfaces."""
+    ping_result, interfaces = await asyncio.gather(
+        ping("8.8.8.8", 1, timeout=min(timeout, 5)),
+        list_interfaces(timeout, up_only),
+    )
+    if "interfaces" in interfaces:
+        listing = interfaces["interfaces"]
+    else:
+        listing = interfaces.get("output") or interfaces.get("error", "")
+    return {
+        "ping": "OK" if ping_result.get("success") else "Failed",
+        "interfaces": listing,
+    }
+
+
+# ----------------------------
+# Diagnostics sweep
+# ----------------------------
+
+# Extra time a probe gets past the deadline to return its partial output
+# before it is cancelled outright.
+DIAGNOSE_GRACE = 1.0
+# Processes listed by diagnose (busiest first).
+DIAGNOSE_PROCESSES = 10
+
+
+async def diagnose(timeout: float = 15, dns_domain: str = "google.com", ping_host: str = "8.8.8.8") -> dict[str, Any]:
+    """Run every system and network probe at once under a single deadline.
+
+    Command probes get the deadline as their own timeout, so one that runs
+    long is killed and reports what it printed so far. Anything still running
+    after the grace period is cancelled and reported as timed out.
+    """
+    probes = {
+        "system": get_system_info(),
+        "local_ip": get_local_ip(),
+        "dns": check_dns(dns_domain, timeout=timeout),
+        "ping": ping(ping_host, 1, timeout=timeout),
+        "interfaces": list_interfaces(timeout),
+        "disk": check_disk(timeout),
+        "processes": check_processes(timeout, limit=DIAGNOSE_PROCESSES),
+    }
+
+    started = time.perf_counter()
+    tasks = {name: asyncio.create_task(_timed(probe)) for name, probe in probes.items()}
+    await asyncio.wait(tasks.values(), timeout=timeout + DIAGNOSE_GRACE)
+
+    report: dict[str, Any] = {}
+    timed_out: list[str] = []
+    for name, task in tasks.items():
+        if not task.done():
+            task.cancel()
+            report[name] = {"success": False, "timed_out": True, "error": "Probe did not finish before the deadline"}
+        elif task.exception() is not None:
+            report[name] = {"success": False, "error": str(task.exception())}
+        else:
+            report[name] = task.result()
+        if report[name].get("timed_out"):
+            timed_out.append(name)
+
+    return {
+        "probes": report,
+        "failed": [name for name, result in report.items() if result.get("success") is False],
+        "timed_out": timed_out,
+        "elapsed": round(time.perf_counter() - started, 3),
+    }
+
+
+async def _timed(probe: Any) -> dict[str, Any]:
+    started = time.perf_counter()
+    result = await probe
+    return {**result, "elapsed": round(time.perf_counter() - started, 3)}
+
+
+from agents import function_tool
+
+from .cache import ToolCache
+
+# Upper bounds for the timeouts the model may ask for.
+MAX_COMMAND_TIMEOUT = 300
+MAX_NETWORK_TIMEOUT = 60
+
+
+def build_system_tools(cache: ToolCache | None = None):
+    def memo(name: str):
+        return cache.cached(name) if cache else (lambda fn: fn)
+
+    @function_tool(name_override="ping")
+    async def ping_tool(host: str = "8.8.8.8", count: int = 1) -> dict:
+        """Ping a host to check connectivity."""
+        count = min(max(count, 1), 10)
+        return await ping(host, count, timeout=10 + count)
+
+    @function_tool(name_override="traceroute")
+    async def traceroute_tool(host: str = "google.com") -> dict:
+        """Trace the network route to a host (can take up to 30 seconds)."""
+        return await traceroute(host)
+
+    @function_tool(name_override="check_dns")
+    @memo("check_dns")
+    async def check_dns_tool(domain: str = "google.com") -> dict:
+        """Check DNS resolution for a domain."""
+        return await check_dns(domain)
+
+    @function_tool(name_override="get_local_ip")
+    @memo("get_local_ip")
+    async def get_local_ip_tool() -> dict:
+        """Get this computer's local IP address."""
+        return await get_local_ip()
+
+    @function_tool(name_override="check_port")
+    async def check_port_tool(host: str, port: int, timeout: float = 3) -> dict:
+        """Check if a TCP port is open on a host."""
+        return await check_port(host, port, min(max(timeout, 0.1), MAX_NETWORK_TIMEOUT))
+
+    @function_tool(name_override="scan_ports")
+    async def scan_ports_tool(hosts: str, ports: str, timeout: float = 1.0, concurrency: int = 200) -> dict:
+        """Check many TCP ports on one or more hosts at once.
+
+        Use this instead of repeated check_port calls. Each port comes back as
+        open (with connect latency in ms), closed (refused) or filtered (no answer).
+
+        Args:
+            hosts: Comma-separated hosts, IPs, CIDR blocks ("10.0.0.0/28") or ranges ("10.0.0.1-20").
+            ports: Comma-separated ports and ranges, e.g. "22,80,443,8000-8010".
+            timeout: Seconds to wait for each connection.
+            concurrency: Maximum connections in flight.
+        """
+        return await scan_ports(
+            hosts,
+            ports,
+            min(max(timeout, 0.1), MAX_NETWORK_TIMEOUT),
+            min(max(concurrency, 1), MAX_SCAN_CONCURRENCY),
+        )
+
+    @function_tool(name_override="get_system_info")
+    @memo("get_system_info")
+    async def get_system_info_tool() -> dict:
+        """Get basic operating system and hardware information."""
+        return await get_system_info()
+
+    @function_tool(name_override="check_disk")
+    @memo("check_disk")
+    async def check_disk_tool(min_used_percent: float = 0) -> dict:
+        """Check disk space usage per mounted filesystem, fullest first.
+
+        Args:
+            min_used_percent: Only list filesystems at least this full, e.g. 80.
+        """
+        return await check_disk(min_used_percent=min_used_percent)
+
+    @function_tool(name_override="check_processes")
+    async def check_processes_tool(sort_by: str = "cpu", limit: int = 15, name: str = "") -> dict:
+        """List the busiest running processes with CPU, memory and command line.
+
+        Args:
+            sort_by: "cpu" or "memory".
+            limit: How many processes to return.
+            name: Only processes whose name or command line contains this text.
+        """
+        return await check_processes(sort_by=sort_by, limit=limit, name=name)
+
+    @function_tool(name_override="check_network")
+    async def check_network_tool(up_only: bool = False) -> dict:
+        """Check internet connectivity and list network interfaces with their addresses.
+
+        Args:
+            up_only: Only list interfaces that are up.
+        """
+        return await check_network(up_only=up_only)
+
+    @function_tool(name_override="diagnose")
+    async def diagnose_tool(timeout: float = 15, dns_domain: str = "google.com") -> dict:
+        """Full health snapshot in one call: system info, local IP, DNS, ping, interfaces, disk and processes, all run in parallel.
+
+        Prefer this over calling the individual checks one by one. Probes that
+        miss the deadline are listed under timed_out with whatever partial
+        output they produced.
+
+        Args:
+            timeout: Overall deadline in seconds (max 60).
+            dns_domain: Domain used for the DNS check.
+        """
+        return await diagnose(min(max(timeout, 1), MAX_NETWORK_TIMEOUT), dns_domain)
+
+    return [
+        diagnose_tool,
+        ping_tool,
+        traceroute_tool,
+        check_dns_tool,
+        get_local_ip_tool,
+        check_port_tool,
+        scan_ports_tool,
+        get_system_info_tool,
+        check_disk_tool,
+        check_processes_tool,
+        check_network_tool,
+    ]
@@ -0,0 +1,138 @@
+"""TTL + LRU cache for deterministic tool results.
+
+Within a session the agent tends to repeat the same lookups (system info,
+DNS, disk usage). ToolCache keys results by tool name and arguments and
+keeps each one for that tool's TTL. Tools that change the machine
+(run_command, write, edit) call invalidate() so nothing stale survives them.
+"""
+import inspect
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Awaitable, Callable
+
+# Seconds a result stays fresh; tools not listed here are never cached.
+DEFAULT_TTLS: dict[str, float] = {
+    "get_system_info": math.inf,
+    "get_local_ip": 60,
+    "check_dns": 30,
+    "check_disk": 10,
+}
+DEFAULT_MAX_ENTRIES = 256
+
+
+@dataclass(slots=True)
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    per_tool: dict[str, list[int]] = field(default_factory=dict)  # name -> [hits, misses]
+
+    def record(self, name: str, hit: bool) -> None:
+        counts = self.per_tool.setdefault(name, [0, 0])
+        if hit:
+            self.hits += 1
+            counts[0] += 1
+        else:
+            self.misses += 1
+            counts[1] += 1
+
+
+class ToolCache:
+    def __init__(
+        self,
+        ttls: dict[str, float] | None = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, tuple[float, float, dict[str, Any]]] = OrderedDict()
+        # The sync write tool runs in a worker thread and invalidates from there.
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(name: str, args: dict[str, Any]) -> str:
+        return name + ":" + json.dumps(args, sort_keys=True, default=str)
+
+    def get(self, name: str, args: dict[str, Any]) -> dict[str, Any] | None:
+        """Return a fresh cached result, tagged with its age, or None."""
+        key = self.key(name, args)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            self.stats.record(name, hit=entry is not None)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        _, stored_at, value = entry
+        return {**value, "cached_age": round(now - stored_at, 1)}
+
+    def put(self, name: str, args: dict[str, Any], value: dict[str, Any]) -> None:
+        ttl = self.ttls.get(name, 0)
+        # Failures are usually transient; don't pin them.
+        if ttl <= 0 or value.get("success") is False or "error" in value:
+            return
+        now = time.monotonic()
+        with self._lock:
+            key = self.key(name, args)
+            self._entries[key] = (now + ttl, now, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def invalidate(self, name: str | None = None) -> int:
+        """Drop every entry (or only ``name``'s); returns how many were dropped."""
+        with self._lock:
+            if name is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+            else:
+                keys = [k for k in self._entries if k.startswith(name + ":")]
+                for k in keys:
+                    del self._entries[k]
+                dropped = len(keys)
+            self.stats.invalidations += 1
+        return dropped
+
+    def cached(self, name: str) -> Callable:
+        """Decorator for an async tool function whose result may be memoized."""
+        def decorator(fn: Callable[..., Awaitable[dict[str, Any]]]) -> Callable[..., Awaitable[dict[str, Any]]]:
+            signature = inspect.signature(fn)
+
+            @wraps(fn)
+            async def wrapper(*args: Any, **kwargs: Any) -> dict[str, Any]:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                call_args = dict(bound.arguments)
+                hit = self.get(name, call_args)
+                if hit is not None:
+                    return hit
+                result = await fn(*args, **kwargs)
+                self.put(name, call_args, result)
+                return result
+            return wrapper
+        return decorator
+
+    def summary(self) -> dict[str, Any]:
+        with self._lock:
+            entries = len(self._entries)
+        lookups = self.stats.hits + self.stats.misses
+        return {
+            "entries": entries,
+            "hits": self.stats.hits,
+            "misses": self.stats.misses,
+            "hit_rate": round(self.stats.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.stats.evictions,
+            "invalidations": self.stats.invalidations,
+            "per_tool": {name: {"hits": h, "misses": m} for name, (h, m) in self.stats.per_tool.items()},
+        }
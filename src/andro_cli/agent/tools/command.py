@@ -0,0 +1,215 @@
+"""Streaming shell command execution with bounded memory.
+
+run_streaming reads a command's combined stdout/stderr as it is produced:
+
+- each batch of complete lines is sent to an ``on_output`` callback (the TUI
+  shows them live);
+- every byte is written to a spool file under ``~/.cli_agent/spool``;
+- only the first HEAD_LINES and last TAIL_LINES stay in memory, and those are
+  what goes back to the model.
+
+The agent can page through the full spool later with read_command_output.
+"""
+import asyncio
+import os
+import re
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable
+
+from .async_tools import IS_WINDOWS, KILL_GRACE, MAX_COMMAND_TIMEOUT, _kill, wait_exit
+from .files import LineIndex
+
+HEAD_LINES = 40
+TAIL_LINES = 120
+MAX_LINE_CHARS = 2000  # longer lines are clipped in memory (not in the spool)
+MAX_SPOOL_FILES = 20
+READ_CHUNK = 65536
+
+_SPOOL_NAME = re.compile(r"^cmd-[0-9]+-[0-9]+\.log$")
+
+
+class OutputSpool:
+    """Head and tail of a command's output in memory, the whole of it on disk."""
+
+    def __init__(self, spool_dir: Path) -> None:
+        spool_dir.mkdir(parents=True, exist_ok=True)
+        _prune(spool_dir)
+        self.path = spool_dir / f"cmd-{time.time_ns()}-{os.getpid()}.log"
+        self._file = open(self.path, "wb")
+        self.head: list[str] = []
+        self.tail: deque[str] = deque(maxlen=TAIL_LINES)
+        self.total_lines = 0
+        self.total_bytes = 0
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+        self.total_bytes += len(data)
+
+    def add_line(self, line: str) -> None:
+        if len(line) > MAX_LINE_CHARS:
+            line = line[:MAX_LINE_CHARS] + " …"
+        self.total_lines += 1
+        if len(self.head) < HEAD_LINES:
+            self.head.append(line)
+        else:
+            self.tail.append(line)
+
+    def close(self) -> None:
+        self._file.close()
+
+    @property
+    def omitted(self) -> int:
+        return self.total_lines - len(self.head) - len(self.tail)
+
+    def summary(self) -> str:
+        lines = list(self.head)
+        if self.omitted:
+            lines.append(f"[... {self.omitted} lines omitted; use read_command_output to see them ...]")
+        lines.extend(self.tail)
+        return "\n".join(lines)
+
+
+def _prune(spool_dir: Path) -> None:
+    spools = sorted(p for p in spool_dir.iterdir() if _SPOOL_NAME.match(p.name))
+    for old in spools[: max(len(spools) - MAX_SPOOL_FILES + 1, 0)]:
+        old.unlink(missing_ok=True)
+
+
+async def run_streaming(
+    command: str,
+    timeout: float,
+    spool_dir: Path,
+    on_output: Callable[[str], None] | None = None,
+) -> dict[str, Any]:
+    """Run a shell command, streaming its output; kill it after ``timeout`` seconds."""
+    # Before the process starts: if the spool can't be made, nothing runs.
+    spool = OutputSpool(spool_dir)
+    kwargs: dict[str, Any] = {} if IS_WINDOWS else {"start_new_session": True}
+    try:
+        proc = await asyncio.create_subprocess_shell(
+            command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            **kwargs,
+        )
+    except BaseException:
+        spool.close()
+        raise
+
+    async def pump() -> None:
+        assert proc.stdout is not None
+        partial = b""
+        while chunk := await proc.stdout.read(READ_CHUNK):
+            spool.write(chunk)
+            *complete, partial = (partial + chunk).split(b"\n")
+            if complete:
+                lines = [line.decode("utf-8", errors="replace") for line in complete]
+                for line in lines:
+                    spool.add_line(line)
+                if on_output:
+                    on_output("\n".join(lines))
+            # A single line longer than the clip limit is not worth buffering.
+            if len(partial) > MAX_LINE_CHARS * 4:
+                spool.add_line(partial.decode("utf-8", errors="replace"))
+                partial = b""
+        if partial:
+            line = partial.decode("utf-8", errors="replace")
+            spool.add_line(line)
+            if on_output:
+                on_output(line)
+
+    reader = asyncio.create_task(pump())
+    try:
+        # Exit, not pipe EOF: a background job may keep the pipe open.
+        timed_out = not await wait_exit(proc, timeout)
+        if timed_out:
+            _kill(proc)
+            await wait_exit(proc, KILL_GRACE)
+    finally:
+        # Also when the turn is cancelled: don't leave the command running.
+        if proc.returncode is None:
+            _kill(proc)
+            await wait_exit(proc, KILL_GRACE)
+        # Grandchildren can hold the pipe open after the shell exits.
+        await asyncio.wait([reader], timeout=1)
+        reader.cancel()
+        spool.close()
+
+    result: dict[str, Any] = {
+        "success": proc.returncode == 0 and not timed_out,
+        "returncode": None if timed_out else proc.returncode,
+        "output": spool.summary(),
+        "total_lines": spool.total_lines,
+        "output_id": spool.path.name,
+    }
+    if spool.omitted:
+        result["truncated"] = True
+    if timed_out:
+        result["timed_out"] = True
+        result["error"] = "Command timed out"
+    return result
+
+
+def read_spool(spool_dir: Path, output_id: str, offset: int = 0, limit: int = 200) -> dict[str, Any]:
+    """Page through the full output of an earlier command."""
+    if not _SPOOL_NAME.match(output_id):
+        return {"error": "Unknown output_id"}
+    path = spool_dir / output_id
+    if not path.exists():
+        return {"error": "Output no longer available"}
+    result = LineIndex(path).read_lines(max(offset, 0), min(max(limit, 1), 2000), 256 * 1024)
+    if not result["eof"]:
+        result["next_offset"] = result["end_line"]
+    return result
+
+
+from agents import RunContextWrapper, function_tool
+
+from andro_cli.agent.models import CommandOutput
+
+from .cache import ToolCache
+
+
+def build_command_tools(spool_dir: Path, cache: ToolCache | None = None):
+
+    @function_tool
+    async def run_command(ctx: RunContextWrapper[Any], command: str, timeout: float = 60) -> dict:
+        """Run a shell command and return its output. Ask the user before running anything that changes the system.
+
+        Long output is cut to its first and last lines; use read_command_output
+        with the returned output_id to read the rest.
+
+        Args:
+            command: The shell command line to run.
+            timeout: Seconds before the command is killed (max 300).
+        """
+        emit = getattr(ctx.context, "emit", None)
+        on_output = (lambda text: emit(CommandOutput(text))) if emit else None
+        try:
+            return await run_streaming(
+                command,
+                min(max(timeout, 1), MAX_COMMAND_TIMEOUT),
+                spool_dir,
+                on_output,
+            )
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        finally:
+            # A command can change anything the cached tools report on.
+            if cache:
+                cache.invalidate()
+
+    @function_tool
+    def read_command_output(output_id: str, offset: int = 0, limit: int = 200) -> dict:
+        """Read lines from the full output of an earlier run_command call.
+
+        Args:
+            output_id: The output_id returned by run_command.
+            offset: First line to return (0-based).
+            limit: Number of lines to return.
+        """
+        return read_spool(spool_dir, output_id, offset, limit)
+
+    return [run_command, read_command_output]
@@ -1,5 +1,336 @@
+import difflib
+import mmap
+import os
+import re
+import tempfile
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Iterable, Iterator
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class LineIndex:
+    """Sparse line-offset index for one file, read through mmap.
+
+    The file is scanned in CHUNK-sized blocks, counting newlines at C speed.
+    For each block, the line number and byte offset of the last line starting
+    in it is kept. The index only grows as far as the furthest line asked for.
+    Reading deep into a multi-GB file therefore scans up to that point once;
+    later reads jump to the nearest checkpoint and walk at most one block.
+    """
+
+    CHUNK = 64 * 1024
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        st = path.stat()
+        self.signature = (st.st_size, st.st_mtime_ns)
+        # Checkpoint k: line _lines[k] starts at byte _offsets[k].
+        self._lines = [0]
+        self._offsets = [0]
+        self._scanned = 0  # bytes indexed so far
+        self._newlines = 0  # newlines in the indexed bytes
+        self.total_lines: int | None = None  # known once the index reaches EOF
+
+    def is_current(self) -> bool:
+        st = self.path.stat()
+        return (st.st_size, st.st_mtime_ns) == self.signature
+
+    def read_lines(self, start: int, count: int, max_bytes: int) -> dict[str, Any]:
+        """Return ``count`` lines starting at 0-based line ``start``."""
+        with self._map() as mm:
+            if mm is None:
+                return {"content": "", "start_line": start, "end_line": start, "eof": True}
+
+            begin = self._line_offset(mm, start)
+            if begin is None:
+                return {"content": "", "start_line": start, "end_line": start, "eof": True}
+
+            pos, lines = begin, 0
+            while lines < count and pos < len(mm) and pos - begin < max_bytes:
+                nl = mm.find(b"\n", pos)
+                pos = len(mm) if nl == -1 else nl + 1
+                lines += 1
+            end = min(pos, begin + max_bytes)
+
+            result = {
+                "content": mm[begin:end].decode("utf-8", errors="replace"),
+                "start_line": start,
+                "end_line": start + lines,
+                "eof": end >= len(mm),
+                "truncated": end < pos,
+            }
+            if self.total_lines is not None:
+                result["total_lines"] = self.total_lines
+            return result
+
+    def tail(self, count: int, max_bytes: int) -> dict[str, Any]:
+        """Return the last ``count`` lines, scanning backwards from EOF."""
+        with self._map() as mm:
+            if mm is None:
+                return {"content": "", "eof": True}
+
+            end = len(mm)
+            # A trailing newline ends the last line rather than starting a new one.
+            pos = end - 1 if mm[end - 1:end] == b"\n" else end
+            begin = 0
+            for _ in range(count):
+                nl = mm.rfind(b"\n", 0, pos)
+                if nl == -1:
+                    begin = 0
+                    break
+                begin, pos = nl + 1, nl
+            begin = max(begin, end - max_bytes)
+
+            return {
+                "content": mm[begin:end].decode("utf-8", errors="replace"),
+                "start_byte": begin,
+                "eof": True,
+            }
+
+    def read_bytes(self, start: int, length: int) -> dict[str, Any]:
+        """Return ``length`` bytes from ``start``; a negative start counts from EOF."""
+        with self._map() as mm:
+            size = 0 if mm is None else len(mm)
+            if start < 0:
+                start = max(size + start, 0)
+            end = min(start + length, size)
+            data = b"" if mm is None or start >= size else mm[start:end]
+            return {
+                "content": data.decode("utf-8", errors="replace"),
+                "start_byte": start,
+                "end_byte": max(end, start),
+                "size": size,
+                "eof": end >= size,
+            }
+
+    def _map(self):
+        return _MappedFile(self.path)
+
+    def _line_offset(self, mm: mmap.mmap, line: int) -> int | None:
+        """Byte offset where ``line`` starts, or None past EOF."""
+        while self._lines[-1] < line and self.total_lines is None:
+            self._extend(mm)
+
+        k = bisect_right(self._lines, line) - 1
+        pos: int | None = self._offsets[k]
+        for _ in range(line - self._lines[k]):
+            pos = _next_line(mm, pos)
+            if pos is None:
+                return None
+        return pos
+
+    def _extend(self, mm: mmap.mmap) -> None:
+        start = self._scanned
+        end = min(start + self.CHUNK, len(mm))
+        newlines = mm[start:end].count(b"\n")
+
+        if newlines:
+            last_start = mm.rfind(b"\n", start, end) + 1
+            line = self._newlines + newlines
+            if last_start < len(mm) and line > self._lines[-1]:
+                self._lines.append(line)
+                self._offsets.append(last_start)
+
+        self._scanned = end
+        self._newlines += newlines
+        if end >= len(mm):
+            # A final line without a trailing newline still counts.
+            self.total_lines = self._newlines + (mm[-1:] != b"\n")
+
+
+def _next_line(mm: mmap.mmap, pos: int) -> int | None:
+    """Start of the line after the one starting at ``pos``, or None at the last line."""
+    nl = mm.find(b"\n", pos)
+    if nl == -1 or nl + 1 >= len(mm):
+        return None
+    return nl + 1
+
+
+class _MappedFile:
+    """Context manager yielding a read-only mmap, or None for an empty file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._file = None
+        self._mm: mmap.mmap | None = None
+
+    def __enter__(self) -> mmap.mmap | None:
+        self._file = open(self.path, "rb")
+        if self.path.stat().st_size:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mm
+
+    def __exit__(self, *exc) -> None:
+        if self._mm is not None:
+            self._mm.close()
+        if self._file is not None:
+            self._file.close()
+
+
+@dataclass
+class EditHunk:
+    """Replace the one occurrence of ``search`` with ``replace``."""
+
+    search: str
+    replace: str
+
+
+def _umask() -> int | None:
+    """The process umask, read without changing it; None where that can't be done.
+
+    os.umask() only reports the old mask by setting a new one, and that
+    would briefly apply to files every other thread creates.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    """Write ``data`` to a temp file next to ``path`` and rename it over ``path``.
+
+    Readers see either the old or the new file, never a partial one, and a
+    failed write leaves the old file as it was. A new file gets the mode
+    open() would have given it, or stays private if the umask is unknown.
+    """
+    if path.exists():
+        mode = path.stat().st_mode & 0o7777
+    else:
+        umask = _umask()
+        mode = None if umask is None else 0o666 & ~umask
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if mode is not None:
+            os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _apply_hunks(text: str, hunks: list[EditHunk]) -> str:
+    for n, hunk in enumerate(hunks, 1):
+        if not hunk.search:
+            raise ValueError(f"Hunk {n}: search text is empty.")
+        count = text.count(hunk.search)
+        if count == 0:
+            raise ValueError(f"Hunk {n}: search text not found. Read the file and copy the lines exactly.")
+        if count > 1:
+            raise ValueError(f"Hunk {n}: search text occurs {count} times. Include more surrounding lines.")
+        text = text.replace(hunk.search, hunk.replace, 1)
+    return text
+
+
+def _parse_unified_diff(diff: str) -> list[tuple[int, list[str], list[str]]]:
+    """(0-based old start, old lines, new lines) for each hunk of a one-file diff.
+
+    Line counts in the @@ headers are not trusted: a hunk runs until the next
+    header or the first line that isn't context, "-" or "+". They only decide
+    whether a "---"/"+++" pair is a file header or a removed "-- x" line
+    followed by an added "++ y": while the hunk still has lines to come, it
+    is the latter.
+    """
+    hunks: list[tuple[int, list[str], list[str]]] = []
+    current: tuple[int, list[str], list[str]] | None = None
+    old_left = new_left = 0  # lines the current hunk's header has yet to see
+    lines = diff.splitlines()
+    for i, line in enumerate(lines):
+        m = _HUNK_HEADER.match(line)
+        if m:
+            old_start, old_count = int(m.group(1)), m.group(2)
+            # "-N,0" inserts after line N; otherwise the hunk starts at line N.
+            start = old_start if old_count == "0" else max(old_start - 1, 0)
+            current = (start, [], [])
+            hunks.append(current)
+            old_left = int(old_count or 1)
+            new_left = int(m.group(4) or 1)
+            continue
+        if (
+            (current is None or (old_left <= 0 and new_left <= 0))
+            and line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ ")
+        ):
+            if hunks:
+                raise ValueError("The diff covers more than one file; edit one file at a time.")
+            current = None
+            continue
+        if current is None or line.startswith("\\"):
+            continue  # headers, "\ No newline at end of file"
+        tag, body = line[:1], line[1:]
+        if tag == " " or line == "":
+            # A blank context line often loses its leading space.
+            current[1].append(body)
+            current[2].append(body)
+            old_left -= 1
+            new_left -= 1
+        elif tag == "-":
+            current[1].append(body)
+            old_left -= 1
+        elif tag == "+":
+            current[2].append(body)
+            new_left -= 1
+        else:
+            current = None
+    if not hunks:
+        raise ValueError("No @@ hunks found in the diff.")
+    return hunks
+
+
+def _apply_unified_diff(text: str, diff: str) -> tuple[str, int]:
+    """Apply a one-file unified diff; returns the new text and the hunk count."""
+    hunks = _parse_unified_diff(diff)
+    trailing_newline = text.endswith("\n")
+    lines = text.split("\n")
+    if trailing_newline:
+        lines.pop()
+
+    shift = 0  # lines added minus removed by earlier hunks
+    floor = 0  # hunks apply in order, each after the previous one
+    for n, (start, old, new) in enumerate(hunks, 1):
+        expected = start + shift
+        if not old:
+            at = min(max(expected, floor), len(lines))
+        else:
+            at = _find_block(lines, old, expected, floor)
+            if at is None:
+                raise ValueError(
+                    f"Hunk {n} (line {start + 1}): its context and removed lines don't match the file. "
+                    "Read the file again and regenerate the diff."
+                )
+        lines[at:at + len(old)] = new
+        shift += len(new) - len(old)
+        floor = at + len(new)
+
+    result = "\n".join(lines)
+    return (result + "\n" if trailing_newline and lines else result), len(hunks)
+
+
+def _find_block(lines: list[str], block: list[str], expected: int, floor: int) -> int | None:
+    """Start of the occurrence of ``block`` at or after ``floor`` nearest to ``expected``."""
+    best = None
+    first, size = block[0], len(block)
+    for i in range(floor, len(lines) - size + 1):
+        if lines[i] == first and lines[i:i + size] == block:
+            if best is None or abs(i - expected) < abs(best - expected):
+                best = i
+            elif i > expected:
+                break
+    return best
 
 
 class SecureFileSystem:
@@ -13,10 +344,24 @@ class SecureFileSystem:
     }
 
     DEFAULT_ALLOWED_EXT = {
-        ".py", ".md", ".txt", ".json", ".yaml", ".yml", ".csv", ".html", ".css", ".js"
+        ".py", ".md", ".txt", ".json", ".yaml", ".yml", ".csv", ".html", ".css", ".js", ".log"
     }
 
-    MAX_FILE_SIZE = 2 * 1024 * 1024  # 2MB
+    MAX_FILE_SIZE = 2 * 1024 * 1024  # 2MB, largest file returned whole or edited
+
+    # Lines of diff returned by edit()
+    MAX_EDIT_DIFF_LINES = 80
+
+    # Ranged reads
+    DEFAULT_READ_LINES = 500
+    MAX_READ_LINES = 2000
+    MAX_READ_BYTES = 256 * 1024
+    MAX_CACHED_INDEXES = 32
+
+    # Directory listings
+    DEFAULT_LS_LIMIT = 200
+    MAX_LS_LIMIT = 1000
+    MAX_LS_DEPTH = 10
 
     def __init__(
         self,
@@ -30,6 +375,8 @@ class SecureFileSystem:
         self.deny_names = set(deny_names or self.DEFAULT_DENY)
         self.allowed_ext = set(allowed_ext or self.DEFAULT_ALLOWED_EXT)
 
+        self._line_indexes: OrderedDict[Path, LineIndex] = OrderedDict()
+
     # ----------------------------
     # Internal helpers
     # ----------------------------
@@ -49,23 +396,61 @@ class SecureFileSystem:
         if path.suffix not in self.allowed_ext:
             raise ValueError("File type not allowed.")
 
+    def _readable(self, path: str) -> Path:
+        p = self._resolve(path)
+        if not p.exists() or not p.is_file():
+            raise FileNotFoundError("File not found")
+        self._check_extension(p)
+        return p
+
+    def _line_index(self, p: Path) -> LineIndex:
+        index = self._line_indexes.get(p)
+        if index is None or not index.is_current():
+            index = LineIndex(p)
+            self._line_indexes[p] = index
+        self._line_indexes.move_to_end(p)
+        while len(self._line_indexes) > self.MAX_CACHED_INDEXES:
+            self._line_indexes.popitem(last=False)
+        return index
+
     # ----------------------------
     # Public commands
     # ----------------------------
 
-    def read(self, path: str) -> dict[str, Any]:
+    def read(self, path: str, offset: int = 0, limit: int | None = None) -> dict[str, Any]:
+        """Read a file, or ``limit`` lines from 0-based line ``offset``.
+
+        Small files with no range given come back whole. Larger files are
+        paged, and ``next_offset`` tells the caller where to continue.
+        """
         try:
-            p = self._resolve(path)
-            if not p.exists() or not p.is_file():
-                return {"error": "File not found"}
+            p = self._readable(path)
 
-            self._check_extension(p)
+            if offset == 0 and limit is None and p.stat().st_size <= self.MAX_FILE_SIZE:
+                return {"content": p.read_text(encoding="utf-8")}
 
-            if p.stat().st_size > self.MAX_FILE_SIZE:
-                return {"error": "File too large"}
+            count = min(limit or self.DEFAULT_READ_LINES, self.MAX_READ_LINES)
+            result = self._line_index(p).read_lines(max(offset, 0), count, self.MAX_READ_BYTES)
+            if not result["eof"]:
+                result["next_offset"] = result["end_line"]
+            return result
 
-            return {"content": p.read_text(encoding="utf-8")}
+        except Exception as e:
+            return {"error": str(e)}
+
+    def tail(self, path: str, lines: int = 100) -> dict[str, Any]:
+        try:
+            p = self._readable(path)
+            count = min(max(lines, 1), self.MAX_READ_LINES)
+            return self._line_index(p).tail(count, self.MAX_READ_BYTES)
+        except Exception as e:
+            return {"error": str(e)}
 
+    def read_bytes(self, path: str, start: int = 0, length: int = 65536) -> dict[str, Any]:
+        try:
+            p = self._readable(path)
+            length = min(max(length, 0), self.MAX_READ_BYTES)
+            return self._line_index(p).read_bytes(start, length)
         except Exception as e:
             return {"error": str(e)}
 
@@ -78,51 +463,203 @@ class SecureFileSystem:
                 return {"error": "File exists. Use force=True to overwrite."}
 
             p.parent.mkdir(parents=True, exist_ok=True)
-            p.write_text(content, encoding="utf-8")
+            _atomic_write(p, content.encode("utf-8"))
 
             return {"success": True}
 
         except Exception as e:
             return {"error": str(e)}
 
-    def ls(self, path: str = ".") -> dict[str, Any]:
+    def edit(self, path: str, hunks: list[EditHunk] | None = None, diff: str = "") -> dict[str, Any]:
+        """Change part of a file with search/replace hunks or a unified diff.
+
+        Every hunk must match the current content, or nothing is written.
+        The file is replaced atomically, and the result is a short diff of
+        what changed rather than the new content.
+        """
+        try:
+            p = self._readable(path)
+            if bool(hunks) == bool(diff.strip()):
+                return {"error": "Pass either hunks or diff."}
+            if p.stat().st_size > self.MAX_FILE_SIZE:
+                return {"error": "File too large to edit; use write."}
+
+            raw = p.read_bytes().decode("utf-8")
+            # Edits are matched against "\n" lines; CRLF files keep their endings.
+            crlf = "\r\n" in raw
+            before = raw.replace("\r\n", "\n") if crlf else raw
+
+            if hunks:
+                after, count = _apply_hunks(before, hunks), len(hunks)
+            else:
+                after, count = _apply_unified_diff(before, diff)
+            if after == before:
+                return {"success": True, "hunks": count, "changed": False}
+
+            _atomic_write(p, (after.replace("\n", "\r\n") if crlf else after).encode("utf-8"))
+            return {"success": True, "hunks": count, "changed": True, **self._diff_summary(path, before, after)}
+
+        except Exception as e:
+            return {"error": str(e)}
+
+    def _diff_summary(self, path: str, before: str, after: str) -> dict[str, Any]:
+        diff = list(difflib.unified_diff(
+            before.splitlines(), after.splitlines(), f"a/{path}", f"b/{path}", n=1, lineterm=""
+        ))[2:]
+        added = sum(1 for line in diff if line.startswith("+"))
+        removed = sum(1 for line in diff if line.startswith("-"))
+        summary: dict[str, Any] = {
+            "lines_added": added,
+            "lines_removed": removed,
+            "diff": "\n".join(diff[:self.MAX_EDIT_DIFF_LINES]),
+        }
+        if len(diff) > self.MAX_EDIT_DIFF_LINES:
+            summary["diff_truncated"] = True
+        return summary
+
+    def ls(
+        self,
+        path: str = ".",
+        depth: int = 1,
+        cursor: str = "",
+        limit: int | None = None,
+    ) -> dict[str, Any]:
+        """List a directory, optionally recursing ``depth`` levels.
+
+        Entries come in sorted depth-first order. When there are more than
+        ``limit``, ``next_cursor`` is returned. Pass it back as ``cursor`` to
+        continue after the last entry.
+        """
         try:
             p = self._resolve(path)
             if not p.exists() or not p.is_dir():
                 return {"error": "Directory not found"}
 
-            items = [
-                {
-                    "name": item.name,
-                    "type": "dir" if item.is_dir() else "file",
-                }
-                for item in p.iterdir()
-                if not any(part in self.deny_names for part in item.parts)
-            ]
+            depth = min(max(depth, 1), self.MAX_LS_DEPTH)
+            limit = min(max(limit or self.DEFAULT_LS_LIMIT, 1), self.MAX_LS_LIMIT)
+            after = tuple(part for part in cursor.split("/") if part)
 
-            return {"items": items}
+            items: list[dict[str, Any]] = []
+            for parts, entry in self._scan(p, depth, (), after):
+                if len(items) == limit:
+                    return {"items": items, "next_cursor": items[-1]["name"]}
+                items.append(_describe(parts, entry))
+
+            return {"items": items, "next_cursor": None}
 
         except Exception as e:
             return {"error": str(e)}
-        
+
+    def _scan(
+        self,
+        directory: Path,
+        depth: int,
+        prefix: tuple[str, ...],
+        after: tuple[str, ...],
+    ) -> Iterator[tuple[tuple[str, ...], os.DirEntry]]:
+        """Yield (path parts, entry) in sorted pre-order, skipping up to ``after``.
+
+        Pre-order over sorted names is the same as sorting by path tuple. So a
+        directory that sorts before the cursor, and doesn't contain it, can be
+        skipped without being opened.
+        """
+        with os.scandir(directory) as it:
+            entries = sorted(
+                (e for e in it if e.name not in self.deny_names),
+                key=lambda e: e.name,
+            )
+
+        for entry in entries:
+            parts = prefix + (entry.name,)
+            if parts > after:
+                yield parts, entry
+            elif after[: len(parts)] != parts:
+                # Sorts before the cursor and isn't on its path: already listed.
+                continue
+
+            if depth > 1 and entry.is_dir(follow_symlinks=False):
+                try:
+                    yield from self._scan(Path(entry.path), depth - 1, parts, after)
+                except OSError:
+                    continue
+
+
+def _describe(parts: tuple[str, ...], entry: os.DirEntry) -> dict[str, Any]:
+    is_dir = entry.is_dir(follow_symlinks=False)
+    item: dict[str, Any] = {"name": "/".join(parts), "type": "dir" if is_dir else "file"}
+    try:
+        st = entry.stat(follow_symlinks=False)
+    except OSError:
+        return item
+    if not is_dir:
+        item["size"] = st.st_size
+    item["mtime"] = int(st.st_mtime)
+    return item
+
+
 from agents import function_tool
 
+from .cache import ToolCache
+
+
+def build_file_tools(fs: SecureFileSystem, cache: ToolCache | None = None):
 
-def build_file_tools(fs: SecureFileSystem):
+    @function_tool
+    def read(path: str, offset: int = 0, limit: int | None = None) -> dict:
+        """Read a file inside workspace.
+
+        Args:
+            path: File path relative to the workspace.
+            offset: First line to return (0-based). Use next_offset from a previous read to continue.
+            limit: Number of lines to return. Large files are always paged.
+        """
+        return fs.read(path, offset, limit)
 
     @function_tool
-    def read(path: str) -> dict:
-        """Read a file inside workspace."""
-        return fs.read(path)
+    def tail(path: str, lines: int = 100) -> dict:
+        """Read the last lines of a file inside workspace (e.g. the end of a log)."""
+        return fs.tail(path, lines)
+
+    @function_tool
+    def read_bytes(path: str, start: int = 0, length: int = 65536) -> dict:
+        """Read a byte range of a file inside workspace. A negative start counts from the end."""
+        return fs.read_bytes(path, start, length)
 
     @function_tool
     def write(path: str, content: str, force: bool = False) -> dict:
         """Write a file inside workspace."""
-        return fs.write(path, content, force)
+        result = fs.write(path, content, force)
+        if cache:
+            cache.invalidate()
+        return result
 
     @function_tool
-    def ls(path: str = ".") -> dict:
-        """List directory contents."""
-        return fs.ls(path)
+    def edit(path: str, hunks: list[EditHunk] | None = None, diff: str = "") -> dict:
+        """Change part of an existing file without sending all of it.
+
+        Prefer this to write for small changes. Give either hunks or diff. All
+        hunks must match, or the file is left unchanged. Returns a short diff.
+
+        Args:
+            path: File path relative to the workspace.
+            hunks: Search/replace pairs applied in order. Each search must be copied exactly from the file and occur exactly once.
+            diff: A unified diff for this one file (with @@ headers and context lines).
+        """
+        result = fs.edit(path, hunks, diff)
+        if cache and result.get("changed"):
+            cache.invalidate()
+        return result
 
-    return [read, write, ls]
\ No newline at end of file
+    @function_tool
+    def ls(path: str = ".", depth: int = 1, cursor: str = "", limit: int = 200) -> dict:
+        """List directory contents with sizes and modification times.
+
+        Args:
+            path: Directory relative to the workspace.
+            depth: How many levels to recurse (1 = just this directory).
+            cursor: Pass next_cursor from a previous call to get the next page.
+            limit: Maximum entries per page.
+        """
+        return fs.ls(path, depth, cursor, limit)
+
+    return [read, tail, read_bytes, write, edit, ls]
\ No newline at end of file
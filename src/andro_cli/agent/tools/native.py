@@ -0,0 +1,316 @@
+"""Linux probes that read the kernel's own tables instead of running commands.
+
+ps, df and ip fork a process per call and return text the model then has to
+pick apart. The same facts are in /proc, statvfs() and /sys/class/net. Reading
+them directly takes a few milliseconds and gives structured records that can
+be filtered here: the top processes by CPU or memory, mounts above a fill
+level, interfaces that are up.
+
+AVAILABLE is False off Linux; callers fall back to the command-based tools.
+"""
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+AVAILABLE = sys.platform.startswith("linux") and os.path.isdir("/proc/self")
+
+PROC = Path("/proc")
+SYS_NET = Path("/sys/class/net")
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if AVAILABLE else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if AVAILABLE else 4096
+GB = 1024 ** 3
+
+DEFAULT_PROCESS_LIMIT = 15
+MAX_PROCESS_LIMIT = 200
+MAX_COMMAND_CHARS = 200
+
+# Filesystems with no disk behind them. squashfs (snaps) is always full.
+VIRTUAL_FS = frozenset({
+    "autofs", "binfmt_misc", "bpf", "cgroup", "cgroup2", "configfs", "debugfs",
+    "devpts", "devtmpfs", "efivarfs", "fusectl", "hugetlbfs", "mqueue", "nsfs",
+    "proc", "pstore", "ramfs", "rpc_pipefs", "securityfs", "selinuxfs",
+    "squashfs", "sysfs", "tmpfs", "tracefs",
+})
+
+IFF_UP = 0x1
+IFF_LOOPBACK = 0x8
+SIOCGIFADDR = 0x8915
+SIOCGIFNETMASK = 0x891B
+
+
+def _read(path: Path | str) -> str:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+# ----------------------------
+# Processes
+# ----------------------------
+
+class _CpuSampler:
+    """Remembers each process's CPU ticks so the next call can report recent usage.
+
+    The first call (or one after a long gap) can only give the average since
+    each process started, which is what ps shows.
+    """
+
+    MAX_GAP = 300.0  # older samples are too stale to diff against
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._ticks: dict[tuple[int, int], int] = {}
+        self._taken = 0.0
+
+    def rates(self, ticks: dict[tuple[int, int], int], uptime: float) -> tuple[dict[tuple[int, int], float], str]:
+        now = time.monotonic()
+        with self._lock:
+            previous, gap = self._ticks, now - self._taken
+            self._ticks, self._taken = ticks, now
+        if previous and 0.2 <= gap <= self.MAX_GAP:
+            rates = {
+                key: 100 * (count - previous.get(key, 0)) / CLOCK_TICKS / gap
+                for key, count in ticks.items()
+                if key in previous
+            }
+            return rates, f"last {gap:.1f}s"
+        rates = {}
+        for (pid, started), count in ticks.items():
+            alive = uptime - started / CLOCK_TICKS
+            rates[(pid, started)] = 100 * count / CLOCK_TICKS / alive if alive > 0 else 0.0
+        return rates, "since process start"
+
+
+_cpu = _CpuSampler()
+
+
+@lru_cache(maxsize=256)
+def _user(uid: int) -> str:
+    import pwd  # Unix only, like this module
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        return str(uid)
+
+
+def _cmdline(pid: int) -> str:
+    try:
+        with open(PROC / str(pid) / "cmdline", "rb") as f:
+            return f.read(4096).replace(b"\0", b" ").decode("utf-8", errors="replace").strip()
+    except OSError:
+        return ""
+
+
+def _meminfo() -> dict[str, int]:
+    info = {}
+    for line in _read(PROC / "meminfo").splitlines():
+        key, _, value = line.partition(":")
+        fields = value.split()
+        if fields:
+            info[key] = int(fields[0]) * 1024
+    return info
+
+
+def processes(sort_by: str = "cpu", limit: int = DEFAULT_PROCESS_LIMIT, name: str = "") -> dict[str, Any]:
+    """Top ``limit`` processes by "cpu" or "memory" (RSS), optionally matching ``name``.
+
+    CPU is percent of one core. It covers the time since the previous call
+    when there was one in the last five minutes, otherwise each process's
+    whole lifetime.
+    """
+    if sort_by not in ("cpu", "memory"):
+        return {"success": False, "error": 'sort_by must be "cpu" or "memory"'}
+    limit = min(max(limit, 1), MAX_PROCESS_LIMIT)
+    uptime = float(_read(PROC / "uptime").split()[0])
+    memory = _meminfo()
+    mem_total = memory.get("MemTotal", 0)
+
+    rows: list[dict[str, Any]] = []
+    ticks: dict[tuple[int, int], int] = {}
+    for entry in os.scandir(PROC):
+        if not entry.name.isdigit():
+            continue
+        pid = int(entry.name)
+        try:
+            stat = _read(f"{entry.path}/stat")
+            uid = entry.stat().st_uid
+        except OSError:
+            continue  # exited while we were looking
+        # comm may itself contain spaces and parentheses.
+        comm = stat[stat.find("(") + 1:stat.rfind(")")]
+        fields = stat[stat.rfind(")") + 2:].split()
+        started = int(fields[19])
+        ticks[(pid, started)] = int(fields[11]) + int(fields[12])
+        rows.append({
+            "pid": pid,
+            "ppid": int(fields[1]),
+            "user": uid,
+            "name": comm,
+            "state": fields[0],
+            "threads": int(fields[17]),
+            "rss": int(fields[21]) * PAGE_SIZE,
+            "_key": (pid, started),
+        })
+
+    rates, cpu_basis = _cpu.rates(ticks, uptime)
+    total = len(rows)
+    if name:
+        needle = name.lower()
+        rows = [r for r in rows if needle in r["name"].lower() or needle in _cmdline(r["pid"]).lower()]
+    for row in rows:
+        row["cpu_percent"] = round(rates.get(row.pop("_key"), 0.0), 1)
+
+    key = "cpu_percent" if sort_by == "cpu" else "rss"
+    rows.sort(key=lambda r: (r[key], r["rss"]), reverse=True)
+    top = rows[:limit]
+    # Only the rows returned need their owner and full command line.
+    for row in top:
+        row["user"] = _user(row["user"])
+        row["memory_percent"] = round(100 * row["rss"] / mem_total, 1) if mem_total else None
+        row["rss_mb"] = round(row.pop("rss") / 1024 ** 2, 1)
+        command = _cmdline(row["pid"]) or f"[{row['name']}]"
+        row["command"] = command if len(command) <= MAX_COMMAND_CHARS else command[:MAX_COMMAND_CHARS] + "…"
+
+    return {
+        "success": True,
+        "processes": top,
+        "total": total,
+        "matched": len(rows),
+        "sort_by": sort_by,
+        "cpu_basis": cpu_basis,
+        "load_average": [float(x) for x in _read(PROC / "loadavg").split()[:3]],
+        "memory": {
+            "total_gb": round(mem_total / GB, 2),
+            "available_gb": round(memory.get("MemAvailable", 0) / GB, 2),
+        },
+    }
+
+
+# ----------------------------
+# Disks
+# ----------------------------
+
+def _unescape(field: str) -> str:
+    # /proc/mounts writes space, tab, newline and backslash as octal escapes.
+    if "\\" not in field:
+        return field
+    return field.encode().decode("unicode_escape").encode("latin-1").decode("utf-8", errors="replace")
+
+
+def disks(min_used_percent: float = 0, include_virtual: bool = False) -> dict[str, Any]:
+    """Mounted filesystems with size, use and inode use, like df.
+
+    Bind mounts of a device already listed are skipped, and so are virtual
+    filesystems (proc, tmpfs, ...) unless include_virtual is set.
+    """
+    mounts: list[dict[str, Any]] = []
+    seen: set[str] = set()
+    for line in _read(PROC / "self" / "mounts").splitlines():
+        fields = line.split()
+        if len(fields) < 3:
+            continue
+        device, mount, fstype = _unescape(fields[0]), _unescape(fields[1]), fields[2]
+        if (fstype in VIRTUAL_FS and not include_virtual) or device in seen:
+            continue
+        try:
+            st = os.statvfs(mount)
+        except OSError:
+            continue
+        if not st.f_blocks:
+            continue
+        seen.add(device)
+        used = (st.f_blocks - st.f_bfree) * st.f_frsize
+        free = st.f_bavail * st.f_frsize
+        # df's definition: space reserved for root counts as neither.
+        used_percent = round(100 * used / (used + free), 1) if used + free else 0.0
+        if used_percent < min_used_percent:
+            continue
+        mounts.append({
+            "mount": mount,
+            "device": device,
+            "fstype": fstype,
+            "size_gb": round(st.f_blocks * st.f_frsize / GB, 2),
+            "used_gb": round(used / GB, 2),
+            "free_gb": round(free / GB, 2),
+            "used_percent": used_percent,
+            "inodes_used_percent": round(100 * (st.f_files - st.f_ffree) / st.f_files, 1) if st.f_files else None,
+            "read_only": bool(st.f_flag & os.ST_RDONLY),
+        })
+    mounts.sort(key=lambda m: m["used_percent"], reverse=True)
+    return {"success": True, "mounts": mounts}
+
+
+# ----------------------------
+# Network interfaces
+# ----------------------------
+
+def _ipv4(sock: socket.socket, ifname: str) -> str | None:
+    """Primary IPv4 address with prefix length, through SIOCGIFADDR."""
+    import fcntl
+    request = struct.pack("256s", ifname.encode()[:15])
+    try:
+        address = socket.inet_ntoa(fcntl.ioctl(sock.fileno(), SIOCGIFADDR, request)[20:24])
+        mask = fcntl.ioctl(sock.fileno(), SIOCGIFNETMASK, request)[20:24]
+    except OSError:
+        return None
+    return f"{address}/{bin(int.from_bytes(mask, 'big')).count('1')}"
+
+
+def _ipv6_addresses() -> dict[str, list[str]]:
+    addresses: dict[str, list[str]] = {}
+    try:
+        table = _read(PROC / "net" / "if_inet6")
+    except OSError:
+        return addresses
+    for line in table.splitlines():
+        fields = line.split()
+        if len(fields) < 6:
+            continue
+        packed = bytes.fromhex(fields[0])
+        address = socket.inet_ntop(socket.AF_INET6, packed)
+        addresses.setdefault(fields[5], []).append(f"{address}/{int(fields[2], 16)}")
+    return addresses
+
+
+def _sys_value(path: Path) -> str | None:
+    try:
+        return _read(path).strip()
+    except OSError:
+        return None  # e.g. speed of a virtual or down link
+
+
+def interfaces(up_only: bool = False) -> dict[str, Any]:
+    """Network interfaces with state, addresses, MTU and traffic counters."""
+    ipv6 = _ipv6_addresses()
+    records: list[dict[str, Any]] = []
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for name in sorted(os.listdir(SYS_NET)):
+            base = SYS_NET / name
+            flags = int(_sys_value(base / "flags") or "0", 16)
+            up = bool(flags & IFF_UP)
+            if up_only and not up:
+                continue
+            speed = _sys_value(base / "speed")
+            record: dict[str, Any] = {
+                "name": name,
+                "up": up,
+                "carrier": _sys_value(base / "carrier") == "1",
+                "state": _sys_value(base / "operstate"),
+                "loopback": bool(flags & IFF_LOOPBACK),
+                "mac": _sys_value(base / "address"),
+                "mtu": int(_sys_value(base / "mtu") or 0),
+                "ipv4": [a for a in [_ipv4(sock, name)] if a],
+                "ipv6": ipv6.get(name, []),
+                "speed_mbps": int(speed) if speed and speed.lstrip("-").isdigit() and int(speed) > 0 else None,
+            }
+            for counter in ("rx_bytes", "tx_bytes", "rx_errors", "tx_errors", "rx_dropped", "tx_dropped"):
+                value = _sys_value(base / "statistics" / counter)
+                record[counter] = int(value) if value and value.isdigit() else None
+            records.append(record)
+    return {"success": True, "interfaces": records}
@@ -0,0 +1,248 @@
+"""Workspace index and search tools.
+
+The index keeps every allowed file under SecureFileSystem.root in SQLite:
+path, size and mtime, plus the text in an FTS5 trigram table so substring
+searches don't have to touch the disk. The index is built on the first
+search, and each later search first does a cheap incremental refresh. The
+tree is walked with os.scandir, and only files whose size or mtime changed
+are re-read. The walk stops after MAX_FILES files, and a workspace that is
+the home or root directory isn't indexed at all.
+"""
+import fnmatch
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterator
+
+from .files import SecureFileSystem
+
+TOO_BROAD = (
+    "The workspace is the home or root directory, which is too big to index. "
+    "Start andro in a project folder to search it."
+)
+
+
+class WorkspaceIndex:
+    MAX_INDEXED_FILE_SIZE = 1024 * 1024  # bigger files are listed but not searched
+    REFRESH_INTERVAL = 2.0  # seconds between tree walks
+    MAX_LINE_CHARS = 200
+    MAX_SEARCH_RESULTS = 500  # matching lines one search can return
+    MAX_FILES = 20000  # files indexed; the walk stops there
+
+    def __init__(self, fs: SecureFileSystem, db_path: Path) -> None:
+        self.fs = fs
+        self.root = str(fs.root)
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+        # Set when the last walk stopped at MAX_FILES.
+        self.limited = False
+        # Started from ~ or /: walking that is never worth it.
+        self.too_broad = fs.root in (Path.home().resolve(), Path(fs.root.anchor))
+
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                id INTEGER PRIMARY KEY,
+                root TEXT NOT NULL,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                UNIQUE (root, path)
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS file_text USING fts5(
+                content, tokenize = 'trigram'
+            );
+            """
+        )
+
+    # ----------------------------
+    # Indexing
+    # ----------------------------
+
+    def refresh(self, force: bool = False) -> dict[str, int]:
+        """Bring the index up to date with the workspace; returns change counts."""
+        with self._lock:
+            if not force and time.monotonic() - self._last_refresh < self.REFRESH_INTERVAL:
+                return {"added": 0, "updated": 0, "removed": 0}
+
+            known = {
+                path: (file_id, size, mtime)
+                for file_id, path, size, mtime in self._conn.execute(
+                    "SELECT id, path, size, mtime_ns FROM files WHERE root = ?", (self.root,)
+                )
+            }
+            added = updated = 0
+
+            with self._conn:
+                for rel, st in self._walk():
+                    seen = known.pop(rel, None)
+                    if seen and seen[1:] == (st.st_size, st.st_mtime_ns):
+                        continue
+                    self._index_file(rel, st, seen[0] if seen else None)
+                    if seen:
+                        updated += 1
+                    else:
+                        added += 1
+
+                for file_id, _, _ in known.values():
+                    self._conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+                    self._conn.execute("DELETE FROM file_text WHERE rowid = ?", (file_id,))
+
+            self._last_refresh = time.monotonic()
+            return {"added": added, "updated": updated, "removed": len(known)}
+
+    def _walk(self) -> Iterator[tuple[str, os.stat_result]]:
+        self.limited = False
+        files = 0
+        stack = [self.fs.root]
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                # Symlinks are skipped: one could point outside the workspace
+                # or into a denied directory, which the file tools refuse.
+                if entry.name in self.fs.deny_names or entry.is_symlink():
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(Path(entry.path))
+                    elif entry.is_file(follow_symlinks=False) and Path(entry.name).suffix in self.fs.allowed_ext:
+                        if files >= self.MAX_FILES:
+                            self.limited = True
+                            return
+                        rel = os.path.relpath(entry.path, self.root)
+                        yield rel.replace(os.sep, "/"), entry.stat(follow_symlinks=False)
+                        files += 1
+                except OSError:
+                    continue
+
+    def _index_file(self, rel: str, st: os.stat_result, file_id: int | None) -> None:
+        content = ""
+        if st.st_size <= self.MAX_INDEXED_FILE_SIZE:
+            try:
+                path = self.fs.root / rel
+                # Swapped for a symlink since the walk: leave it unread.
+                data = b"" if path.is_symlink() else path.read_bytes()
+                if b"\0" not in data:
+                    content = data.decode("utf-8", errors="replace")
+            except OSError:
+                pass
+
+        if file_id is None:
+            cur = self._conn.execute(
+                "INSERT INTO files (root, path, size, mtime_ns) VALUES (?, ?, ?, ?)",
+                (self.root, rel, st.st_size, st.st_mtime_ns),
+            )
+            file_id = cur.lastrowid
+        else:
+            self._conn.execute(
+                "UPDATE files SET size = ?, mtime_ns = ? WHERE id = ?",
+                (st.st_size, st.st_mtime_ns, file_id),
+            )
+            self._conn.execute("DELETE FROM file_text WHERE rowid = ?", (file_id,))
+        self._conn.execute("INSERT INTO file_text (rowid, content) VALUES (?, ?)", (file_id, content))
+
+    # ----------------------------
+    # Queries
+    # ----------------------------
+
+    def search(
+        self,
+        query: str,
+        regex: bool = False,
+        path_glob: str = "",
+        limit: int = 50,
+    ) -> dict[str, Any]:
+        """Find lines containing ``query`` (case-insensitive) or matching a regex."""
+        if self.too_broad:
+            return {"error": TOO_BROAD}
+        try:
+            pattern = re.compile(query if regex else re.escape(query), re.IGNORECASE)
+        except re.error as e:
+            return {"error": f"Invalid regex: {e}"}
+        limit = min(max(limit, 1), self.MAX_SEARCH_RESULTS)
+
+        self.refresh()
+        matches: list[dict[str, Any]] = []
+        files = 0
+        # Rows are streamed from the cursor so a broad query stops reading
+        # file contents as soon as the limit is reached.
+        with self._lock:
+            for path, content in self._candidates(query, regex):
+                if path_glob and not fnmatch.fnmatch(path, path_glob):
+                    continue
+                hit = False
+                for lineno, line in enumerate(content.splitlines(), start=1):
+                    if pattern.search(line):
+                        hit = True
+                        matches.append({"path": path, "line": lineno, "text": line.strip()[: self.MAX_LINE_CHARS]})
+                        if len(matches) >= limit:
+                            return self._noted({"matches": matches, "files": files + 1, "truncated": True})
+                files += hit
+
+        return self._noted({"matches": matches, "files": files, "truncated": False})
+
+    def _candidates(self, query: str, regex: bool) -> sqlite3.Cursor:
+        # CROSS JOIN keeps file_text as the outer loop, so MATCH runs once
+        # instead of once per file row.
+        base = "SELECT f.path, t.content FROM file_text t CROSS JOIN files f ON f.id = t.rowid WHERE f.root = ?"
+        # The trigram index can only narrow down literal queries of 3+ characters.
+        if not regex and len(query) >= 3:
+            phrase = '"' + query.replace('"', '""') + '"'
+            return self._conn.execute(base + " AND file_text MATCH ? ORDER BY f.path", (self.root, phrase))
+        return self._conn.execute(base + " AND t.content != '' ORDER BY f.path", (self.root,))
+
+    def find_files(self, name_glob: str = "*", limit: int = 200) -> dict[str, Any]:
+        """List indexed files whose path or name matches a glob, with sizes."""
+        if self.too_broad:
+            return {"error": TOO_BROAD}
+        self.refresh()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, size FROM files WHERE root = ? ORDER BY path", (self.root,)
+            ).fetchall()
+
+        found = [
+            {"path": path, "size": size}
+            for path, size in rows
+            if fnmatch.fnmatch(path, name_glob) or fnmatch.fnmatch(path.rsplit("/", 1)[-1], name_glob)
+        ]
+        return self._noted({"files": found[:limit], "total": len(found), "truncated": len(found) > limit})
+
+    def _noted(self, result: dict[str, Any]) -> dict[str, Any]:
+        if self.limited:
+            result["note"] = f"Only the first {self.MAX_FILES} files of the workspace are indexed."
+        return result
+
+
+from agents import function_tool
+
+
+def build_search_tools(index: WorkspaceIndex):
+
+    @function_tool
+    def search(query: str, regex: bool = False, path_glob: str = "", limit: int = 50) -> dict:
+        """Search the text of all workspace files at once (like grep -rn).
+
+        Args:
+            query: Text to look for (case-insensitive), or a regular expression if regex is true.
+            regex: Treat query as a Python regular expression.
+            path_glob: Only search files whose path matches this glob, e.g. "src/*.py".
+            limit: Maximum number of matching lines to return.
+        """
+        return index.search(query, regex, path_glob, limit)
+
+    @function_tool
+    def find_files(name_glob: str = "*") -> dict:
+        """Find workspace files by name or path glob (e.g. "*.yaml", "config*"), with sizes."""
+        return index.find_files(name_glob)
+
+    return [search, find_files]
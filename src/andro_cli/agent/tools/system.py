@@ -4,6 +4,8 @@ import os
 import subprocess
 from typing import Any
 
+from . import native
+
 
 def get_system_info() -> dict[str, Any]:
     """Get basic system information."""
@@ -20,6 +22,8 @@ def get_system_info() -> dict[str, Any]:
 
 def check_disk() -> dict[str, Any]:
     """Check disk space usage."""
+    if native.AVAILABLE:
+        return native.disks()
     if platform.system() == "Windows":
         try:
             result = subprocess.run(
@@ -44,6 +48,8 @@ def check_disk() -> dict[str, Any]:
 
 def check_processes() -> dict[str, Any]:
     """List running processes."""
+    if native.AVAILABLE:
+        return native.processes()
     if platform.system() == "Windows":
         try:
             result = subprocess.run(
@@ -89,7 +95,9 @@ def check_network() -> dict[str, Any]:
     
     # Get network interfaces
     try:
-        if platform.system() == "Windows":
+        if native.AVAILABLE:
+            results["interfaces"] = native.interfaces()["interfaces"]
+        elif platform.system() == "Windows":
             result = subprocess.run(
                 ["ipconfig"],
                 capture_output=True,
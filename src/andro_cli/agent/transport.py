@@ -0,0 +1,98 @@
+"""HTTP transport for the model client.
+
+The OpenAI client's defaults leave connection reuse and timeouts loose. Here
+the httpx pool is sized and kept alive, HTTP/2 is used when ``h2`` is
+installed (``pip install androincli[http2]``), and connect/read/write/pool
+timeouts are set separately. A slow model stream can then take minutes, while
+a dead endpoint still fails fast.
+
+warm_up() opens the connection (DNS, TCP, TLS) ahead of the first request.
+The TUI calls it while the user is typing.
+
+Settings come from the "transport" object in config.json, e.g.
+``{"transport": {"http2": false, "read_timeout": 300}}``.
+"""
+import importlib.util
+import time
+from dataclasses import dataclass, fields
+from typing import Any
+
+import httpx
+from openai import DefaultAsyncHttpxClient
+
+from andro_cli.agent.config import load_config
+
+
+@dataclass(slots=True)
+class TransportSettings:
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 120.0
+    connect_timeout: float = 5.0
+    read_timeout: float = 120.0
+    write_timeout: float = 30.0
+    pool_timeout: float = 10.0
+    http2: bool = True
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any] | None = None) -> "TransportSettings":
+        """Apply the "transport" setting of ``config`` (config.json unless given)."""
+        if config is None:
+            config = load_config()
+        overrides = config.get("transport") or {}
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in overrides.items() if k in known})
+
+    @property
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.write_timeout,
+            pool=self.pool_timeout,
+        )
+
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def build_http_client(settings: TransportSettings) -> httpx.AsyncClient:
+    """Pooled httpx client with the OpenAI SDK's defaults (redirects etc.) kept."""
+    return DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry,
+        ),
+        timeout=settings.timeout,
+        http2=settings.http2 and http2_available(),
+    )
+
+
+class ConnectionWarmer:
+    """Keeps one pooled connection to the model endpoint open ahead of use."""
+
+    def __init__(self, http_client: httpx.AsyncClient, base_url: str, settings: TransportSettings) -> None:
+        self.http_client = http_client
+        self.base_url = base_url
+        # Re-warming more often than this would only repeat a live connection.
+        self.interval = settings.keepalive_expiry / 2
+        self._last = 0.0
+        self._running = False
+
+    async def warm_up(self) -> bool:
+        """Open (or refresh) a connection; returns False if it was skipped or failed."""
+        now = time.monotonic()
+        if self._running or now - self._last < self.interval:
+            return False
+        self._running = True
+        try:
+            # Any response will do: the point is the pooled connection it leaves behind.
+            await self.http_client.head(self.base_url)
+            self._last = time.monotonic()
+            return True
+        except httpx.HTTPError:
+            return False
+        finally:
+            self._running = False
@@ -0,0 +1,191 @@
+"""Headless batch mode: run many prompts through the agent, JSONL in and out.
+
+Each input line is either a JSON object or a bare prompt string:
+
+    {"id": "web-01", "prompt": "Is nginx listening on port 80?"}
+    {"prompt": "check disk usage", "session": "host-a"}
+    "what's my local IP?"
+
+Every prompt gets its own session unless it names one; prompts sharing a
+session run one after another, in input order. One JSON result per prompt is
+written to stdout as soon as it finishes, so results arrive in completion
+order. Use ``id``/``index`` to match them up.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from dataclasses import dataclass
+from typing import IO, Any, TYPE_CHECKING
+
+from andro_cli.agent.models import ToolCall, ToolOutput, TurnComplete
+
+if TYPE_CHECKING:
+    from andro_cli.agent.runner import AgentService
+
+DEFAULT_CONCURRENCY = 4
+
+
+@dataclass(slots=True)
+class BatchItem:
+    index: int
+    id: str
+    prompt: str
+    session: str
+    # Sessions made up for a single prompt are dropped once it finishes.
+    own_session: bool = True
+
+
+def parse_line(index: int, line: str, run_id: str) -> BatchItem:
+    """Turn one input line into a BatchItem; raises ValueError on bad input."""
+    data: Any = json.loads(line)
+    if isinstance(data, str):
+        data = {"prompt": data}
+    if not isinstance(data, dict) or not isinstance(data.get("prompt"), str) or not data["prompt"].strip():
+        raise ValueError('expected a string or an object with a "prompt" string')
+    session = data.get("session")
+    return BatchItem(
+        index=index,
+        id=str(data.get("id", index)),
+        prompt=data["prompt"],
+        session=str(session or f"batch-{run_id}-{index}"),
+        own_session=not session,
+    )
+
+
+async def run_item(service: "AgentService", item: BatchItem) -> dict[str, Any]:
+    started = time.perf_counter()
+    result: dict[str, Any] = {"index": item.index, "id": item.id, "session": item.session}
+    tool_calls: list[dict[str, Any]] = []
+    try:
+        async for event in service.ask(item.prompt, session_id=item.session):
+            if isinstance(event, ToolCall):
+                tool_calls.append({"name": event.name, "arguments": event.arguments})
+            elif isinstance(event, ToolOutput):
+                # Outputs follow their calls; fill in the oldest one still open.
+                pending = next((c for c in tool_calls if c["name"] == event.name and "output" not in c), None)
+                if pending is not None:
+                    pending["output"] = event.output
+            elif isinstance(event, TurnComplete):
+                result.update(
+                    ok=True,
+                    output=event.output,
+                    usage=event.usage,
+                    ttft=_round(event.ttft),
+                    timings={label: _round(seconds) for label, seconds in event.timings.totals().items()},
+                )
+    except Exception as e:
+        result.update(ok=False, error=f"{type(e).__name__}: {e}")
+    result["tool_calls"] = tool_calls
+    result["latency"] = _round(time.perf_counter() - started)
+    return result
+
+
+async def run_batch(
+    service: "AgentService",
+    source: IO[str],
+    out: IO[str],
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> dict[str, Any]:
+    """Stream prompts from ``source`` through ``concurrency`` workers into ``out``."""
+    run_id = uuid.uuid4().hex[:8]
+    queue: asyncio.Queue[BatchItem | None] = asyncio.Queue(maxsize=concurrency * 2)
+    totals = {"prompts": 0, "ok": 0, "failed": 0, "invalid": 0, "total_tokens": 0}
+    started = time.perf_counter()
+
+    def emit(record: dict[str, Any]) -> None:
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+
+    async def produce() -> None:
+        index = 0
+        # readline in a thread so a slow stdin pipe doesn't stall the workers.
+        while line := await asyncio.to_thread(source.readline):
+            if not line.strip():
+                continue
+            try:
+                item = parse_line(index, line, run_id)
+            except ValueError as e:
+                totals["invalid"] += 1
+                emit({"index": index, "ok": False, "error": f"Invalid input line: {e}"})
+            else:
+                await queue.put(item)
+            index += 1
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def work() -> None:
+        while (item := await queue.get()) is not None:
+            record = await run_item(service, item)
+            if item.own_session:
+                service.close_session(item.session)
+            totals["prompts"] += 1
+            totals["ok" if record.get("ok") else "failed"] += 1
+            totals["total_tokens"] += record.get("usage", {}).get("total_tokens", 0)
+            emit(record)
+
+    await asyncio.gather(produce(), *(work() for _ in range(concurrency)))
+
+    elapsed = time.perf_counter() - started
+    totals["elapsed"] = _round(elapsed)
+    totals["prompts_per_second"] = _round(totals["prompts"] / elapsed) if elapsed else None
+    return totals
+
+
+async def _run_with_mcp(service: "AgentService", source: IO[str], concurrency: int) -> dict[str, Any]:
+    # Servers with cached tools start on their first call; the others have
+    # to start now or the model wouldn't see their tools.
+    await service.start_mcp(missing_only=True)
+    try:
+        return await run_batch(service, source, sys.stdout, concurrency)
+    finally:
+        await service.close()
+
+
+def _round(value: float | None) -> float | None:
+    return None if value is None else round(value, 3)
+
+
+def build_parser(parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
+    parser.add_argument(
+        "input",
+        nargs="?",
+        default="-",
+        help="JSONL file of prompts, or - for stdin (default)",
+    )
+    parser.add_argument(
+        "-c", "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"prompts in flight at once (default {DEFAULT_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--keep-sessions",
+        action="store_true",
+        help="store the batch sessions in session.db instead of in memory",
+    )
+    return parser
+
+
+def main(args: argparse.Namespace, api_key: str) -> int:
+    """Run a batch; a summary goes to stderr. Exit status is 1 if any prompt failed
+    or the input can't be read."""
+    from andro_cli.agent.runner import AgentService
+
+    try:
+        source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    except OSError as e:
+        print(f"Cannot read {args.input}: {e.strerror or e}", file=sys.stderr)
+        return 1
+
+    try:
+        service = AgentService(api_key=api_key, session_db=None if args.keep_sessions else ":memory:")
+        totals = asyncio.run(_run_with_mcp(service, source, max(args.concurrency, 1)))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    print(json.dumps({"summary": totals}), file=sys.stderr)
+    return 1 if totals["failed"] or totals["invalid"] else 0
@@ -0,0 +1,4 @@
+"""Performance benchmarks for andro-cli.
+
+Run a benchmark as a module, e.g. ``python -m andro_cli.bench.startup``.
+"""
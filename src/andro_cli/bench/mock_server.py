@@ -0,0 +1,336 @@
+"""Minimal OpenAI-compatible server for benchmarks and offline runs.
+
+Plain asyncio, no extra dependencies. It speaks just enough HTTP/1.1
+(keep-alive, Content-Length bodies) to serve /v1/chat/completions, streamed
+or not. It counts connections and requests, so a benchmark can tell whether
+the client reused its connections. TLS is optional, with a throwaway
+self-signed certificate from the openssl CLI.
+
+Replies are scripted with Rules, checked in order against the last user
+message:
+
+    [{"match": "disk", "tool": "check_disk", "reply": "Your disk looks fine."},
+     {"match": "", "reply": "Hello from the mock server."}]
+
+A rule with a tool first answers with a call to that tool. Once the tool
+output comes back, it answers with its reply. ``latency`` delays the first
+byte of every response. ``chunk_delay`` and ``chunk_words`` control how a
+streamed reply is paced.
+
+Usage:
+    python -m andro_cli.bench.mock_server [--port 8765] [--latency 0.05]
+        [--chunk-delay 0.01] [--script rules.json] [--tls]
+
+Point the app at it with EXAMPLE_BASE_URL=http://127.0.0.1:8765/v1/.
+"""
+import argparse
+import asyncio
+import json
+import re
+import shutil
+import ssl
+import subprocess
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+DEFAULT_REPLY = "Hello from the mock server."
+
+
+@dataclass(slots=True)
+class Rule:
+    match: str = ""  # regex searched in the last user message; "" matches anything
+    reply: str = DEFAULT_REPLY
+    tool: str | None = None
+    arguments: dict[str, Any] = field(default_factory=dict)
+
+    def matches(self, text: str) -> bool:
+        return not self.match or re.search(self.match, text, re.IGNORECASE) is not None
+
+
+def load_script(path: Path) -> list[Rule]:
+    return [Rule(**rule) for rule in json.loads(path.read_text(encoding="utf-8"))]
+
+
+@dataclass(slots=True)
+class ServerStats:
+    connections: int = 0
+    requests: int = 0
+    tool_calls: int = 0
+
+
+class MockServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        script: list[Rule] | None = None,
+        latency: float = 0.0,
+        chunk_delay: float = 0.0,
+        chunk_words: int = 1,
+        ssl_context: ssl.SSLContext | None = None,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.script = script or [Rule()]
+        self.latency = latency  # seconds before the first byte of each response
+        self.chunk_delay = chunk_delay  # seconds between streamed chunks
+        self.chunk_words = max(chunk_words, 1)
+        self.ssl_context = ssl_context
+        self.stats = ServerStats()
+        self._server: asyncio.Server | None = None
+        self._connections: dict[asyncio.StreamWriter, asyncio.Task] = {}
+
+    @property
+    def base_url(self) -> str:
+        scheme = "https" if self.ssl_context else "http"
+        # Certificates are issued for "localhost", not the IP.
+        host = "localhost" if self.ssl_context and self.host == "127.0.0.1" else self.host
+        return f"{scheme}://{host}:{self.port}/v1/"
+
+    async def start(self) -> "MockServer":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, ssl=self.ssl_context)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            # Idle keep-alive connections would otherwise outlive the server.
+            handlers = list(self._connections.values())
+            for writer in list(self._connections):
+                writer.close()
+            await asyncio.gather(*handlers, return_exceptions=True)
+            await self._server.wait_closed()
+
+    async def __aenter__(self) -> "MockServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+
+    # ----------------------------
+    # HTTP
+    # ----------------------------
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.stats.connections += 1
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while request := await _read_request(reader):
+                method, path, headers, body = request
+                self.stats.requests += 1
+                keep_alive = headers.get("connection", "").lower() != "close"
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                await self._respond(writer, method, path, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ssl.SSLError):
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    async def _respond(
+        self,
+        writer: asyncio.StreamWriter,
+        method: str,
+        path: str,
+        body: bytes,
+        keep_alive: bool,
+    ) -> None:
+        if method == "POST" and path.rstrip("/").endswith("/chat/completions"):
+            payload = json.loads(body or b"{}")
+            if payload.get("stream"):
+                await self._stream_completion(writer, payload, keep_alive)
+                return
+            data = json.dumps(self.completion(payload)).encode()
+            _write_response(writer, 200, "application/json", data, keep_alive)
+        elif method in ("GET", "HEAD"):
+            data = b"" if method == "HEAD" else b'{"object": "list", "data": []}'
+            _write_response(writer, 200, "application/json", data, keep_alive)
+        else:
+            _write_response(writer, 404, "application/json", b'{"error": "not found"}', keep_alive)
+        await writer.drain()
+
+    async def _stream_completion(self, writer: asyncio.StreamWriter, payload: dict[str, Any], keep_alive: bool) -> None:
+        head = [
+            "HTTP/1.1 200 OK",
+            "Content-Type: text/event-stream",
+            "Transfer-Encoding: chunked",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode())
+        for index, event in enumerate(self.stream_events(payload)):
+            if index and self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+            data = f"data: {event}\n\n".encode()
+            writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    # ----------------------------
+    # Responses
+    # ----------------------------
+
+    def plan(self, payload: dict[str, Any]) -> tuple[str | None, dict[str, Any], str]:
+        """(tool, arguments, reply) for this request; tool is None for a text reply."""
+        messages = payload.get("messages", [])
+        user = next((m for m in reversed(messages) if m.get("role") == "user"), {})
+        rule = next((r for r in self.script if r.matches(_text(user.get("content")))), Rule())
+        # After the tool output comes back, the same rule supplies the answer.
+        if rule.tool and messages and messages[-1].get("role") != "tool":
+            return rule.tool, rule.arguments, ""
+        return None, {}, rule.reply
+
+    def completion(self, payload: dict[str, Any]) -> dict[str, Any]:
+        tool, arguments, reply = self.plan(payload)
+        if tool:
+            self.stats.tool_calls += 1
+            message: dict[str, Any] = {"role": "assistant", "content": None, "tool_calls": [_tool_call(tool, arguments, self.stats.tool_calls)]}
+            finish = "tool_calls"
+        else:
+            message, finish = {"role": "assistant", "content": reply}, "stop"
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "mock"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish}],
+            "usage": _usage(payload, reply),
+        }
+
+    def stream_events(self, payload: dict[str, Any]) -> list[str]:
+        model = payload.get("model", "mock")
+        tool, arguments, reply = self.plan(payload)
+        if tool:
+            self.stats.tool_calls += 1
+            call = {"index": 0, **_tool_call(tool, arguments, self.stats.tool_calls)}
+            events = [_chunk(model, {"role": "assistant", "tool_calls": [call]}), _chunk(model, {}, "tool_calls")]
+        else:
+            words = reply.split(" ")
+            pieces = [" ".join(words[i:i + self.chunk_words]) for i in range(0, len(words), self.chunk_words)]
+            events = [
+                _chunk(model, {"role": "assistant", "content": piece if i == len(pieces) - 1 else piece + " "})
+                for i, piece in enumerate(pieces)
+            ]
+            events.append(_chunk(model, {}, "stop"))
+        events.append(json.dumps({
+            "id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": 0, "model": model,
+            "choices": [], "usage": _usage(payload, reply),
+        }))
+        events.append("[DONE]")
+        return events
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content if isinstance(content, str) else ""
+
+
+def _tool_call(name: str, arguments: dict[str, Any], number: int) -> dict[str, Any]:
+    return {"id": f"call_{number}", "type": "function", "function": {"name": name, "arguments": json.dumps(arguments)}}
+
+
+def _chunk(model: str, delta: dict[str, Any], finish: str | None = None) -> str:
+    return json.dumps({
+        "id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": 0, "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+    })
+
+
+def _usage(payload: dict[str, Any], reply: str) -> dict[str, int]:
+    prompt = len(json.dumps(payload.get("messages", []))) // 4
+    completion = len(reply) // 4 + 1
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+
+async def _read_request(reader: asyncio.StreamReader) -> tuple[str, str, dict[str, str], bytes] | None:
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return None
+    lines = head.decode("latin-1").split("\r\n")
+    method, path, _ = lines[0].split(" ", 2)
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    body = await reader.readexactly(length) if length else b""
+    return method, path, headers, body
+
+
+def _write_response(writer: asyncio.StreamWriter, status: int, content_type: str, body: bytes, keep_alive: bool) -> None:
+    reason = {200: "OK", 404: "Not Found"}.get(status, "")
+    head = [
+        f"HTTP/1.1 {status} {reason}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+
+
+def make_tls_context(directory: Path) -> tuple[ssl.SSLContext, Path] | None:
+    """Self-signed certificate for localhost; returns (server context, cert path) or None."""
+    openssl = shutil.which("openssl")
+    if openssl is None:
+        return None
+    cert, key = directory / "cert.pem", directory / "key.pem"
+    subprocess.run(
+        [openssl, "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost",
+         "-keyout", str(key), "-out", str(cert)],
+        check=True,
+        capture_output=True,
+    )
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert, key)
+    return context, cert
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    import tempfile
+
+    context = None
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.tls:
+            made = make_tls_context(Path(tmp))
+            if made is None:
+                raise SystemExit("--tls needs the openssl command")
+            context, cert = made
+            print(f"Certificate: {cert} (set SSL_CERT_FILE to trust it)")
+        server = await MockServer(
+            port=args.port,
+            script=load_script(args.script) if args.script else None,
+            latency=args.latency,
+            chunk_delay=args.chunk_delay,
+            chunk_words=args.chunk_words,
+            ssl_context=context,
+        ).start()
+        print(f"Serving on {server.base_url}")
+        await asyncio.Event().wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each response")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument("--chunk-words", type=int, default=1, help="words per streamed chunk")
+    parser.add_argument("--script", type=Path, help="JSON list of rules (match, reply, tool, arguments)")
+    parser.add_argument("--tls", action="store_true", help="serve HTTPS with a self-signed certificate")
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Startup benchmark: time-to-first-frame and import cost of the TUI.
+
+Each run launches a fresh interpreter that starts AgentApp headless, records
+the moment the first frame is up, then exits.
+
+- cold: bytecode is compiled from scratch (empty PYTHONPYCACHEPREFIX)
+- warm: bytecode cache already populated by a previous run
+
+Usage:
+    python -m andro_cli.bench.startup [--runs 5] [--top 15] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+# Modules that must not be imported before the first frame is painted.
+HEAVY_MODULES = ("openai", "agents", "httpx", "andro_cli.agent.runner")
+
+_CHILD = """
+import json, os, sys, time
+from andro_cli.ui.app import AgentApp
+
+HEAVY = json.loads(os.environ["ANDRO_BENCH_HEAVY"])
+marks = {}
+
+class _Probe(AgentApp):
+    def on_ready(self):
+        # Ready is posted right after the first compositor refresh, so this
+        # counts what compose and mount imported too.
+        marks["first_frame"] = time.time()
+        marks["heavy_loaded"] = [m for m in HEAVY if m in sys.modules]
+        self.run_worker(self._finish())
+
+    async def _finish(self):
+        await self.get_agent_service()
+        marks["agent_ready"] = time.time()
+        with open(os.environ["ANDRO_BENCH_MARKER"], "w") as f:
+            json.dump(marks, f)
+        self.exit()
+
+_Probe().run(headless=True)
+"""
+
+
+def _run_once(pycache: Path, home: Path, importtime: bool = False) -> dict[str, Any]:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as marker:
+        marker_path = Path(marker.name)
+
+    env = {
+        **os.environ,
+        "HOME": str(home),
+        "PYTHONPYCACHEPREFIX": str(pycache),
+        "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "bench-key"),
+        "ANDRO_BENCH_MARKER": str(marker_path),
+        "ANDRO_BENCH_HEAVY": json.dumps(HEAVY_MODULES),
+    }
+    # Warm runs need the bytecode cache to actually be written.
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    # -X importtime slows imports down a lot, so timed runs go without it.
+    flags = ["-X", "importtime"] if importtime else []
+
+    started = time.time()
+    proc = subprocess.run(
+        [sys.executable, *flags, "-c", _CHILD],
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+    try:
+        marks = json.loads(marker_path.read_text())
+    except (OSError, ValueError):
+        raise RuntimeError(f"Benchmark child failed:\n{proc.stderr[-2000:]}")
+    finally:
+        marker_path.unlink(missing_ok=True)
+
+    return {
+        "first_frame": marks["first_frame"] - started,
+        "agent_ready": marks["agent_ready"] - started,
+        "heavy_loaded": marks["heavy_loaded"],
+        "imports": _parse_importtime(proc.stderr),
+    }
+
+
+def _parse_importtime(stderr: str) -> dict[str, float]:
+    """Cumulative import time (seconds) per top-level import."""
+    imports: dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented further; keep the ones made directly.
+        if name.startswith(" ") and not name.startswith("  "):
+            try:
+                imports[name.strip()] = int(cumulative) / 1e6
+            except ValueError:
+                pass
+    return imports
+
+
+def run(runs: int = 5) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        home = Path(tmp) / "home"
+        home.mkdir()
+
+        cold = [_run_once(Path(tmp) / f"cold-{i}", home) for i in range(runs)]
+
+        warm_cache = Path(tmp) / "warm"
+        _run_once(warm_cache, home)
+        warm = [_run_once(warm_cache, home) for _ in range(runs)]
+        profiled = _run_once(warm_cache, home, importtime=True)
+
+    def summary(samples: list[dict[str, Any]]) -> dict[str, float]:
+        frames = [s["first_frame"] for s in samples]
+        ready = [s["agent_ready"] for s in samples]
+        return {
+            "first_frame_median": statistics.median(frames),
+            "first_frame_min": min(frames),
+            "agent_ready_median": statistics.median(ready),
+        }
+
+    return {
+        "runs": runs,
+        "cold": summary(cold),
+        "warm": summary(warm),
+        "imports": profiled["imports"],
+        "heavy_before_first_frame": sorted({m for s in cold + warm for m in s["heavy_loaded"]}),
+    }
+
+
+def _print_report(report: dict[str, Any], top: int) -> None:
+    from rich.console import Console
+    from rich.table import Table
+
+    console = Console()
+
+    table = Table(title=f"Startup ({report['runs']} runs each)")
+    table.add_column("")
+    table.add_column("first frame (median)", justify="right")
+    table.add_column("first frame (min)", justify="right")
+    table.add_column("agent ready (median)", justify="right")
+    for label in ("cold", "warm"):
+        row = report[label]
+        table.add_row(
+            label,
+            f"{row['first_frame_median'] * 1000:.0f} ms",
+            f"{row['first_frame_min'] * 1000:.0f} ms",
+            f"{row['agent_ready_median'] * 1000:.0f} ms",
+        )
+    console.print(table)
+
+    imports = Table(title=f"Top {top} imports (warm, -X importtime)")
+    imports.add_column("module")
+    imports.add_column("time", justify="right")
+    ranked = sorted(report["imports"].items(), key=lambda kv: kv[1], reverse=True)
+    for name, seconds in ranked[:top]:
+        imports.add_row(name, f"{seconds * 1000:.1f} ms")
+    console.print(imports)
+
+    if report["heavy_before_first_frame"]:
+        heavy = ", ".join(report["heavy_before_first_frame"])
+        console.print(f"[bold red]Imported before first frame:[/bold red] {heavy}")
+    else:
+        console.print("[green]No SDK modules imported before first frame.[/green]")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", action="store_true", help="print the raw report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.runs)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report, args.top)
+    return 1 if report["heavy_before_first_frame"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
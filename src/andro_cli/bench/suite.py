@@ -0,0 +1,260 @@
+"""End-to-end latency suite against the bundled mock server.
+
+Runs the real AgentService (and a headless AgentApp) against
+bench/mock_server.py, so nothing depends on the network. The mock answers
+instantly by default, so the numbers are this app's own overhead:
+
+- ttft: message sent -> first text delta
+- tool_exec: tool call announced -> tool output back
+- tool_roundtrip: tool call announced -> first text delta of the answer
+- db_write: appending one turn (4 items) to the SQLite session, until committed
+- history_read: loading and compacting a 50-turn history
+- ui_turn: Enter pressed -> reply finished in the TUI
+- ui_flush: one re-render of a streaming bubble, until its blocks are mounted
+
+Medians are compared with a baseline JSON. It is written on the first run,
+or when --update-baseline is passed. A metric that is both more than
+--tolerance slower and more than 1 ms slower counts as a regression, and the
+exit status is 1.
+
+Usage:
+    python -m andro_cli.bench.suite [--turns 20] [--latency 0] [--baseline bench-baseline.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from andro_cli.bench.mock_server import MockServer, Rule
+
+DEFAULT_BASELINE = "bench-baseline.json"
+DEFAULT_TOLERANCE = 0.25
+# Regressions smaller than this are noise at these timescales.
+MIN_REGRESSION_MS = 1.0
+
+PLAIN_REPLY = " ".join(f"word{i}" for i in range(40))
+SCRIPT = [
+    Rule(match="^tool", tool="ls", arguments={"path": "."}, reply="The workspace has a few files."),
+    Rule(match="", reply=PLAIN_REPLY),
+]
+
+
+def _stats(samples: list[float]) -> dict[str, float]:
+    ms = [s * 1000 for s in samples]
+    return {
+        "median": round(statistics.median(ms), 3),
+        "p95": round(statistics.quantiles(ms, n=20)[-1] if len(ms) > 1 else ms[0], 3),
+        "n": len(ms),
+    }
+
+
+async def _service_metrics(turns: int) -> dict[str, dict[str, float]]:
+    from andro_cli.agent.models import TextDelta, ToolCall, ToolOutput
+    from andro_cli.agent.runner import AgentService
+
+    service = AgentService()
+    ttft, tool_exec, tool_roundtrip = [], [], []
+
+    # Turns are always consumed to the end: leaving ask() early would keep
+    # the session locked.
+    for i in range(turns):
+        started = time.perf_counter()
+        first = None
+        async for event in service.ask(f"plain question {i}", session_id="bench-plain"):
+            if first is None and isinstance(event, TextDelta):
+                first = time.perf_counter()
+        ttft.append(first - started)
+
+    for i in range(turns):
+        called = returned = answered = None
+        async for event in service.ask(f"tool question {i}", session_id="bench-tool"):
+            now = time.perf_counter()
+            if isinstance(event, ToolCall):
+                called = now
+            elif isinstance(event, ToolOutput):
+                returned = now
+            elif isinstance(event, TextDelta) and answered is None:
+                answered = now
+        tool_exec.append(returned - called)
+        tool_roundtrip.append(answered - called)
+
+    db_write, history_read = [], []
+    session = service.get_session("bench-db")
+    await session.clear_session()
+    for i in range(50):
+        items = [
+            {"role": "user", "content": f"question {i} " * 10},
+            {"type": "function_call", "call_id": f"c{i}", "name": "ls", "arguments": "{}"},
+            {"type": "function_call_output", "call_id": f"c{i}", "output": "x" * 2000},
+            {"role": "assistant", "content": PLAIN_REPLY},
+        ]
+        started = time.perf_counter()
+        await session.add_items(items)
+        # add_items only queues the write; wait for the commit it measures.
+        await service.flush()
+        db_write.append(time.perf_counter() - started)
+    for _ in range(10):
+        started = time.perf_counter()
+        await session.get_items()
+        history_read.append(time.perf_counter() - started)
+
+    return {
+        "ttft": _stats(ttft),
+        "tool_exec": _stats(tool_exec),
+        "tool_roundtrip": _stats(tool_roundtrip),
+        "db_write": _stats(db_write),
+        "history_read": _stats(history_read),
+    }
+
+
+async def _ui_metrics(turns: int) -> dict[str, dict[str, float]]:
+    from textual.widgets import Input
+
+    from andro_cli.ui.app import AgentApp
+    from andro_cli.ui.components import Bubble
+
+    flushes: list[float] = []
+    original = Bubble._flush_render
+
+    async def timed_flush(self: Bubble) -> None:
+        started = time.perf_counter()
+        await original(self)
+        flushes.append(time.perf_counter() - started)
+
+    Bubble._flush_render = timed_flush  # type: ignore[method-assign]
+    ui_turn = []
+    try:
+        app = AgentApp()
+        async with app.run_test():
+            await app.get_agent_service()
+            field = app.query_one("#message-input", Input)
+            for i in range(turns):
+                field.value = f"plain ui question {i}"
+                started = time.perf_counter()
+                # Posted rather than pilot.press(): the pilot waits for the
+                # screen to go idle, which would be measured too.
+                field.post_message(Input.Submitted(field, field.value))
+                while not app._busy:
+                    await asyncio.sleep(0.001)
+                while app._busy:
+                    await asyncio.sleep(0.002)
+                ui_turn.append(time.perf_counter() - started)
+    finally:
+        Bubble._flush_render = original  # type: ignore[method-assign]
+
+    return {"ui_turn": _stats(ui_turn), "ui_flush": _stats(flushes)}
+
+
+async def _run(turns: int, latency: float, chunk_delay: float, workspace: Path) -> dict[str, Any]:
+    async with MockServer(script=SCRIPT, latency=latency, chunk_delay=chunk_delay) as server:
+        # runner reads these at import time, so they must be set first.
+        os.environ["EXAMPLE_BASE_URL"] = server.base_url
+        os.environ["EXAMPLE_MODEL_NAME"] = "mock"
+        os.environ.setdefault("GEMINI_API_KEY", "bench-key")
+        os.chdir(workspace)
+
+        metrics = await _service_metrics(turns)
+        metrics.update(await _ui_metrics(max(turns // 4, 3)))
+        return {
+            "turns": turns,
+            "server": {"latency_ms": latency * 1000, "chunk_delay_ms": chunk_delay * 1000, "requests": server.stats.requests},
+            "metrics": metrics,
+        }
+
+
+def run(turns: int = 20, latency: float = 0.0, chunk_delay: float = 0.0) -> dict[str, Any]:
+    """Run the suite in a throwaway HOME and workspace."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        home, workspace = Path(tmp) / "home", Path(tmp) / "workspace"
+        home.mkdir()
+        workspace.mkdir()
+        for name in ("README.md", "notes.txt", "config.json"):
+            (workspace / name).write_text(f"{name}\n" * 20)
+        os.environ["HOME"] = str(home)
+        try:
+            return asyncio.run(_run(turns, latency, chunk_delay, workspace))
+        finally:
+            os.chdir(cwd)
+
+
+def compare(report: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[dict[str, Any]]:
+    """Metrics whose median got slower than the baseline allows."""
+    regressions = []
+    for name, current in report["metrics"].items():
+        before = baseline.get("metrics", {}).get(name)
+        if before is None:
+            continue
+        delta = current["median"] - before["median"]
+        if delta > MIN_REGRESSION_MS and current["median"] > before["median"] * (1 + tolerance):
+            regressions.append({"metric": name, "baseline": before["median"], "current": current["median"]})
+    return regressions
+
+
+def _print_report(report: dict[str, Any], baseline: dict[str, Any] | None, regressions: list[dict[str, Any]]) -> None:
+    from rich.console import Console
+    from rich.table import Table
+
+    console = Console()
+    server = report["server"]
+    table = Table(title=f"Latency suite ({report['turns']} turns, mock latency {server['latency_ms']:.0f} ms)")
+    table.add_column("metric")
+    table.add_column("median", justify="right")
+    table.add_column("p95", justify="right")
+    table.add_column("baseline", justify="right")
+    slow = {r["metric"] for r in regressions}
+    for name, m in report["metrics"].items():
+        before = (baseline or {}).get("metrics", {}).get(name)
+        style = "bold red" if name in slow else ""
+        table.add_row(
+            name,
+            f"{m['median']:.2f} ms",
+            f"{m['p95']:.2f} ms",
+            f"{before['median']:.2f} ms" if before else "—",
+            style=style,
+        )
+    console.print(table)
+    if regressions:
+        console.print(f"[bold red]{len(regressions)} regression(s):[/bold red] {', '.join(sorted(slow))}")
+    elif baseline:
+        console.print("[green]No regressions against the baseline.[/green]")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="mock server seconds before each response")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="mock server seconds between chunks")
+    parser.add_argument("--baseline", type=Path, default=Path(DEFAULT_BASELINE))
+    parser.add_argument("--update-baseline", action="store_true", help="overwrite the baseline with this run")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--json", action="store_true", help="print the raw report as JSON")
+    args = parser.parse_args()
+
+    baseline_path = args.baseline.resolve()
+    report = run(max(args.turns, 2), args.latency, args.chunk_delay)
+
+    baseline = None
+    if baseline_path.exists() and not args.update_baseline:
+        baseline = json.loads(baseline_path.read_text())
+    regressions = compare(report, baseline, args.tolerance) if baseline else []
+    if baseline is None:
+        baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+
+    if args.json:
+        print(json.dumps({**report, "regressions": regressions}, indent=2))
+    else:
+        _print_report(report, baseline, regressions)
+        if baseline is None:
+            print(f"Baseline written to {baseline_path}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
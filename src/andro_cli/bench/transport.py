@@ -0,0 +1,109 @@
+"""Transport benchmark: per-request overhead of the model client's HTTP setup.
+
+Sends the same small chat completion repeatedly to a local mock server and
+compares:
+
+- no-reuse: a new connection for every request (keep-alive off)
+- pooled: the tuned pool from agent/transport.py
+- pooled+warm: the same pool, warmed up before the first request, as the TUI
+  does while the user types
+
+By default the server speaks TLS with a self-signed certificate, so each new
+connection pays for a real handshake.
+
+Usage:
+    python -m andro_cli.bench.transport [--requests 30] [--no-tls] [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import httpx
+from openai import AsyncOpenAI
+
+from andro_cli.agent.transport import ConnectionWarmer, TransportSettings, build_http_client
+from andro_cli.bench.mock_server import MockServer, make_tls_context
+
+
+async def _measure(
+    server: MockServer,
+    http_client: httpx.AsyncClient,
+    requests: int,
+    warm: bool = False,
+) -> dict[str, Any]:
+    settings = TransportSettings()
+    client = AsyncOpenAI(base_url=server.base_url, api_key="bench", http_client=http_client, timeout=settings.timeout)
+    connections_before = server.stats.connections
+
+    if warm:
+        await ConnectionWarmer(http_client, server.base_url, settings).warm_up()
+
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        await client.chat.completions.create(model="bench", messages=[{"role": "user", "content": "ping"}])
+        latencies.append((time.perf_counter() - started) * 1000)
+    await client.close()
+
+    rest = latencies[1:] or latencies
+    return {
+        "first_ms": round(latencies[0], 2),
+        "median_ms": round(statistics.median(rest), 2),
+        "p95_ms": round(statistics.quantiles(rest, n=20)[-1] if len(rest) > 1 else rest[0], 2),
+        "connections": server.stats.connections - connections_before,
+    }
+
+
+async def run(requests: int, tls: bool) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        context = None
+        if tls:
+            made = make_tls_context(Path(tmp))
+            if made is not None:
+                context, cert = made
+                # httpx trusts SSL_CERT_FILE when building its SSL context.
+                os.environ["SSL_CERT_FILE"] = str(cert)
+
+        async with MockServer(ssl_context=context) as server:
+            settings = TransportSettings()
+            # The first request through the SDK pays for lazy imports; keep
+            # that out of the first mode's numbers.
+            await _measure(server, build_http_client(settings), 1)
+            results = {
+                "no-reuse": await _measure(
+                    server,
+                    httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=0), timeout=settings.timeout),
+                    requests,
+                ),
+                "pooled": await _measure(server, build_http_client(settings), requests),
+                "pooled+warm": await _measure(server, build_http_client(settings), requests, warm=True),
+            }
+        return {"tls": context is not None, "requests": requests, "results": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--no-tls", action="store_true", help="plain HTTP (no handshake cost)")
+    parser.add_argument("--json", action="store_true", help="print raw results as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(max(args.requests, 2), tls=not args.no_tls))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{args.requests} requests, {'TLS' if report['tls'] else 'plain HTTP'}")
+    print(f"{'mode':<14}{'first':>10}{'median':>10}{'p95':>10}{'conns':>8}")
+    for mode, r in report["results"].items():
+        print(f"{mode:<14}{r['first_ms']:>8.2f}ms{r['median_ms']:>8.2f}ms{r['p95_ms']:>8.2f}ms{r['connections']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 """Main CLI entry point for andro-cli."""
+import argparse
 import sys
 
 from rich.console import Console
@@ -31,15 +32,60 @@ def prompt_for_api_key() -> str | None:
     return api_key or None
 
 
-def main() -> int:
-    """Main entry point.
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="andro", description="AI-powered CLI assistant.")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="sample CPU and memory while running; reports go to ~/.cli_agent/profiles/",
+    )
+    commands = parser.add_subparsers(dest="command")
+
+    from andro_cli import batch
+    batch.build_parser(
+        commands.add_parser(
+            "batch",
+            help="run prompts from a JSONL file or stdin without the TUI",
+            description="Run prompts headlessly and write one JSON result per line to stdout.",
+        )
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Main entry point. With --profile the whole run is profiled."""
+    args = build_parser().parse_args(argv)
+    if not args.profile:
+        return _run(args)
+
+    from andro_cli.agent.config import get_profile_dir
+    from andro_cli.profiler import Profiler
+
+    profiler = Profiler().start()
+    try:
+        return _run(args)
+    finally:
+        profiler.stop()
+        paths = profiler.write(get_profile_dir())
+        print("Profile written to:", *(f"  {path}" for path in paths), sep="\n", file=sys.stderr)
+
+
+def _run(args: argparse.Namespace) -> int:
+    """Run the TUI or a batch.
 
     1. Check for API key in config/env.
-    2. If missing, prompt the user via CLI.
-    3. Save the key and launch the TUI.
+    2. If missing, prompt the user via CLI (TUI mode only).
+    3. Save the key and launch the TUI, or run a batch.
     """
     api_key = get_api_key()
 
+    if args.command == "batch":
+        if not api_key:
+            print("No API key found. Set GEMINI_API_KEY or run `andro` once to save one.", file=sys.stderr)
+            return 1
+        from andro_cli import batch
+        return batch.main(args, api_key)
+
     if not api_key:
         api_key = prompt_for_api_key()
 
@@ -55,7 +101,7 @@ def main() -> int:
 
     # Launch TUI
     from andro_cli.ui.app import AgentApp
-    app = AgentApp()
+    app = AgentApp(api_key=api_key)
     app.run()
     return 0
 
@@ -0,0 +1,219 @@
+"""Low-overhead profiling for ``andro --profile``.
+
+A background thread samples the stack of every other thread through
+sys._current_frames() (100 times a second by default). Allocations are
+sampled too: tracemalloc slows allocation-heavy code (pydantic, Markdown
+parsing) several times over, so it only runs for short windows, 0.5s out of
+every 15s. What was allocated in a window and still held at its end is added
+up by allocation site. That keeps the overhead to a few percent, so
+profiling can stay on for a whole session.
+
+On exit two files are written to ``~/.cli_agent/profiles/``:
+
+- ``<stamp>.folded``: collapsed stacks, one ``frame;frame;frame count`` per
+  line. Open it in speedscope or feed it to flamegraph.pl.
+- ``<stamp>-report.txt``: sample share of the event loop, Markdown
+  rendering, the agent runner and tools, the hottest functions, and the top
+  allocations.
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from types import FrameType
+
+DEFAULT_INTERVAL = 0.01
+# tracemalloc runs for ALLOC_WINDOW seconds out of every ALLOC_EVERY.
+ALLOC_WINDOW = 0.5
+ALLOC_EVERY = 15.0
+# Frames kept per allocation traceback.
+TRACEMALLOC_FRAMES = 5
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 25
+
+# A sample whose innermost frame is in one of these modules is a thread
+# waiting for work (the event loop in select, executor threads on a queue).
+IDLE_MODULES = ("selectors", "threading", "queue", "concurrent.futures.thread")
+
+# Report sections: share of busy samples with a frame from these modules.
+FOCUS_AREAS = {
+    "bubble rendering": ("andro_cli.ui.components.bubble",),
+    "markdown": ("textual.widgets._markdown", "markdown_it"),
+    "agent runner": ("andro_cli.agent.runner", "agents."),
+    "tools": ("andro_cli.agent.tools",),
+    "textual (layout/paint)": ("textual._compositor", "textual._arrange", "textual.widget", "textual.screen"),
+    "sqlite sessions": ("agents.extensions.memory", "agents.memory", "andro_cli.agent.timing"),
+}
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+@dataclass(slots=True)
+class AllocationSite:
+    traceback: tracemalloc.Traceback
+    size: int = 0
+    count: int = 0
+
+
+class Profiler:
+    def __init__(self, interval: float = DEFAULT_INTERVAL) -> None:
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self.idle = 0
+        self.started = 0.0
+        self.duration = 0.0
+        self.allocations: dict[tracemalloc.Traceback, AllocationSite] = {}
+        self.alloc_windows = 0
+        self.alloc_peak = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        # False when tracemalloc was already on (python -X tracemalloc); then
+        # it's left alone.
+        self._owns_tracemalloc = not tracemalloc.is_tracing()
+
+    def start(self) -> "Profiler":
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="andro-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started
+        if self._owns_tracemalloc and tracemalloc.is_tracing():
+            self._end_alloc_window()
+
+    def __enter__(self) -> "Profiler":
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        window_start = self.started
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                self._sample(names.get(ident, str(ident)), frame)
+
+            if not self._owns_tracemalloc:
+                continue
+            now = time.perf_counter()
+            if tracemalloc.is_tracing():
+                if now - window_start >= ALLOC_WINDOW:
+                    self._end_alloc_window()
+            elif now - window_start >= ALLOC_EVERY:
+                window_start = now
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    def _end_alloc_window(self) -> None:
+        self.alloc_peak = max(self.alloc_peak, tracemalloc.get_traced_memory()[1])
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ])
+        tracemalloc.stop()
+        self.alloc_windows += 1
+        for stat in snapshot.statistics("traceback"):
+            site = self.allocations.setdefault(stat.traceback, AllocationSite(stat.traceback))
+            site.size += stat.size
+            site.count += stat.count
+
+    def _sample(self, thread_name: str, frame: FrameType | None) -> None:
+        labels = []
+        while frame is not None:
+            labels.append(_frame_label(frame))
+            frame = frame.f_back
+        if not labels:
+            return
+        labels.append(thread_name)
+        labels.reverse()
+        self.stacks[";".join(labels)] += 1
+        self.samples += 1
+        if labels[-1].startswith(IDLE_MODULES):
+            self.idle += 1
+
+    # ----------------------------
+    # Output
+    # ----------------------------
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def report(self) -> str:
+        busy = self.samples - self.idle
+        lines = [
+            f"Profiled {self.duration:.1f}s, {self.samples} samples every {self.interval * 1000:.0f} ms "
+            f"({busy} busy, {self.idle} idle)",
+            "",
+            "Share of busy samples",
+        ]
+        busy_stacks = {s: c for s, c in self.stacks.items() if not s.rsplit(";", 1)[-1].startswith(IDLE_MODULES)}
+        for area, prefixes in FOCUS_AREAS.items():
+            hits = sum(c for s, c in busy_stacks.items() if any(f";{p}" in s for p in prefixes))
+            lines.append(f"  {area:<24}{_share(hits, busy):>7}")
+
+        own: Counter[str] = Counter()
+        total: Counter[str] = Counter()
+        for stack, count in busy_stacks.items():
+            frames = stack.split(";")[1:]
+            own[frames[-1]] += count
+            for label in set(frames):
+                total[label] += count
+        lines += ["", f"Hottest functions (own time, top {TOP_FUNCTIONS})"]
+        lines += [f"  {_share(c, busy):>7}  {label}" for label, c in own.most_common(TOP_FUNCTIONS)]
+        lines += ["", f"Hottest functions (including callees, top {TOP_FUNCTIONS})"]
+        lines += [f"  {_share(c, busy):>7}  {label}" for label, c in total.most_common(TOP_FUNCTIONS)]
+
+        lines += [
+            "",
+            f"Top allocation sites ({self.alloc_windows} windows of {ALLOC_WINDOW}s, "
+            f"largest traced in one window {_size(self.alloc_peak)})",
+            "  Bytes allocated in a window and still held at its end, summed over windows.",
+        ]
+        if not self.allocations:
+            lines.append("  No allocation windows ran (the session was shorter than "
+                         f"{ALLOC_EVERY:.0f}s, or tracemalloc was already on).")
+        top = sorted(self.allocations.values(), key=lambda site: site.size, reverse=True)
+        for site in top[:TOP_ALLOCATIONS]:
+            lines.append(f"  {_size(site.size):>10} in {site.count} blocks")
+            lines += [f"      {frame.filename}:{frame.lineno}" for frame in reversed(site.traceback)]
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory: Path) -> list[Path]:
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}"
+        folded = directory / f"{stamp}.folded"
+        report = directory / f"{stamp}-report.txt"
+        folded.write_text(self.folded(), encoding="utf-8")
+        report.write_text(self.report(), encoding="utf-8")
+        return [folded, report]
+
+
+def _share(count: int, total: int) -> str:
+    return f"{count / total:.1%}" if total else "-"
+
+
+def _size(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
@@ -1,13 +1,29 @@
+import asyncio
+import re
+from typing import TYPE_CHECKING
+
 from textual.app import App, ComposeResult
-from textual.containers import ScrollableContainer, Vertical
-from textual.widgets import Header, Footer, Input, Button
+from textual.containers import Vertical
+from textual.widgets import Header, Footer, Input, Button, TabbedContent, TabPane
+
+from andro_cli.ui.components import InputBar, Bubble, Transcript
+from andro_cli.agent.models import CommandOutput, TextDelta, ToolCall, ToolOutput, TurnComplete, TurnTimings
 
-from andro_cli.ui.components import InputBar, Bubble
-from andro_cli.agent.runner import AgentService
+if TYPE_CHECKING:
+    from andro_cli.agent.runner import AgentService
 
-CHAT_AREA_ID = "chat-area"
+SESSIONS_ID = "sessions"
+DEFAULT_SESSION = "default"  # same as runner.DEFAULT_SESSION, without importing the SDK
 MESSAGE_INPUT_ID = "message-input"
 THINKING_TEXT = "⏳ Thinking..."
+IDLE_PLACEHOLDER = "Type a message... (Enter to send, Ctrl+N for a new session)"
+BUSY_PLACEHOLDER = "Waiting for the reply... (/new or Ctrl+N opens another session)"
+# A resumed session shows this many of its latest messages first; older ones
+# are then loaded in pages of OLDER_PAGE.
+RESUME_MESSAGES = 40
+OLDER_PAGE = 200
+
+SESSION_NAME = re.compile(r"^[\w.-]{1,40}$")
 
 
 class AgentApp(App):
@@ -16,7 +32,11 @@ class AgentApp(App):
         background: $surface;
     }
 
-    #chat-area {
+    #sessions {
+        height: 1fr;
+    }
+
+    Transcript {
         height: 1fr;
         padding: 1;
     }
@@ -29,18 +49,29 @@ class AgentApp(App):
     BINDINGS = [
         ("ctrl+q", "quit", "Quit"),
         ("ctrl+l", "clear_chat", "Clear chat"),
+        ("ctrl+n", "new_session", "New session"),
         ("escape", "focus_input", "Focus input"),
     ]
 
-    def __init__(self):
+    def __init__(self, api_key: str | None = None):
         super().__init__()
-        self._busy = False  # prevents concurrent requests
-        self.agent_service = AgentService()
+        # One tab per session. A session takes one request at a time, but
+        # different sessions can be busy at once.
+        self._transcripts: dict[str, Transcript] = {}
+        self._pane_sessions: dict[str, str] = {}  # pane id -> session name
+        self._busy: set[str] = set()
+        self._api_key = api_key
+        # The SDK imports and client setup are slow, so they happen after the
+        # first frame is painted (see _load_agent_service).
+        self.agent_service: "AgentService | None" = None
+        self._agent_ready = asyncio.Event()
+        self._agent_error: Exception | None = None
 
     def compose(self) -> ComposeResult:
         yield Header()
         with Vertical():
-            yield ScrollableContainer(id=CHAT_AREA_ID)
+            with TabbedContent(id=SESSIONS_ID):
+                yield self._session_pane(DEFAULT_SESSION)
             yield InputBar()
         yield Footer()
 
@@ -49,10 +80,112 @@ class AgentApp(App):
         self.sub_title = "AI-powered CLI assistant"
         self._add_bubble("Welcome! How can I help you today?", role="bot")
         self.query_one(f"#{MESSAGE_INPUT_ID}", Input).focus()
+        self.call_after_refresh(lambda: self.run_worker(self._load_agent_service()))
+
+    async def _load_agent_service(self) -> None:
+        try:
+            self.agent_service = await asyncio.to_thread(_build_agent_service, self._api_key)
+        except Exception as e:
+            self._agent_error = e
+        self._agent_ready.set()
+        if self.agent_service is not None and self.agent_service.mcp.servers:
+            self.run_worker(self.agent_service.start_mcp(), group="mcp")
+
+    async def on_unmount(self) -> None:
+        if self.agent_service is not None:
+            await self.agent_service.close()
+
+    async def get_agent_service(self) -> "AgentService":
+        """Wait for the background load to finish and return the service."""
+        await self._agent_ready.wait()
+        if self.agent_service is None:
+            raise self._agent_error or RuntimeError("Agent failed to load")
+        return self.agent_service
+
+    # ----------------------------
+    # Sessions
+    # ----------------------------
+
+    def _session_pane(self, name: str) -> TabPane:
+        pane_id = f"session-{len(self._pane_sessions)}"
+        transcript = Transcript()
+        self._transcripts[name] = transcript
+        self._pane_sessions[pane_id] = name
+        return TabPane(name, transcript, id=pane_id)
+
+    def _pane_id(self, name: str) -> str:
+        return next(pane_id for pane_id, session in self._pane_sessions.items() if session == name)
+
+    @property
+    def active_session(self) -> str:
+        pane_id = self.query_one(f"#{SESSIONS_ID}", TabbedContent).active
+        return self._pane_sessions.get(pane_id, DEFAULT_SESSION)
+
+    async def open_session(self, name: str) -> None:
+        """Switch to the named session's tab, creating it if needed."""
+        tabs = self.query_one(f"#{SESSIONS_ID}", TabbedContent)
+        if name not in self._transcripts:
+            await tabs.add_pane(self._session_pane(name))
+            self._set_busy(name, True)
+            self.run_worker(self._resume_session(name))
+        tabs.active = self._pane_id(name)
+        self._sync_input()
+
+    async def _resume_session(self, name: str) -> None:
+        """Show a stored session's latest messages, then load the older ones behind them."""
+        transcript = self._transcripts[name]
+        try:
+            service = await self.get_agent_service()
+            page = await service.load_transcript(name, limit=RESUME_MESSAGES)
+        except Exception as e:
+            self._add_bubble(f"⚠️ Could not load the history of **{name}**: {e}", session=name)
+            page = {"messages": [], "before": None}
+        finally:
+            # Sending waits for the first page, so a new message can't land in it.
+            self._set_busy(name, False)
+
+        if not page["messages"]:
+            self._add_bubble(f"Session **{name}** started.", session=name)
+            return
+        transcript.prepend(_bubble_messages(page["messages"]))
+        self._add_bubble(f"Resumed session **{name}**.", session=name)
+        try:
+            while page["before"] is not None:
+                page = await service.load_transcript(name, before=page["before"], limit=OLDER_PAGE)
+                transcript.prepend(_bubble_messages(page["messages"]))
+        except Exception as e:
+            self._add_bubble(f"⚠️ Older messages of **{name}** could not be loaded: {e}", session=name)
+
+    def _set_busy(self, name: str, busy: bool) -> None:
+        if busy:
+            self._busy.add(name)
+        else:
+            self._busy.discard(name)
+        tabs = self.query_one(f"#{SESSIONS_ID}", TabbedContent)
+        tabs.get_tab(self._pane_id(name)).label = f"⏳ {name}" if busy else name
+        self._sync_input()
+
+    def _sync_input(self) -> None:
+        """Block sending while the active session waits on a reply.
+
+        The input itself stays enabled so slash commands (e.g. /new) still work.
+        """
+        busy = self.active_session in self._busy
+        input_widget = self.query_one(f"#{MESSAGE_INPUT_ID}", Input)
+        input_widget.placeholder = BUSY_PLACEHOLDER if busy else IDLE_PLACEHOLDER
+        self.query_one("#send-btn", Button).disabled = busy
+        input_widget.focus()
+
+    def on_tabbed_content_tab_activated(self, event: TabbedContent.TabActivated) -> None:
+        self._sync_input()
+
+    def action_new_session(self) -> None:
+        taken = set(self._transcripts)
+        name = next(f"chat-{n}" for n in range(2, len(taken) + 3) if f"chat-{n}" not in taken)
+        self.run_worker(self.open_session(name))
 
     def action_clear_chat(self) -> None:
-        chat_area = self.query_one(f"#{CHAT_AREA_ID}", ScrollableContainer)
-        chat_area.remove_children()
+        self._transcripts[self.active_session].clear()
         self._add_bubble("Chat cleared. How can I help you?", role="bot")
 
     def action_focus_input(self) -> None:
@@ -65,21 +198,30 @@ class AgentApp(App):
     def on_input_submitted(self, event) -> None:
         self._handle_send()
 
-    def _handle_send(self) -> None:
-        if self._busy:
-            return
+    def on_input_changed(self, event: Input.Changed) -> None:
+        # Open the connection to the model while the user is still typing, so
+        # the request doesn't pay for DNS/TCP/TLS. The warmer throttles itself.
+        if self.agent_service is not None and event.value and not event.value.startswith("/"):
+            self.run_worker(self.agent_service.warm_up(), group="warm-up")
 
+    def _handle_send(self) -> None:
+        session = self.active_session
         input_widget = self.query_one(f"#{MESSAGE_INPUT_ID}", Input)
-        send_button = self.query_one("#send-btn", Button)
 
         message = input_widget.value.strip()
 
         if not message:
             return
 
-        self._busy = True
-        input_widget.disabled = True
-        send_button.disabled = True
+        if message.startswith("/"):
+            input_widget.value = ""
+            self._handle_slash_command(message)
+            return
+
+        if session in self._busy:
+            return
+
+        self._set_busy(session, True)
 
         self._add_bubble(message, role="user")
         input_widget.value = ""
@@ -87,27 +229,212 @@ class AgentApp(App):
         thinking = self._add_bubble(THINKING_TEXT, role="bot")
 
         self.call_after_refresh(
-            lambda: self.run_worker(self._call_agent(message, thinking))
+            lambda: self.run_worker(self._call_agent(session, message, thinking))
         )
 
 
-    async def _call_agent(self, message: str, thinking_bubble: Bubble) -> None:
+    async def _call_agent(self, session: str, message: str, thinking_bubble: Bubble) -> None:
+        streamed = False
+        timings = TurnTimings()
+        thinking_bubble.timings = timings
         try:
-            response = await self.agent_service.ask(message)
+            agent_service = await self.get_agent_service()
+            async for event in agent_service.ask(message, session_id=session, timings=timings):
+                if isinstance(event, TextDelta):
+                    if streamed:
+                        thinking_bubble.append_message(event.text)
+                    else:
+                        streamed = True
+                        thinking_bubble.update_message(event.text)
+                elif isinstance(event, ToolCall):
+                    thinking_bubble.set_meta(f"🔧 {event.name}…")
+                elif isinstance(event, CommandOutput):
+                    # Shown as plain text until the reply starts; the first
+                    # delta replaces it.
+                    if not streamed:
+                        thinking_bubble.append_output(event.text)
+                elif isinstance(event, ToolOutput):
+                    thinking_bubble.set_meta("")
+                elif isinstance(event, TurnComplete):
+                    if not streamed:
+                        thinking_bubble.update_message(event.output)
+                    thinking_bubble.set_meta(_format_timing(event))
+                    # Rendered before moving on, so the saved timings include it.
+                    await thinking_bubble.flush()
+                    self.sub_title = f"{session} · {timings.summary()}"
         except Exception as e:
-            response = f"⚠️ Error: {e}"
+            thinking_bubble.update_message(f"⚠️ Error: {e}")
 
-        thinking_bubble.update_message(response)
+        await thinking_bubble.flush()
+        thinking_bubble.timings = None
+        self._set_busy(session, False)
 
-        self._busy = False
 
-        input_widget = self.query_one(f"#{MESSAGE_INPUT_ID}", Input)
-        input_widget.disabled = False
-        input_widget.focus()
+    # ----------------------------
+    # Slash commands
+    # ----------------------------
+
+    def _handle_slash_command(self, message: str) -> None:
+        """Run ``/name args`` locally via the matching ``_cmd_<name>`` method."""
+        name, _, arg = message[1:].partition(" ")
+        session = self.active_session
+        self._add_bubble(message, role="user")
+        handler = getattr(self, f"_cmd_{name.lower()}", None) if name.isidentifier() else None
+        if handler is None:
+            self._add_bubble(f"Unknown command `/{name}`.", role="bot")
+            return
+        self.run_worker(self._run_slash_command(handler, arg.strip(), session))
+
+    async def _run_slash_command(self, handler, arg: str, session: str) -> None:
+        try:
+            reply = await handler(arg)
+        except Exception as e:
+            reply = f"⚠️ Error: {e}"
+        if reply:
+            self._add_bubble(reply, role="bot", session=session)
+
+    async def _cmd_new(self, arg: str) -> str | None:
+        """/new [name] opens a session in a new tab (or switches to it)."""
+        if not arg:
+            self.action_new_session()
+            return None
+        if not SESSION_NAME.match(arg):
+            return "Session names may use letters, digits, `.`, `-` and `_` (max 40)."
+        await self.open_session(arg)
+        return None
+
+    async def _cmd_sessions(self, arg: str) -> str:
+        """/sessions lists stored sessions."""
+        service = await self.get_agent_service()
+        stored = await service.list_sessions()
+        if not stored:
+            return "No stored sessions yet."
+        lines = ["| Session | Items | Last used |", "|---------|-------|-----------|"]
+        for row in stored:
+            name = row["session_id"]
+            mark = " (open)" if name in self._transcripts else ""
+            lines.append(f"| `{name}`{mark} | {row['items']} | {row['updated_at']} |")
+        lines += ["", "Use `/new <name>` to open one."]
+        if service.writer is not None:
+            w = service.writer.stats()
+            lines += ["", f"Writer: {w['jobs']} writes in {w['batches']} commits · {w['errors']} errors"]
+            if w["sessions_trimmed"]:
+                lines[-1] += f" · {w['sessions_trimmed']} old sessions trimmed"
+            if w["last_error"]:
+                lines += ["", f"Last write error: `{w['last_error']}`"]
+        return "\n".join(lines)
+
+    async def _cmd_history(self, arg: str) -> str:
+        """/history search <words> finds past messages and tool results in every session."""
+        command, _, query = arg.partition(" ")
+        if command != "search" or not query.strip():
+            return "Usage: `/history search <words>` searches every stored session."
+        service = await self.get_agent_service()
+        result = await service.search_history(query)
+        if "error" in result:
+            return result["error"]
+        if not result["hits"]:
+            return f"Nothing in past sessions matches `{query.strip()}`."
+        lines = [f"**{len(result['hits'])} matches** for `{query.strip()}`", ""]
+        for hit in result["hits"]:
+            lines.append(f"- `{hit['session']}` · {hit['when']} · {hit['kind']} — {hit['snippet']}")
+        lines += ["", "Use `/new <name>` to open a session."]
+        return "\n".join(lines)
+
+    async def _cmd_cache(self, arg: str) -> str:
+        """/cache shows tool and response cache stats; /cache clear empties both."""
+        service = await self.get_agent_service()
+        cache = service.tool_cache
+        responses = service.response_cache
+        if arg == "clear":
+            text = f"Tool cache cleared ({cache.invalidate()} entries)."
+            if responses is not None:
+                text += f" Response cache cleared ({await asyncio.to_thread(responses.clear)} entries)."
+            return text
+
+        stats = cache.summary()
+        lines = [
+            f"**Tool cache** · {stats['entries']} entries · "
+            f"{stats['hits']} hits / {stats['misses']} misses ({stats['hit_rate']:.0%}) · "
+            f"{stats['evictions']} evicted · {stats['invalidations']} invalidations",
+        ]
+        if stats["per_tool"]:
+            lines += ["", "| Tool | Hits | Misses |", "|------|------|--------|"]
+            lines += [f"| `{name}` | {c['hits']} | {c['misses']} |" for name, c in sorted(stats["per_tool"].items())]
+        if responses is None:
+            lines += ["", "Response cache is off (set `\"response_cache\": true` in config.json)."]
+        else:
+            r = await asyncio.to_thread(responses.summary)
+            lines += [
+                "",
+                f"**Response cache** · {r['entries']} entries ({r['bytes'] / 1024:.0f} KB) · "
+                f"{r['hits']} hits / {r['misses']} misses this session",
+            ]
+        return "\n".join(lines)
+
+    async def _cmd_mcp(self, arg: str) -> str:
+        """/mcp lists the configured MCP servers and their state."""
+        manager = (await self.get_agent_service()).mcp
+        if not manager.servers:
+            return "No MCP servers configured. Add one as a JSON file in `~/.cli_agent/mcp/`."
+        lines = ["| Server | State | Version | Tools | Starts |", "|--------|-------|---------|-------|--------|"]
+        for s in manager.summary():
+            state = s["state"]
+            if s["idle"] is not None:
+                state += f" (idle {s['idle']:.0f}s)"
+            lines.append(f"| `{s['name']}` | {state} | {s['version'] or '—'} | {s['tools']} | {s['starts']} |")
+        errors = [f"- `{s['name']}`: {s['error']}" for s in manager.summary() if s["error"]]
+        if errors:
+            lines += ["", *errors]
+        if manager.shadowed:
+            lines += ["", "Skipped (name already taken): " + ", ".join(f"`{t}`" for t in manager.shadowed)]
+        return "\n".join(lines)
+
+    async def _cmd_timings(self, arg: str) -> str:
+        """/timings shows p50/p95 per stage over past turns; /timings <session> narrows it."""
+        service = await self.get_agent_service()
+        await service.flush()
+        report = await asyncio.to_thread(service.timing_store.percentiles, arg or None)
+        if not report["turns"]:
+            return "No timed turns yet."
+        scope = f"`{arg}`" if arg else "all sessions"
+        lines = [
+            f"**Turn timings** · last {report['turns']} turns · {scope}",
+            "",
+            "| Stage | p50 | p95 | Turns |",
+            "|-------|-----|-----|-------|",
+        ]
+        for label, t in report["labels"].items():
+            lines.append(f"| {label} | {t['p50']:.2f}s | {t['p95']:.2f}s | {t['turns']} |")
+        return "\n".join(lines)
+
+    def _add_bubble(self, message: str, role: str = "bot", session: str | None = None) -> Bubble:
+        return self._transcripts[session or self.active_session].add(message, role=role)
+
+
+def _build_agent_service(api_key: str | None) -> "AgentService":
+    from andro_cli.agent.runner import AgentService
+    return AgentService(api_key=api_key)
+
+
+def _bubble_messages(messages: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    """Stored (role, text) pairs with the roles Bubble uses."""
+    return [("user" if role == "user" else "bot", text) for role, text in messages]
+
+
+def _format_timing(event: TurnComplete) -> str:
+    if event.cached:
+        return f"⚡ cached · {event.elapsed * 1000:.0f}ms"
+    if event.ttft is None:
+        text = f"{event.elapsed:.1f}s"
+    else:
+        text = f"first token {event.ttft:.2f}s · {event.elapsed:.1f}s"
+    if event.history_tokens is not None:
+        text += f" · history ~{_format_tokens(event.history_tokens)} tok"
+        if event.saved_tokens:
+            text += f" (−{_format_tokens(event.saved_tokens)})"
+    return text
 
 
-    def _add_bubble(self, message: str, role: str = "bot") -> Bubble:
-        chat_area = self.query_one(f"#{CHAT_AREA_ID}", ScrollableContainer)
-        bubble = Bubble(message=message, role=role)
-        chat_area.mount(bubble)
-        return bubble
+def _format_tokens(count: int) -> str:
+    return f"{count / 1000:.1f}k" if count >= 1000 else str(count)
@@ -1,5 +1,6 @@
 """UI components for andro-cli TUI."""
 from .input_bar import InputBar
-from .bubble import Bubble
+from .bubble import Bubble, ChatEntry
+from .transcript import Transcript
 
-__all__ = ["InputBar", "Bubble"]
+__all__ = ["InputBar", "Bubble", "ChatEntry", "Transcript"]
@@ -1,6 +1,24 @@
+import asyncio
+from dataclasses import dataclass, field
+from time import monotonic
+
 from textual.widget import Widget
 from textual.app import ComposeResult
-from textual.widgets import Static, Markdown
+from textual.widgets import Log, Static, Markdown
+
+from andro_cli.agent.models import TurnTimings
+
+
+@dataclass(slots=True)
+class ChatEntry:
+    """Everything needed to (re)build a Bubble; kept even while it's unmounted."""
+    text: str
+    role: str = "bot"
+    meta: str = ""
+    # Shown as plain text (e.g. command output) rather than Markdown.
+    plain: bool = False
+    # The bubble currently mounted for this entry, if any.
+    view: "Bubble | None" = field(default=None, repr=False, compare=False)
 
 
 class Bubble(Widget):
@@ -33,28 +51,226 @@ class Bubble(Widget):
         background: $surface-darken-1;
         border: tall $success;
     }
+
+    Bubble > Log {
+        width: 80%;
+        height: auto;
+        max-height: 24;
+        padding: 0 1;
+    }
+
+    Bubble.user > Log {
+        background: $primary 20%;
+        border: tall $primary;
+    }
+
+    Bubble.bot > Log {
+        background: $surface-darken-1;
+        border: tall $success;
+    }
     """
 
-    def __init__(self, message: str, role: str = "bot", **kwargs) -> None:
-        super().__init__(**kwargs, classes=role)
-        self._message = message
-        self._role = role
+    # Streaming updates are coalesced so the content is re-rendered at most this often.
+    RENDER_FPS = 20
+    # Longer messages are shown in a Log, which only draws the visible lines,
+    # instead of being laid out as Markdown.
+    MAX_MARKDOWN_CHARS = 16_000
+    # A Log shows at most this many lines, the last ones, under a note of how
+    # many came before. When it fills up it is cut back by LOG_SLACK more, so
+    # streaming doesn't rebuild it on every update.
+    MAX_LOG_LINES = 10_000
+    LOG_SLACK = 1_000
+    # Live command output kept in the entry; the command's spool has all of it.
+    LIVE_OUTPUT_CHARS = 64 * 1024
+
+    def __init__(
+        self,
+        message: str = "",
+        role: str = "bot",
+        entry: ChatEntry | None = None,
+        **kwargs,
+    ) -> None:
+        # Updates go to the entry, so they survive the bubble being unmounted
+        # by the Transcript and show up when it's rebuilt.
+        self.entry = entry or ChatEntry(message, role)
+        super().__init__(**kwargs, classes=self.entry.role)
         self._header: Static | None = None
-        self._content: Markdown | None = None
+        self._content: Markdown | Log | None = None
+        # The text the content widget holds, if new text can be appended to
+        # it; None when it must be rebuilt first.
+        self._shown: str | None = None
+        self._render_pending = False
+        self._last_render = 0.0
+        self._render_lock = asyncio.Lock()
+        # Live command output: the kept tail, and how many lines were dropped.
+        self._output = ""
+        self._output_dropped = 0
+        # Set while a turn streams into this bubble; renders count as "ui".
+        self._timings: TurnTimings | None = None
+
+    def on_mount(self) -> None:
+        self.entry.view = self
+
+    def on_unmount(self) -> None:
+        if self.entry.view is self:
+            self.entry.view = None
+
+    @property
+    def timings(self) -> TurnTimings | None:
+        return self._timings
+
+    @timings.setter
+    def timings(self, timings: TurnTimings | None) -> None:
+        self._timings = timings
+        self._view()
+
+    def _view(self) -> "Bubble":
+        """The bubble showing this entry now, which is where updates render.
+
+        The Transcript may unmount this one and mount a new bubble for the
+        same entry while a turn is still streaming into it.
+        """
+        view = self.entry.view or self
+        view._timings = self._timings
+        return view
 
     def compose(self) -> ComposeResult:
         self._header = Static(self._prefix_text())
-        self._content = Markdown(self._message)
+        self._content = self._build_content()
 
         yield self._header
         yield self._content
 
+    def _is_plain(self) -> bool:
+        return self.entry.plain or len(self.entry.text) > self.MAX_MARKDOWN_CHARS
+
+    def _build_content(self) -> Markdown | Log:
+        if self._is_plain():
+            self._shown = self.entry.text
+            return Log().write(self._log_text(self.entry.text))
+        # Markdown.append() can't follow the full parse the widget does when
+        # it mounts, so the first render after this starts over.
+        self._shown = None
+        return Markdown(self.entry.text)
+
+    def _log_text(self, text: str) -> str:
+        """``text`` as the Log shows it: over MAX_LOG_LINES, its tail behind a note."""
+        lines = text.count("\n") + 1
+        if lines <= self.MAX_LOG_LINES:
+            return text
+        keep = self.MAX_LOG_LINES - self.LOG_SLACK
+        tail = text.rsplit("\n", keep)[1:]
+        return f"… {lines - keep} earlier lines not shown\n" + "\n".join(tail)
+
     def _prefix_text(self) -> str:
-        if self._role == "user":
-            return "[bold cyan]👤 You[/bold cyan]"
-        return "[bold green]🤖 Andro[/bold green]"
-
-    def update_message(self, message: str) -> None:
-        self._message = message
-        if self._content:
-            self._content.update(self._message)
\ No newline at end of file
+        if self.entry.role == "user":
+            prefix = "[bold cyan]👤 You[/bold cyan]"
+        else:
+            prefix = "[bold green]🤖 Andro[/bold green]"
+        if self.entry.meta:
+            prefix += f" [dim]{self.entry.meta}[/dim]"
+        return prefix
+
+    @property
+    def message(self) -> str:
+        return self.entry.text
+
+    def set_meta(self, meta: str) -> None:
+        """Show a short dim note (timings, tool activity) next to the header."""
+        self.entry.meta = meta
+        view = self._view()
+        if view._header and view.is_attached:
+            view._header.update(view._prefix_text())
+
+    def update_message(self, message: str, plain: bool = False) -> None:
+        """Replace the message text; the re-render is throttled.
+
+        With plain, it is shown as plain text instead of Markdown.
+        """
+        self.entry.text = message
+        self.entry.plain = plain
+        self._view()._schedule_render()
+
+    def append_message(self, delta: str) -> None:
+        """Append streamed text; the re-render is throttled."""
+        self.entry.text += delta
+        self._view()._schedule_render()
+
+    def append_output(self, lines: str) -> None:
+        """Add lines of live command output, shown as plain text.
+
+        Only the last LIVE_OUTPUT_CHARS or so are kept, behind a note of how
+        many lines were dropped, so a chatty command can't grow the entry
+        (or the cost of each append) without bound.
+        """
+        if not self.entry.plain:
+            self._output, self._output_dropped = "", 0
+        self._output += lines + "\n"
+        if len(self._output) > 2 * self.LIVE_OUTPUT_CHARS:
+            cut = self._output.find("\n", len(self._output) - self.LIVE_OUTPUT_CHARS) + 1
+            self._output_dropped += self._output.count("\n", 0, cut)
+            self._output = self._output[cut:]
+        note = f"… {self._output_dropped} earlier lines are in the command's spool\n" if self._output_dropped else ""
+        self.entry.text = note + self._output
+        self.entry.plain = True
+        self._view()._schedule_render()
+
+    async def flush(self) -> None:
+        """Render any pending text right away."""
+        await self._view()._flush_render()
+
+    def _schedule_render(self) -> None:
+        if self._render_pending or not (self.is_mounted and self.is_attached):
+            return
+        self._render_pending = True
+        delay = self._last_render + 1 / self.RENDER_FPS - monotonic()
+        if delay > 0:
+            self.set_timer(delay, self._flush_render)
+        else:
+            self.call_later(self._flush_render)
+
+    async def _flush_render(self) -> None:
+        self._render_pending = False
+        self._last_render = monotonic()
+        timings = self.timings
+        # One render at a time: appends must reach the widget in order.
+        async with self._render_lock:
+            if not (self._content and self.is_attached):
+                return
+            if timings is None:
+                await self._sync_content()
+            else:
+                with timings.span("ui", "render"):
+                    await self._sync_content()
+
+    async def _sync_content(self) -> None:
+        """Bring the content widget up to date, touching as little as possible.
+
+        Text that only grew is appended. A Log just takes the new lines, and
+        Markdown re-parses from the start of its last block, so the cost of a
+        streaming update doesn't grow with the message.
+        """
+        text = self.entry.text
+        content = self._content
+        if self._is_plain() != isinstance(content, Log):
+            self._content = self._build_content()
+            await content.remove()
+            await self.mount(self._content, after=self._header)
+            return
+
+        shown = self._shown
+        if shown is not None and text.startswith(shown):
+            delta = text[len(shown):]
+            if isinstance(content, Log):
+                if content.line_count + delta.count("\n") > self.MAX_LOG_LINES:
+                    content.clear().write(self._log_text(text))
+                else:
+                    content.write(delta)
+            elif delta:
+                await content.append(delta)
+        elif isinstance(content, Log):
+            content.clear().write(self._log_text(text))
+        else:
+            await content.update("")
+            await content.append(text)
+        self._shown = text
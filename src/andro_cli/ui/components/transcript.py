@@ -0,0 +1,165 @@
+"""Windowed chat transcript for andro-cli TUI."""
+from collections import deque
+
+from textual.containers import ScrollableContainer
+from textual.widget import Widget
+
+from .bubble import Bubble, ChatEntry
+
+
+class Transcript(ScrollableContainer):
+    """A scrollable chat log that only keeps a window of bubbles mounted.
+
+    Every message lives in ``entries`` as a small ChatEntry. At most
+    ``WINDOW`` of them are mounted as Bubble widgets at a time. Scrolling near
+    either edge mounts the next ``STEP`` entries on that side and unmounts the
+    same number on the far side. That keeps layout and memory cost flat as the
+    session grows.
+    """
+
+    WINDOW = 60
+    STEP = 20
+    # How close (in lines) to an edge the scroll position must be to page.
+    EDGE = 3
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.entries: list[ChatEntry] = []
+        # entries[_start:_end] are the ones currently mounted, in order, as
+        # the bubbles in _live. Children can't stand in for these: a removed
+        # bubble stays a child until the removal is processed.
+        self._start = 0
+        self._end = 0
+        self._live: deque[Bubble] = deque()
+        self._paging = False
+
+    def on_mount(self) -> None:
+        self.anchor()
+
+    # ----------------------------
+    # Public API
+    # ----------------------------
+
+    def add(self, message: str, role: str = "bot") -> Bubble:
+        """Append a message, jumping the window back to the tail if needed."""
+        if self._end != len(self.entries):
+            self._rebuild_tail()
+
+        entry = ChatEntry(message, role)
+        self.entries.append(entry)
+        bubble = Bubble(entry=entry)
+        self.mount(bubble)
+        self._live.append(bubble)
+        self._end += 1
+
+        overflow = (self._end - self._start) - self.WINDOW
+        if overflow > 0:
+            self._unmount_head(overflow)
+
+        self.anchor()
+        return bubble
+
+    def prepend(self, messages: list[tuple[str, str]]) -> None:
+        """Insert older (role, text) messages above everything else.
+
+        They are mounted only while the window has room; the rest page in as
+        the user scrolls up, like any other unmounted entry.
+        """
+        entries = [ChatEntry(text, role) for role, text in messages]
+        if not entries:
+            return
+        at_head = self._start == 0
+        self.entries[0:0] = entries
+        self._start += len(entries)
+        self._end += len(entries)
+        room = self.WINDOW - self.live_count
+        if at_head and room > 0 and not self._paging:
+            self._page_up(min(room, len(entries)))
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self._start = self._end = 0
+        self._live.clear()
+        self.remove_children()
+
+    @property
+    def live_count(self) -> int:
+        """Number of bubbles currently mounted."""
+        return self._end - self._start
+
+    # ----------------------------
+    # Windowing
+    # ----------------------------
+
+    def watch_scroll_y(self, old_value: float, new_value: float) -> None:
+        super().watch_scroll_y(old_value, new_value)
+        if self._paging:
+            return
+        if new_value <= self.EDGE and self._start > 0:
+            self._page_up()
+        elif new_value >= self.max_scroll_y - self.EDGE and self._end < len(self.entries):
+            self._page_down()
+
+    def _page_up(self, count: int = STEP) -> None:
+        self._paging = True
+        count = min(count, self._start)
+        new_start = self._start - count
+        bubbles = [Bubble(entry=e) for e in self.entries[new_start:self._start]]
+        self._start = new_start
+
+        first = self._live[0] if self._live else None
+        self.mount_all(bubbles, before=first)
+        self._live.extendleft(reversed(bubbles))
+
+        overflow = self.live_count - self.WINDOW
+        if overflow > 0:
+            tail = [self._live.pop() for _ in range(overflow)]
+            self._end -= overflow
+            self.remove_children(tail)
+
+        def keep_position() -> None:
+            # Content was inserted above the viewport; shift down by its height
+            # so what the user was looking at stays in place.
+            added = sum(_height(b) for b in bubbles)
+            self.scroll_to(y=self.scroll_y + added, animate=False, immediate=True)
+            self._paging = False
+
+        self.call_after_refresh(keep_position)
+
+    def _page_down(self) -> None:
+        self._paging = True
+        count = min(self.STEP, len(self.entries) - self._end)
+        bubbles = [Bubble(entry=e) for e in self.entries[self._end:self._end + count]]
+        self._end += count
+        self.mount_all(bubbles)
+        self._live.extend(bubbles)
+
+        overflow = self.live_count - self.WINDOW
+        removed = self._unmount_head(overflow) if overflow > 0 else 0
+
+        def keep_position() -> None:
+            if removed:
+                self.scroll_to(y=self.scroll_y - removed, animate=False, immediate=True)
+            self._paging = False
+
+        self.call_after_refresh(keep_position)
+
+    def _unmount_head(self, count: int) -> int:
+        """Unmount the first ``count`` live bubbles and return their height."""
+        head = [self._live.popleft() for _ in range(count)]
+        height = sum(_height(b) for b in head)
+        self._start += count
+        self.remove_children(head)
+        return height
+
+    def _rebuild_tail(self) -> None:
+        """Swap the window for the last WINDOW entries."""
+        self.remove_children()
+        self._end = len(self.entries)
+        self._start = max(0, self._end - self.WINDOW + 1)
+        self._live = deque(Bubble(entry=e) for e in self.entries[self._start:self._end])
+        self.mount_all(self._live)
+
+
+def _height(widget: Widget) -> int:
+    return widget.virtual_region_with_margin.height